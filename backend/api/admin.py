@@ -1,5 +1,15 @@
-from api.models import Profile, Track, User
-from api.utils import delete_track_files
+from api.models import (
+    AudioContent,
+    ProcessingJob,
+    Profile,
+    ReprocessItem,
+    ReprocessRun,
+    StorageTombstone,
+    Track,
+    TrackRendition,
+    User,
+)
+from api.tombstones import delete_tracks, delete_users
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.urls import reverse
@@ -74,70 +84,48 @@ class CustomUserAdmin(UserAdmin):
     track_count.short_description = "Tracks"
 
     def delete_model(self, request, obj):
-        """Override to ensure user directory is deleted from storage after cascade"""
-        # Store the user ID before deleting the model
-        user_id = obj.id
-
-        # Django will handle the cascade deletes for tracks
-        super().delete_model(request, obj)
-
-        # After the cascade delete, try to clean up the user's audio directory
-        try:
-            # Tracks might use a path like "{user_id}/audio/{track_id}/..."
-            # Check if this directory exists in the storage
-            from django.core.files.storage import default_storage
-
-            base_user_path = f"{user_id}/audio"
-
-            if default_storage.exists(base_user_path):
-                # List and delete all subdirectories
-                dirs, _ = default_storage.listdir(base_user_path)
-                for dir_name in dirs:
-                    track_path = f"{base_user_path}/{dir_name}"
-                    # Since we're not using a Track object, use dict format
-                    delete_track_files({"audio_file": track_path})
-
-                # Delete the base directory itself
-                default_storage.delete(base_user_path)
-                print(f"Deleted user directory: {base_user_path}")
-        except Exception as e:
-            print(f"Error cleaning up user directory: {e}")
+        """Delete the user and tombstone their files for the background purger"""
+        delete_users(User.objects.filter(pk=obj.pk))
 
     def delete_queryset(self, request, queryset):
-        """Override to ensure user directories are deleted when batch deleting"""
-        # Store user IDs before deleting
-        user_ids = [str(obj.id) for obj in queryset]
-
-        # Delete the queryset (Django will handle cascade)
-        super().delete_queryset(request, queryset)
-
-        # Clean up all user directories
-        from django.core.files.storage import default_storage
-
-        for user_id in user_ids:
-            try:
-                base_user_path = f"{user_id}/audio"
-                if default_storage.exists(base_user_path):
-                    # List and delete all subdirectories
-                    dirs, _ = default_storage.listdir(base_user_path)
-                    for dir_name in dirs:
-                        track_path = f"{base_user_path}/{dir_name}"
-                        # Since we're not using a Track object, use dict format
-                        delete_track_files({"audio_file": track_path})
-
-                    # Delete the base directory itself
-                    default_storage.delete(base_user_path)
-                    print(f"Deleted user directory: {base_user_path}")
-            except Exception as e:
-                print(f"Error cleaning up user directory: {e}")
+        """Delete the users and tombstone their files for the background purger"""
+        delete_users(queryset)
+
+
+class TrackRenditionInline(admin.TabularInline):
+    model = TrackRendition
+    extra = 0
+    fields = ("name", "codec", "bitrate", "size", "path")
+    readonly_fields = ("name", "codec", "bitrate", "size", "path")
+    can_delete = False
 
 
 @admin.register(Track)
 class TrackAdmin(admin.ModelAdmin):
-    list_display = ("title", "get_artist", "created_at", "has_audio", "audio_player")
-    list_filter = ("created_at", "artist")
+    inlines = [TrackRenditionInline]
+    list_display = (
+        "title",
+        "get_artist",
+        "created_at",
+        "processing_state",
+        "has_audio",
+        "audio_player",
+    )
+    list_filter = ("created_at", "processing_state", "artist")
     search_fields = ("title", "description", "artist__username")
-    readonly_fields = ("id", "created_at", "updated_at", "audio_player", "title_slug")
+    readonly_fields = (
+        "id",
+        "created_at",
+        "updated_at",
+        "audio_player",
+        "title_slug",
+        "content",
+        "audio_waveform_data",
+        "audio_codec",
+        "audio_sample_rate",
+        "audio_channels",
+        "audio_bitrate",
+    )
 
     fieldsets = (
         (None, {"fields": ("id", "title", "title_slug", "artist", "description")}),
@@ -146,10 +134,16 @@ class TrackAdmin(admin.ModelAdmin):
             {
                 "fields": (
                     "audio_file",
+                    "processing_state",
+                    "content",
                     "audio_player",
                     "audio_length",
                     "audio_waveform_data",
                     "audio_waveform_resolution",
+                    "audio_codec",
+                    "audio_sample_rate",
+                    "audio_channels",
+                    "audio_bitrate",
                 ),
             },
         ),
@@ -184,25 +178,56 @@ class TrackAdmin(admin.ModelAdmin):
     audio_player.short_description = "Audio Preview"
 
     def delete_model(self, request, obj):
-        """Override to ensure track directory is deleted from storage"""
-        if obj.audio_file:
-            # Delete associated files using the utility function directly
-            delete_track_files(obj)
-
-            # Delete the model after files are deleted
-            super().delete_model(request, obj)
-        else:
-            super().delete_model(request, obj)
+        """Delete the track and tombstone its files for the background purger"""
+        delete_tracks(Track.objects.filter(pk=obj.pk))
 
     def delete_queryset(self, request, queryset):
-        """Override to ensure track directories are deleted when batch deleting"""
-        # Delete files for each track using the utility function
-        for obj in queryset:
-            if obj.audio_file:
-                delete_track_files(obj)
-
-        # Delete the queryset
-        super().delete_queryset(request, queryset)
+        """Delete the tracks and tombstone their files for the background purger"""
+        delete_tracks(queryset)
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "track",
+        "status",
+        "progress",
+        "attempts",
+        "run_after",
+        "locked_by",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("track__title", "track__artist__username", "locked_by")
+    readonly_fields = ("id", "created_at", "updated_at")
+
+
+@admin.register(AudioContent)
+class AudioContentAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "ref_count", "audio_length", "created_at")
+    search_fields = ("sha256", "base_path")
+    readonly_fields = ("id", "sha256", "ref_count", "created_at", "updated_at")
+
+
+@admin.register(ReprocessRun)
+class ReprocessRunAdmin(admin.ModelAdmin):
+    list_display = ("id", "filters", "created_at", "finished_at")
+    readonly_fields = ("id", "filters", "created_at", "finished_at")
+
+
+@admin.register(ReprocessItem)
+class ReprocessItemAdmin(admin.ModelAdmin):
+    list_display = ("track", "run", "status", "updated_at")
+    list_filter = ("status", "run")
+    search_fields = ("track__title", "error")
+    readonly_fields = ("run", "track", "updated_at")
+
+
+@admin.register(StorageTombstone)
+class StorageTombstoneAdmin(admin.ModelAdmin):
+    list_display = ("prefix", "attempts", "run_after", "locked_by", "created_at")
+    search_fields = ("prefix", "error")
+    readonly_fields = ("created_at",)
 
 
 # Register Profile model directly
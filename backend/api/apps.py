@@ -34,10 +34,18 @@ class ApiConfig(AppConfig):
         print(f"Default storage before fix: {storage_class}")
 
         # Import our storage class
-        from api.storage import CloudflareR2Storage
-
-        # Create a new storage instance
-        r2_storage = CloudflareR2Storage()
+        from api.storage import CloudflareR2Storage, get_client, get_storage
+
+        # The process-wide storage instance, shared with get_r2_storage()
+        r2_storage = get_storage()
+
+        # Test connection upon startup in debug mode
+        if settings.DEBUG:
+            try:
+                get_client().head_bucket(Bucket=r2_storage.bucket_name)
+                print(f"✅ Successfully connected to R2 bucket: {r2_storage.bucket_name}")
+            except Exception as e:
+                print(f"⚠️ R2 connection ERROR: {e}")
 
         # Method 1: Override the _wrapped attribute
         if hasattr(default_storage, "_wrapped"):
@@ -0,0 +1,14 @@
+import logging
+
+# Configure logging for everything under the audio pipeline
+logger = logging.getLogger("track_processing")
+logger.setLevel(logging.INFO)
+# Ensure we have a console handler
+if not logger.handlers:
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
@@ -0,0 +1,244 @@
+import logging
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+logger = logging.getLogger("track_processing")
+
+# Every stage downstream of the decoder works on the same PCM layout
+PCM_SAMPLE_RATE = 44100
+PCM_CHANNELS = 2
+PCM_DTYPE = np.int16
+PCM_FORMAT = "s16le"
+
+
+class PcmBuffer:
+    """
+    Raw interleaved PCM decoded once from an upload.
+
+    The samples live in a scratch file and are exposed as a read-only
+    memory map, so the encoder, duration and waveform stages can share one
+    decode without holding the whole track in RAM.
+    """
+
+    def __init__(self, path, sample_rate=PCM_SAMPLE_RATE, channels=PCM_CHANNELS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # Sized from the file so duration stays available after close()
+        frame_bytes = np.dtype(PCM_DTYPE).itemsize * channels
+        self.frame_count = os.path.getsize(path) // frame_bytes
+        self._samples = None
+
+    @property
+    def samples(self):
+        """Interleaved samples as a flat int16 memory map"""
+        if self._samples is None:
+            if self.frame_count == 0:
+                self._samples = np.zeros(0, dtype=PCM_DTYPE)
+            else:
+                self._samples = np.memmap(self.path, dtype=PCM_DTYPE, mode="r")
+        return self._samples
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.frame_count / self.sample_rate
+
+    def ffmpeg_input_args(self):
+        """Arguments that let ffmpeg read this buffer as its input"""
+        return [
+            "-f",
+            PCM_FORMAT,
+            "-ar",
+            str(self.sample_rate),
+            "-ac",
+            str(self.channels),
+            "-i",
+            self.path,
+        ]
+
+    def close(self):
+        """Release the memory map so the scratch file can be removed"""
+        if isinstance(self._samples, np.memmap):
+            self._samples._mmap.close()
+        self._samples = None
+
+
+def pcm_decode_command(input_arg, pcm_path):
+    """ffmpeg arguments that decode input_arg to raw PCM at pcm_path"""
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        input_arg,
+        "-vn",
+        "-f",
+        PCM_FORMAT,
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(PCM_SAMPLE_RATE),
+        "-ac",
+        str(PCM_CHANNELS),
+        pcm_path,
+    ]
+
+
+def open_pcm(pcm_path, start_time):
+    """Wrap a finished decode in a PcmBuffer, or return None if it's empty"""
+    if not os.path.exists(pcm_path) or os.path.getsize(pcm_path) == 0:
+        logger.error("ffmpeg completed but decoded PCM is missing or empty")
+        return None
+
+    pcm = PcmBuffer(pcm_path)
+    logger.info(
+        f"Decoded {pcm.duration:.1f}s of audio to PCM in "
+        f"{time.time() - start_time:.2f} seconds"
+    )
+    return pcm
+
+
+def decode_to_pcm(input_file_path, scratch_dir):
+    """
+    Decode an audio file to a raw PCM scratch file with ffmpeg.
+
+    Args:
+        input_file_path: Path to the audio file to decode
+        scratch_dir: Directory for the .pcm scratch file
+
+    Returns:
+        A PcmBuffer, or None if the file couldn't be decoded
+    """
+    start_time = time.time()
+    pcm_path = os.path.join(scratch_dir, "decoded.pcm")
+    command = pcm_decode_command(input_file_path, pcm_path)
+
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error decoding audio with ffmpeg (exit code {e.returncode})")
+        logger.error(f"stderr: {e.stderr}")
+        return None
+    except OSError as e:
+        logger.error(f"Could not run ffmpeg to decode audio: {e}")
+        return None
+
+    return open_pcm(pcm_path, start_time)
+
+
+def decode_stream_to_pcm(chunks, scratch_dir):
+    """
+    Decode audio fed through ffmpeg's stdin to a raw PCM scratch file.
+
+    The input never touches the local disk. Containers that need to seek
+    (MP4 with its index at the end, for one) can't be decoded this way, so
+    callers should fall back to decode_to_pcm on a local copy.
+
+    Args:
+        chunks: Iterable of bytes making up the encoded file
+        scratch_dir: Directory for the .pcm scratch file
+
+    Returns:
+        A PcmBuffer, or None if ffmpeg couldn't decode the stream
+    """
+    start_time = time.time()
+    pcm_path = os.path.join(scratch_dir, "decoded.pcm")
+    command = pcm_decode_command("pipe:0", pcm_path)
+
+    # stderr goes to a spooled file so a chatty ffmpeg can't fill the pipe
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+            )
+        except OSError as e:
+            logger.error(f"Could not run ffmpeg to decode audio: {e}")
+            return None
+
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg gave up early; its exit code and stderr say why
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        returncode = process.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode(errors="replace").strip()
+            logger.error(f"Error decoding piped audio (exit code {returncode})")
+            logger.error(f"stderr: {message}")
+            return None
+
+    return open_pcm(pcm_path, start_time)
+
+
+# Frames per block when streaming PCM out of ffmpeg (~1.5s, ~256 KiB stereo)
+STREAM_BLOCK_FRAMES = 65536
+
+
+def stream_pcm_blocks(input_file_path, block_frames=STREAM_BLOCK_FRAMES):
+    """
+    Decode an audio file through an ffmpeg pipe, one fixed-size block at a time.
+
+    Yields flat interleaved int16 arrays of at most block_frames frames, so
+    memory use stays constant no matter how long the file is.
+
+    Raises:
+        RuntimeError: If ffmpeg exits with an error
+    """
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        input_file_path,
+        "-vn",
+        "-f",
+        PCM_FORMAT,
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(PCM_SAMPLE_RATE),
+        "-ac",
+        str(PCM_CHANNELS),
+        "pipe:1",
+    ]
+    frame_bytes = np.dtype(PCM_DTYPE).itemsize * PCM_CHANNELS
+    block_bytes = block_frames * frame_bytes
+
+    # stderr goes to a spooled file so a chatty ffmpeg can't fill the pipe
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=stderr, bufsize=block_bytes
+        )
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                usable = len(data) - len(data) % frame_bytes
+                yield np.frombuffer(data[:usable], dtype=PCM_DTYPE)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {message}")
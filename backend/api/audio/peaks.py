@@ -0,0 +1,89 @@
+import numpy as np
+
+# Points in the finest waveform level computed for each track. Coarser
+# levels halve it down to WAVEFORM_MIN_RESOLUTION and are stored alongside.
+WAVEFORM_RESOLUTION = 4096
+WAVEFORM_MIN_RESOLUTION = 64
+
+# Level served when a client doesn't ask for one (the old fixed resolution)
+WAVEFORM_DEFAULT_RESOLUTION = 200
+
+
+def pack_waveform(values):
+    """
+    Quantize 0-1 waveform values to one byte each for storage.
+
+    uint8 steps (1/255) are finer than the 2-decimal rounding the values
+    already carry, so nothing visible is lost.
+    """
+    values = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+    return np.round(values * 255).astype(np.uint8).tobytes()
+
+
+def unpack_waveform(data):
+    """Expand packed waveform bytes back into 0-1 values rounded to 2 decimals"""
+    if not data:
+        return []
+    values = np.frombuffer(bytes(data), dtype=np.uint8) / 255
+    return np.round(values, 2).tolist()
+
+
+def pyramid_sizes(resolution, min_resolution=WAVEFORM_MIN_RESOLUTION):
+    """Point counts of each pyramid level, finest first"""
+    sizes = [resolution]
+    while -(-sizes[-1] // 2) >= min_resolution:
+        sizes.append(-(-sizes[-1] // 2))
+    return sizes
+
+
+def build_pyramid(values, min_resolution=WAVEFORM_MIN_RESOLUTION):
+    """
+    Build successively halved copies of a 0-1 waveform, finest first.
+
+    Each level keeps the louder of every pair of points in the level above,
+    so peaks survive at every zoom and the loudest point stays at 1.
+    """
+    level = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+    levels = [level]
+    for _ in pyramid_sizes(len(level), min_resolution)[1:]:
+        if len(level) % 2:
+            level = np.append(level, level[-1])
+        level = level.reshape(-1, 2).max(axis=1)
+        levels.append(level)
+    return levels
+
+
+def pack_pyramid(values, min_resolution=WAVEFORM_MIN_RESOLUTION):
+    """Pack every pyramid level of a waveform into one byte string"""
+    return b"".join(
+        pack_waveform(level) for level in build_pyramid(values, min_resolution)
+    )
+
+
+def pyramid_level(data, resolution, requested=None):
+    """
+    Slice one level out of a packed pyramid without recomputing anything.
+
+    Returns the level whose point count is nearest `requested` (the finer
+    one on a tie), or the finest level if no resolution was requested.
+
+    Args:
+        data: Bytes written by pack_pyramid
+        resolution: Point count of the finest level
+        requested: Number of points the caller wants to draw
+    """
+    if data is None:
+        return None
+    data = bytes(data)
+    sizes = pyramid_sizes(resolution)
+
+    offset = 0
+    offsets = []
+    for size in sizes:
+        offsets.append(offset)
+        offset += size
+
+    index = 0
+    if requested is not None:
+        index = min(range(len(sizes)), key=lambda i: abs(sizes[i] - requested))
+    return data[offsets[index] : offsets[index] + sizes[index]]
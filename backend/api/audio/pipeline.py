@@ -0,0 +1,336 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from api.audio.decode import decode_stream_to_pcm, decode_to_pcm
+from api.audio.peaks import WAVEFORM_RESOLUTION, pack_pyramid
+from api.audio.probe import probe_audio
+from api.audio.transcode import (
+    RENDITION_CODECS,
+    convert_audio_to_mp3,
+    encode_hls_from_pcm,
+    encode_renditions_from_pcm,
+)
+from api.audio.waveform import generate_waveform, generate_waveform_from_pcm
+from api.content import hash_file, publish_content, reuse_content
+from api.models import Track, TrackRendition
+from api.utils import (
+    delete_track_files,
+    download_to_local_file,
+    ensure_storage_path_exists,
+    local_storage_path,
+    read_storage_chunks,
+    save_local_file,
+    storage_url,
+)
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger("track_processing")
+
+
+# Rendition behind Track.audio_url, stored at <base>/320/<track>.mp3
+PRIMARY_RENDITION = "320"
+
+# Rendition holding the HLS playlist, stored at <base>/hls/index.m3u8
+HLS_RENDITION = "hls"
+HLS_MIME_TYPE = "application/vnd.apple.mpegurl"
+
+
+class TrackProcessingError(Exception):
+    """Raised when a track cannot be turned into a playable file"""
+
+
+def rendition_specs():
+    """The configured renditions, always including the primary MP3"""
+    specs = list(settings.TRACK_RENDITIONS)
+    if not any(spec["name"] == PRIMARY_RENDITION for spec in specs):
+        specs.insert(0, {"name": PRIMARY_RENDITION, "codec": "mp3", "bitrate": "192k"})
+    return specs
+
+
+def save_rendition(track, spec, local_path):
+    """Store an encoded rendition and return an unsaved TrackRendition for it"""
+    codec = RENDITION_CODECS[spec["codec"]]
+    rendition_dir = f"{track.audio_file}/{spec['name']}"
+    full_path = f"{rendition_dir}/{track.id}.{codec['extension']}"
+
+    # Ensure the storage path exists (handles both local and cloud storage)
+    ensure_storage_path_exists(rendition_dir)
+
+    # Replace any file left behind by an earlier, interrupted attempt
+    if default_storage.exists(full_path):
+        default_storage.delete(full_path)
+
+    return TrackRendition(
+        track=track,
+        name=spec["name"],
+        codec=spec["codec"],
+        bitrate=int(spec["bitrate"].rstrip("k")),
+        mime_type=codec["mime_type"],
+        path=save_local_file(full_path, local_path),
+        size=os.path.getsize(local_path),
+    )
+
+
+def fetch_original(source_path, dest_dir):
+    """
+    Copy an original upload from storage into a local scratch directory.
+
+    The file is streamed to disk, so large originals never sit in memory.
+    """
+    _, ext = os.path.splitext(source_path)
+    local_path = os.path.join(dest_dir, f"original{ext}")
+    return download_to_local_file(source_path, local_path)
+
+
+def open_original(source_path, scratch_dir):
+    """
+    Get a stored original ready for decoding, copying it only when needed.
+
+    Originals on local storage are decoded in place. Remote originals are
+    piped from a streaming GET straight into ffmpeg and hashed on the way,
+    so no local copy is made; only files ffmpeg can't decode without
+    seeking are fetched to scratch_dir first.
+
+    Returns:
+        (local_path, pcm, sha256): local_path is None when the original was
+        streamed, in which case pcm holds the decoded audio and sha256 its
+        hex digest. Otherwise pcm and sha256 are None and the caller decodes
+        local_path itself.
+    """
+    local_path = local_storage_path(source_path)
+    if local_path is not None:
+        return local_path, None, None
+
+    sha256 = hashlib.sha256()
+
+    def chunks():
+        for chunk in read_storage_chunks(source_path):
+            sha256.update(chunk)
+            yield chunk
+
+    pcm = decode_stream_to_pcm(chunks(), scratch_dir)
+    if pcm is not None:
+        return None, pcm, sha256.hexdigest()
+
+    logger.info("Original can't be decoded from a stream, fetching it instead")
+    local_path = fetch_original(source_path, scratch_dir)
+    logger.info(f"Fetched original ({os.path.getsize(local_path)} bytes)")
+    return local_path, None, None
+
+
+def set_processing_state(track, state):
+    """Persist a new processing state without touching other track fields"""
+    track.processing_state = state
+    Track.objects.filter(pk=track.pk).update(processing_state=state)
+
+
+def save_hls(track, manifest_path):
+    """
+    Store an HLS playlist and its segments, returning an unsaved TrackRendition.
+
+    Segment URIs in the playlist are relative, so every file keeps its name
+    under <base>/hls/.
+    """
+    hls_dir = f"{track.audio_file}/{HLS_RENDITION}"
+    ensure_storage_path_exists(hls_dir)
+
+    local_dir = os.path.dirname(manifest_path)
+    total_size = 0
+    for filename in sorted(os.listdir(local_dir)):
+        local_path = os.path.join(local_dir, filename)
+        full_path = f"{hls_dir}/{filename}"
+        if default_storage.exists(full_path):
+            default_storage.delete(full_path)
+        save_local_file(full_path, local_path)
+        total_size += os.path.getsize(local_path)
+
+    return TrackRendition(
+        track=track,
+        name=HLS_RENDITION,
+        codec=HLS_RENDITION,
+        bitrate=int(settings.TRACK_HLS_BITRATE.rstrip("k")),
+        mime_type=HLS_MIME_TYPE,
+        path=f"{hls_dir}/{os.path.basename(manifest_path)}",
+        size=total_size,
+    )
+
+
+def process_track(track, source_path, report_progress=None, show_states=True):
+    """
+    Transcode and analyze a track whose original is already in storage.
+
+    Args:
+        track: The Track being processed
+        source_path: Storage path of the original upload
+        report_progress: Optional callable taking a 0-100 progress value
+        show_states: Move the track through the transcoding and analyzing
+            states. Reprocessing turns this off so ready tracks stay playable.
+
+    Every rendition in TRACK_RENDITIONS (plus HLS when TRACK_HLS_ENABLED is
+    set) is encoded from a single decode.
+    Uploads whose content hash is already indexed skip straight to ready
+    with the shared renditions and waveform.
+
+    Raises:
+        TrackProcessingError: If the original can't be converted to MP3
+    """
+
+    def report(progress):
+        if report_progress:
+            report_progress(progress)
+
+    total_start = time.time()
+    track_id = str(track.id)
+
+    if track.content_id and not source_path:
+        # Duplicate upload; it was pointed at the shared content on arrival
+        report(95)
+        return
+    if reuse_content(track):
+        if source_path:
+            # Identical content was indexed after this upload was stored
+            default_storage.delete(source_path)
+        report(95)
+        return
+    if not source_path:
+        raise TrackProcessingError(
+            "The original upload is no longer available. Please upload it again."
+        )
+
+    with tempfile.TemporaryDirectory(dir=settings.TRACK_SCRATCH_DIR) as temp_dir:
+        logger.info(f"Using temporary directory: {temp_dir}")
+
+        fetch_start = time.time()
+        original_path, pcm, streamed_hash = open_original(source_path, temp_dir)
+        logger.info(f"Read original in {time.time() - fetch_start:.2f} seconds")
+        report(10)
+
+        if not track.content_hash:
+            # Uploads that bypassed Django are hashed once the original is read
+            track.content_hash = streamed_hash or hash_file(original_path)
+            Track.objects.filter(pk=track.pk).update(content_hash=track.content_hash)
+            if reuse_content(track):
+                # Everything stored for this track duplicates the shared copy
+                if pcm is not None:
+                    pcm.close()
+                delete_track_files(track.audio_file)
+                report(95)
+                return
+
+        # Header read only; the duration is known before anything is decoded
+        metadata = probe_audio(
+            original_path or storage_url(source_path, expiration=600)
+        )
+        if metadata is not None:
+            probed = metadata.as_fields()
+            if metadata.duration:
+                probed["audio_length"] = round(metadata.duration)
+            for field, value in probed.items():
+                setattr(track, field, value)
+            Track.objects.filter(pk=track.pk).update(**probed)
+
+        if show_states:
+            set_processing_state(track, Track.ProcessingState.TRANSCODING)
+
+        # Decode once; the encoder and the analyzer both read this buffer
+        specs = rendition_specs()
+        if pcm is None:
+            pcm = decode_to_pcm(original_path, temp_dir)
+        if pcm is not None:
+            logger.info(f"Encoding decoded audio to {len(specs)} rendition(s)...")
+            encoded = encode_renditions_from_pcm(pcm, temp_dir, track_id, specs)
+        else:
+            logger.warning("PCM decode failed, falling back to direct conversion")
+            # Only the primary MP3 (at convert_audio_to_mp3's 192k) can be
+            # produced without a PCM buffer
+            specs = [{"name": PRIMARY_RENDITION, "codec": "mp3", "bitrate": "192k"}]
+            converted_file_path = convert_audio_to_mp3(original_path, temp_dir)
+            encoded = {PRIMARY_RENDITION: converted_file_path}
+
+        if not encoded or not encoded.get(PRIMARY_RENDITION):
+            raise TrackProcessingError(
+                "Failed to convert audio file to MP3. "
+                "Please try again or contact support."
+            )
+        converted_file_path = encoded[PRIMARY_RENDITION]
+
+        # Save the encoded renditions
+        save_start = time.time()
+        renditions = {
+            spec["name"]: save_rendition(track, spec, encoded[spec["name"]])
+            for spec in specs
+        }
+        mp3_storage_path = renditions[PRIMARY_RENDITION].path
+
+        if settings.TRACK_HLS_ENABLED and pcm is not None:
+            manifest_path = encode_hls_from_pcm(
+                pcm,
+                os.path.join(temp_dir, HLS_RENDITION),
+                segment_seconds=settings.TRACK_HLS_SEGMENT_SECONDS,
+                bitrate=settings.TRACK_HLS_BITRATE,
+                segment_type=settings.TRACK_HLS_SEGMENT_TYPE,
+            )
+            # Progressive renditions still play, so HLS failures aren't fatal
+            if manifest_path:
+                renditions[HLS_RENDITION] = save_hls(track, manifest_path)
+        logger.info(
+            f"{len(renditions)} rendition(s) saved in "
+            f"{time.time() - save_start:.2f} seconds"
+        )
+        report(60)
+
+        if show_states:
+            set_processing_state(track, Track.ProcessingState.ANALYZING)
+        try:
+            waveform_start = time.time()
+            if pcm is not None:
+                waveform_data, duration = generate_waveform_from_pcm(
+                    pcm, resolution=WAVEFORM_RESOLUTION
+                )
+            else:
+                # Without a PCM buffer, stream the MP3 we just wrote through
+                # ffmpeg in fixed-size blocks, so memory stays flat
+                waveform_data, duration = generate_waveform(
+                    converted_file_path, resolution=WAVEFORM_RESOLUTION
+                )
+            logger.info(
+                f"Waveform processing completed in {time.time() - waveform_start:.2f} seconds"
+            )
+        except Exception as e:
+            logger.error(f"Error processing audio: {str(e)}")
+            waveform_data, duration = [], 0
+        finally:
+            if pcm is not None:
+                pcm.close()
+        report(95)
+
+    track.audio_waveform_peaks = pack_pyramid(waveform_data)
+    track.audio_waveform_resolution = len(waveform_data)
+    # The decoded length is exact; the probed one covers failed analysis
+    track.audio_length = duration or track.audio_length
+    track.processing_state = Track.ProcessingState.READY
+    track.save(
+        update_fields=[
+            "audio_waveform_peaks",
+            "audio_waveform_resolution",
+            "audio_length",
+            "processing_state",
+            "updated_at",
+        ]
+    )
+    track.renditions.all().delete()
+    TrackRendition.objects.bulk_create(renditions.values())
+
+    if track.content_hash and not publish_content(track, source_path, mp3_storage_path):
+        # Another upload of the same audio won the race; keep only its copy
+        delete_track_files(track.audio_file)
+
+    logger.info(f"Generated waveform with {len(waveform_data)} data points")
+    logger.info(f"Audio duration: {duration} seconds")
+    logger.info(
+        f"Track {track_id} processed in {time.time() - total_start:.2f} seconds"
+    )
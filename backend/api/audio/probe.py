@@ -0,0 +1,109 @@
+import json
+import logging
+import subprocess
+
+logger = logging.getLogger("track_processing")
+
+
+class AudioMetadata:
+    """
+    Container and audio stream details read from a file's headers.
+
+    Any value ffprobe didn't report is None (or "" for the codec).
+    """
+
+    # Track (and AudioContent) fields filled from a probe, see as_fields()
+    FIELDS = ("audio_codec", "audio_sample_rate", "audio_channels", "audio_bitrate")
+
+    def __init__(
+        self,
+        duration=None,
+        codec="",
+        sample_rate=None,
+        channels=None,
+        bitrate=None,
+        format_name="",
+    ):
+        self.duration = duration
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # Kilobits per second, like TrackRendition.bitrate
+        self.bitrate = bitrate
+        self.format_name = format_name
+
+    def as_fields(self):
+        """Values for the model fields named in FIELDS"""
+        return {
+            "audio_codec": self.codec,
+            "audio_sample_rate": self.sample_rate,
+            "audio_channels": self.channels,
+            "audio_bitrate": self.bitrate,
+        }
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_audio(file_path):
+    """
+    Read duration, codec, sample rate, channels and bitrate with one ffprobe.
+
+    Only the container and stream headers are parsed, so this takes the same
+    time for a ten-second clip as for an hour-long mix.
+
+    Returns:
+        AudioMetadata, or None if ffprobe failed or found no audio stream
+    """
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_format",
+        "-show_streams",
+        "-of",
+        "json",
+        file_path,
+    ]
+    try:
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        info = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        logger.warning(f"Could not probe {file_path}: {e}")
+        return None
+
+    stream = next(
+        (s for s in info.get("streams", []) if s.get("codec_type") == "audio"), None
+    )
+    if stream is None:
+        logger.warning(f"No audio stream found in {file_path}")
+        return None
+    container = info.get("format", {})
+
+    duration = _number(container.get("duration")) or _number(stream.get("duration"))
+    bitrate = _number(container.get("bit_rate"), int) or _number(
+        stream.get("bit_rate"), int
+    )
+    return AudioMetadata(
+        duration=duration if duration and duration > 0 else None,
+        codec=stream.get("codec_name", ""),
+        sample_rate=_number(stream.get("sample_rate"), int),
+        channels=_number(stream.get("channels"), int),
+        bitrate=round(bitrate / 1000) if bitrate else None,
+        format_name=container.get("format_name", ""),
+    )
+
+
+def probe_duration(file_path):
+    """
+    Read a file's duration in seconds from its container header with ffprobe.
+
+    Returns:
+        The duration as a float, or None if it couldn't be determined
+    """
+    metadata = probe_audio(file_path)
+    return metadata.duration if metadata else None
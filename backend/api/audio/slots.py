@@ -0,0 +1,91 @@
+import fcntl
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger("track_processing")
+
+# Seconds between attempts while waiting for a slot
+SLOT_POLL_INTERVAL = 0.25
+
+
+class TranscoderBusy(Exception):
+    """
+    Raised when there is no capacity to take on another transcode.
+
+    `extensions` is copied onto the GraphQL error, so clients get a
+    machine-readable code and retry delay alongside the message.
+    """
+
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after or settings.TRANSCODE_RETRY_AFTER
+        self.extensions = {"code": "TRANSCODER_BUSY", "retryAfter": self.retry_after}
+        super().__init__(
+            f"The transcoder is busy. Please retry after {self.retry_after} seconds."
+        )
+
+
+def _try_lock(slot):
+    """Open and exclusively lock a slot's file, returning the fd or None"""
+    path = os.path.join(settings.TRANSCODE_LOCK_DIR, f"slot-{slot}.lock")
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _acquire(wait):
+    os.makedirs(settings.TRANSCODE_LOCK_DIR, exist_ok=True)
+    deadline = None if wait is None else time.monotonic() + wait
+    while True:
+        for slot in range(settings.TRANSCODE_SLOTS):
+            fd = _try_lock(slot)
+            if fd is not None:
+                return slot, fd
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TranscoderBusy()
+        time.sleep(SLOT_POLL_INTERVAL)
+
+
+@contextmanager
+def transcode_slot(wait=None):
+    """
+    Hold one of the TRANSCODE_SLOTS transcoding slots on this machine.
+
+    Slots are flock()ed files in TRANSCODE_LOCK_DIR, so the limit holds
+    across gunicorn workers and processing workers alike, and the kernel
+    releases a slot if its holder dies.
+
+    Args:
+        wait: Seconds to wait for a free slot, or None to wait indefinitely
+
+    Raises:
+        TranscoderBusy: If no slot freed up within `wait` seconds
+    """
+    slot, fd = _acquire(wait)
+    logger.info(f"Acquired transcoding slot {slot}")
+    try:
+        yield slot
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def wait_for_free_slot(wait):
+    """
+    Return once a transcoding slot is free, without keeping it.
+
+    Used for admission control before work is accepted; the slot is taken
+    for real when the transcode starts.
+
+    Raises:
+        TranscoderBusy: If every slot stayed taken for `wait` seconds
+    """
+    with transcode_slot(wait):
+        pass
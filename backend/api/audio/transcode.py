@@ -0,0 +1,252 @@
+import logging
+import os
+import subprocess
+import time
+from pathlib import Path
+
+import librosa
+from api.audio.probe import probe_duration
+from pydub import AudioSegment
+
+logger = logging.getLogger("track_processing")
+
+
+def get_audio_duration(file_path):
+    """Get the duration of an audio file in seconds."""
+    # ffprobe reads the container header instead of decoding the whole file
+    duration = probe_duration(file_path)
+    if duration is not None:
+        return round(duration)
+
+    try:
+        # Headerless or unusual files still need a full decode
+        audio = AudioSegment.from_file(file_path)
+        return round(len(audio) / 1000)
+    except Exception as e:
+        logger.error(f"Error getting audio duration with pydub: {str(e)}")
+        try:
+            # Fallback to librosa
+            y, sr = librosa.load(file_path, sr=None)
+            duration = librosa.get_duration(y=y, sr=sr)
+            return round(duration)
+        except Exception as e:
+            logger.error(f"Error getting audio duration with librosa: {str(e)}")
+            return 0
+
+
+def convert_audio_to_mp3(input_file_path, output_dir):
+    """
+    Convert audio file to MP3 format for cross-browser compatibility.
+
+    Args:
+        input_file_path: Path to the input audio file
+        output_dir: Directory to save the converted file
+
+    Returns:
+        Path to the converted MP3 file, or None if conversion failed
+    """
+    start_time = time.time()
+    logger.info(f"Starting MP3 conversion for {input_file_path}")
+    try:
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Generate output file path with .mp3 extension
+        output_filename = f"{Path(input_file_path).stem}.mp3"
+        output_file_path = os.path.join(output_dir, output_filename)
+
+        # Try using pydub first (faster and no subprocess needed)
+        try:
+            pydub_start = time.time()
+            audio = AudioSegment.from_file(input_file_path)
+            # Export as MP3 with good quality
+            audio.export(output_file_path, format="mp3", bitrate="192k")
+            pydub_end = time.time()
+            logger.info(f"Pydub conversion took {pydub_end - pydub_start:.2f} seconds")
+
+            if (
+                os.path.exists(output_file_path)
+                and os.path.getsize(output_file_path) > 0
+            ):
+                end_time = time.time()
+                logger.info(
+                    f"MP3 conversion successful, took {end_time - start_time:.2f} seconds"
+                )
+                return output_file_path
+            else:
+                logger.warning("Pydub conversion failed, falling back to ffmpeg")
+        except Exception as e:
+            logger.warning(f"Pydub conversion error, falling back to ffmpeg: {str(e)}")
+
+        # Fallback to ffmpeg
+        command = [
+            "ffmpeg",
+            "-y",
+            "-i",
+            input_file_path,
+            "-vn",
+            "-ar",
+            "44100",
+            "-ac",
+            "2",
+            "-b:a",
+            "192k",
+            output_file_path,
+        ]
+
+        # Run the command
+        cmd_start = time.time()
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        cmd_end = time.time()
+        logger.info(f"ffmpeg subprocess took {cmd_end - cmd_start:.2f} seconds")
+
+        # Verify the file was created and has content
+        if os.path.exists(output_file_path) and os.path.getsize(output_file_path) > 0:
+            end_time = time.time()
+            logger.info(
+                f"MP3 conversion successful, took {end_time - start_time:.2f} seconds"
+            )
+            return output_file_path
+        else:
+            end_time = time.time()
+            logger.error("FFmpeg completed but output file is missing or empty")
+            logger.info(f"Failed conversion took {end_time - start_time:.2f} seconds")
+            return None
+
+    except subprocess.CalledProcessError as e:
+        end_time = time.time()
+        logger.error(f"Error converting audio with ffmpeg (exit code {e.returncode})")
+        logger.error(f"Command: {' '.join(command)}")
+        logger.error(f"stdout: {e.stdout}")
+        err_msg = f"stderr: {e.stderr}"
+        logger.error(err_msg)
+        logger.info(f"Failed MP3 conversion took {end_time - start_time:.2f} seconds")
+        return None
+    except Exception as e:
+        end_time = time.time()
+        logger.error(f"Unexpected error converting audio: {str(e)}")
+        import traceback
+
+        logger.error(traceback.format_exc())
+        logger.info(f"Failed MP3 conversion took {end_time - start_time:.2f} seconds")
+        return None
+
+
+# ffmpeg encoder, file extension and MIME type for each rendition codec
+RENDITION_CODECS = {
+    "mp3": {"encoder": "libmp3lame", "extension": "mp3", "mime_type": "audio/mpeg"},
+    "opus": {
+        "encoder": "libopus",
+        "extension": "opus",
+        "mime_type": "audio/ogg; codecs=opus",
+    },
+    "aac": {"encoder": "aac", "extension": "m4a", "mime_type": "audio/mp4"},
+}
+
+
+def encode_renditions_from_pcm(pcm, output_dir, name, renditions):
+    """
+    Encode an already decoded PcmBuffer to several renditions in one pass.
+
+    A single ffmpeg process reads the PCM once and writes every output.
+
+    Args:
+        pcm: PcmBuffer produced by decode_to_pcm
+        output_dir: Directory to save the encoded files, one subdirectory
+            per rendition
+        name: File name (without extension) for each rendition
+        renditions: Rendition specs with name, codec and bitrate keys
+
+    Returns:
+        Dict of rendition name to encoded file path, or None if encoding failed
+    """
+    start_time = time.time()
+    command = ["ffmpeg", "-y", *pcm.ffmpeg_input_args()]
+    outputs = {}
+    for rendition in renditions:
+        codec = RENDITION_CODECS[rendition["codec"]]
+        rendition_dir = os.path.join(output_dir, rendition["name"])
+        os.makedirs(rendition_dir, exist_ok=True)
+        output_file_path = os.path.join(rendition_dir, f"{name}.{codec['extension']}")
+        command += ["-c:a", codec["encoder"], "-b:a", rendition["bitrate"]]
+        command.append(output_file_path)
+        outputs[rendition["name"]] = output_file_path
+
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(
+            f"Error encoding renditions with ffmpeg (exit code {e.returncode})"
+        )
+        logger.error(f"stderr: {e.stderr}")
+        return None
+
+    for output_file_path in outputs.values():
+        if (
+            not os.path.exists(output_file_path)
+            or os.path.getsize(output_file_path) == 0
+        ):
+            logger.error(f"FFmpeg completed but {output_file_path} is missing or empty")
+            return None
+
+    logger.info(
+        f"Encoded {len(outputs)} rendition(s) in {time.time() - start_time:.2f} seconds"
+    )
+    return outputs
+
+
+def encode_hls_from_pcm(
+    pcm, output_dir, segment_seconds=6, bitrate="128k", segment_type="fmp4"
+):
+    """
+    Encode a PcmBuffer to an HLS playlist of AAC segments.
+
+    Args:
+        pcm: PcmBuffer produced by decode_to_pcm
+        output_dir: Directory for the playlist and its segments
+        segment_seconds: Target segment duration
+        bitrate: AAC bitrate
+        segment_type: "fmp4" or "mpegts"
+
+    Returns:
+        Path to the index.m3u8 playlist, or None if encoding failed
+    """
+    start_time = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    extension = "m4s" if segment_type == "fmp4" else "ts"
+    manifest_path = os.path.join(output_dir, "index.m3u8")
+
+    command = [
+        "ffmpeg",
+        "-y",
+        *pcm.ffmpeg_input_args(),
+        "-c:a",
+        "aac",
+        "-b:a",
+        bitrate,
+        "-f",
+        "hls",
+        "-hls_time",
+        str(segment_seconds),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_type",
+        segment_type,
+        "-hls_segment_filename",
+        os.path.join(output_dir, f"segment_%05d.{extension}"),
+        manifest_path,
+    ]
+
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error encoding HLS with ffmpeg (exit code {e.returncode})")
+        logger.error(f"stderr: {e.stderr}")
+        return None
+
+    if not os.path.exists(manifest_path):
+        logger.error("FFmpeg completed but the HLS playlist is missing")
+        return None
+
+    logger.info(f"HLS encoding took {time.time() - start_time:.2f} seconds")
+    return manifest_path
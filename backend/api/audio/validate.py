@@ -0,0 +1,139 @@
+import logging
+import os
+import tempfile
+
+from api.audio.probe import probe_audio
+from api.utils import local_storage_path, storage_url
+from django.conf import settings
+
+logger = logging.getLogger("track_processing")
+
+# Bytes read from the start of a file to recognize its container
+SNIFF_BYTES = 16
+
+
+class UploadValidationError(Exception):
+    """Raised when an upload isn't audio we can accept"""
+
+
+def sniff_container(head):
+    """
+    Recognize an audio container from the first bytes of a file.
+
+    Returns a short container name, or None for anything unrecognized.
+    """
+    if head.startswith(b"ID3"):
+        return "mp3"
+    if len(head) >= 2 and head[0] == 0xFF:
+        # ADTS AAC and MPEG audio frames both start with an 0xFFF sync word
+        if head[1] & 0xF6 == 0xF0:
+            return "aac"
+        if head[1] & 0xE0 == 0xE0:
+            return "mp3"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"FORM") and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"caff"):
+        return "caf"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "matroska"
+    return None
+
+
+def check_upload_size(size):
+    """Reject empty uploads and those over UPLOAD_MAX_SIZE"""
+    if size <= 0:
+        raise UploadValidationError("Upload size must be greater than zero")
+    if size > settings.UPLOAD_MAX_SIZE:
+        limit_mb = settings.UPLOAD_MAX_SIZE / (1024 * 1024)
+        raise UploadValidationError(
+            f"File is too large; the limit is {limit_mb:.0f} MB"
+        )
+
+
+def check_metadata(metadata):
+    """Reject probed audio with a disallowed codec or over UPLOAD_MAX_DURATION"""
+    if metadata is None:
+        raise UploadValidationError("The file doesn't contain playable audio")
+
+    allowed = settings.UPLOAD_ALLOWED_CODECS
+    if not any(
+        metadata.codec == codec or metadata.codec.startswith(f"{codec}_")
+        for codec in allowed
+    ):
+        raise UploadValidationError(
+            f"Unsupported audio codec '{metadata.codec}'. "
+            f"Please upload {', '.join(allowed)} audio."
+        )
+
+    if metadata.duration and metadata.duration > settings.UPLOAD_MAX_DURATION:
+        limit_minutes = settings.UPLOAD_MAX_DURATION / 60
+        raise UploadValidationError(
+            f"Audio is too long; the limit is {limit_minutes:.0f} minutes"
+        )
+    return metadata
+
+
+def validate_upload(file, path=None):
+    """
+    Check an uploaded file before anything is written to the database or storage.
+
+    The size is checked first, then the container is sniffed from the first
+    few bytes, so obvious garbage is rejected without starting ffprobe. Only
+    then are the headers probed for the codec and duration.
+
+    Args:
+        file: The uploaded file (read position is restored)
+        path: Local path of the file, if it's already on disk
+
+    Returns:
+        The probed AudioMetadata
+
+    Raises:
+        UploadValidationError: If the upload should be refused
+    """
+    check_upload_size(file.size)
+
+    file.seek(0)
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    if sniff_container(head) is None:
+        raise UploadValidationError("The file isn't a recognized audio format")
+
+    if path is None and hasattr(file, "temporary_file_path"):
+        path = file.temporary_file_path()
+    if path is not None:
+        return check_metadata(probe_audio(path))
+
+    # Small uploads are held in memory; ffprobe needs them on disk
+    _, ext = os.path.splitext(file.name or "")
+    with tempfile.NamedTemporaryFile(
+        suffix=ext, dir=settings.TRACK_SCRATCH_DIR
+    ) as scratch:
+        for chunk in file.chunks():
+            scratch.write(chunk)
+        scratch.flush()
+        file.seek(0)
+        return check_metadata(probe_audio(scratch.name))
+
+
+def validate_stored_upload(storage_path):
+    """
+    Check an upload that was PUT straight to storage, without downloading it.
+
+    ffprobe reads only the headers, over ranged requests on R2.
+
+    Raises:
+        UploadValidationError: If the upload should be refused
+    """
+    location = local_storage_path(storage_path) or storage_url(
+        storage_path, expiration=600
+    )
+    return check_metadata(probe_audio(location))
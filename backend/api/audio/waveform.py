@@ -0,0 +1,273 @@
+import logging
+import time
+
+import librosa
+import numpy as np
+from api.audio.decode import PCM_CHANNELS, PCM_SAMPLE_RATE, stream_pcm_blocks
+from api.audio.probe import probe_duration
+from pydub import AudioSegment
+
+logger = logging.getLogger("track_processing")
+
+# Columns of the array returned by compute_waveform
+RMS, MIN, MAX = 0, 1, 2
+
+# pydub sample widths that map directly onto a NumPy dtype
+PYDUB_SAMPLE_DTYPES = {2: np.int16, 4: np.int32}
+
+
+def compute_waveform(samples, resolution=200, channels=1):
+    """
+    Compute per-bucket RMS and min/max peaks for a whole sample buffer.
+
+    The buffer is viewed as a (resolution, step * channels) array without
+    copying, so each bucket is one row and every statistic is a single
+    vectorized reduction across rows. Buckets always hold whole frames,
+    which keeps interleaved stereo channels together. Trailing frames that
+    don't fill a bucket are ignored.
+
+    Args:
+        samples: Flat (interleaved) sample array, integer or float
+        resolution: Number of buckets to produce
+        channels: Number of interleaved channels in samples
+
+    Returns:
+        float32 array of shape (buckets, 3) with RMS, MIN and MAX columns,
+        in the units of the input samples
+    """
+    samples = np.asarray(samples)
+    frame_count = len(samples) // channels
+    resolution = min(resolution, frame_count)
+    if resolution == 0:
+        return np.zeros((0, 3), dtype=np.float32)
+
+    step = frame_count // resolution
+    buckets = samples[: resolution * step * channels].reshape(
+        resolution, step * channels
+    )
+
+    # einsum accumulates in float32 without materializing a float copy
+    sum_squares = np.einsum("ij,ij->i", buckets, buckets, dtype=np.float32)
+
+    waveform = np.empty((resolution, 3), dtype=np.float32)
+    waveform[:, RMS] = np.sqrt(sum_squares / buckets.shape[1])
+    waveform[:, MIN] = buckets.min(axis=1)
+    waveform[:, MAX] = buckets.max(axis=1)
+    return waveform
+
+
+class StreamingWaveform:
+    """
+    Incremental per-bucket RMS and peak statistics for streamed audio.
+
+    Bucket boundaries are fixed up front from the expected frame count
+    (normally derived from the ffprobe duration), so each block only
+    updates running sums and memory stays constant for any track length.
+    Frames beyond the expected count land in the last bucket.
+    """
+
+    def __init__(self, expected_frames, resolution=200, channels=1):
+        self.resolution = max(1, min(resolution, expected_frames))
+        self.expected_frames = max(1, expected_frames)
+        self.channels = channels
+        self.frames_seen = 0
+        self.sum_squares = np.zeros(self.resolution, dtype=np.float64)
+        self.sample_counts = np.zeros(self.resolution, dtype=np.int64)
+        self.mins = np.zeros(self.resolution, dtype=np.float32)
+        self.maxs = np.zeros(self.resolution, dtype=np.float32)
+
+    def feed(self, block):
+        """Add a flat interleaved block of whole frames"""
+        samples = np.asarray(block)
+        frame_count = len(samples) // self.channels
+        if frame_count == 0:
+            return
+
+        # Buckets this block spans, and the frame offset where each one starts.
+        # Frame f belongs to bucket floor(f * resolution / expected_frames).
+        last_bucket = self.resolution - 1
+        first = min(
+            self.frames_seen * self.resolution // self.expected_frames, last_bucket
+        )
+        last = min(
+            (self.frames_seen + frame_count - 1)
+            * self.resolution
+            // self.expected_frames,
+            last_bucket,
+        )
+        touched = np.arange(first, last + 1)
+        boundaries = -(-touched[1:] * self.expected_frames // self.resolution)
+        starts = np.concatenate(([0], boundaries - self.frames_seen)) * self.channels
+        lengths = np.diff(starts, append=frame_count * self.channels)
+
+        samples = samples[: frame_count * self.channels]
+        squares = np.square(samples, dtype=np.float64)
+        block_mins = np.minimum.reduceat(samples, starts)
+        block_maxs = np.maximum.reduceat(samples, starts)
+
+        fresh = self.sample_counts[touched] == 0
+        self.mins[touched] = np.where(
+            fresh, block_mins, np.minimum(self.mins[touched], block_mins)
+        )
+        self.maxs[touched] = np.where(
+            fresh, block_maxs, np.maximum(self.maxs[touched], block_maxs)
+        )
+        self.sum_squares[touched] += np.add.reduceat(squares, starts)
+        self.sample_counts[touched] += lengths
+        self.frames_seen += frame_count
+
+    def result(self):
+        """Statistics in the same (buckets, 3) layout as compute_waveform"""
+        waveform = np.zeros((self.resolution, 3), dtype=np.float32)
+        filled = self.sample_counts > 0
+        waveform[filled, RMS] = np.sqrt(
+            self.sum_squares[filled] / self.sample_counts[filled]
+        )
+        waveform[:, MIN] = self.mins
+        waveform[:, MAX] = self.maxs
+        return waveform
+
+
+def normalize_waveform(values):
+    """Scale values to 0-1 and round to 2 decimals for storage"""
+    values = np.asarray(values, dtype=np.float32)
+    peak = values.max() if len(values) else 0
+    if peak > 0:
+        values = values / peak
+    return np.round(values, 2).tolist()
+
+
+def generate_waveform_pydub(file_path, resolution=200):
+    start_time = time.time()
+    logger.info(f"Starting pydub waveform generation for {file_path}")
+    try:
+        # Load audio file with pydub
+        load_start = time.time()
+        audio = AudioSegment.from_file(file_path)
+        duration = len(audio) / 1000  # Duration in seconds
+        load_end = time.time()
+        logger.info(f"Pydub audio loading took {load_end - load_start:.2f} seconds")
+
+        # View the raw PCM in place rather than copying it into an array.array
+        waveform_start = time.time()
+        dtype = PYDUB_SAMPLE_DTYPES.get(audio.sample_width)
+        if dtype is not None:
+            samples = np.frombuffer(audio.raw_data, dtype=dtype)
+        else:
+            samples = np.asarray(audio.get_array_of_samples())
+        waveform = compute_waveform(samples, resolution, audio.channels)
+
+        waveform_end = time.time()
+        logger.info(
+            f"Waveform calculation took {waveform_end - waveform_start:.2f} seconds"
+        )
+
+        # Normalize to 0-1
+        waveform_data = normalize_waveform(waveform[:, RMS])
+
+        end_time = time.time()
+        logger.info(
+            f"Total waveform generation took {end_time - start_time:.2f} seconds"
+        )
+        return waveform_data, round(duration)
+    except Exception as e:
+        end_time = time.time()
+        logger.error(f"Error generating waveform with pydub: {str(e)}")
+        logger.info(f"Falling back to librosa")
+        # Fallback to librosa
+        return generate_waveform_librosa(file_path, resolution)
+
+
+def generate_waveform_librosa(file_path, resolution=200):
+    """Legacy waveform generator using librosa (slower but more robust)."""
+    start_time = time.time()
+    logger.info(f"Starting librosa waveform generation for {file_path}")
+    try:
+        # Load the audio file with librosa
+        load_start = time.time()
+        y, sr = librosa.load(file_path, sr=None, res_type="kaiser_fast")
+        load_end = time.time()
+        logger.info(f"Audio loading took {load_end - load_start:.2f} seconds")
+
+        # Calculate duration in seconds
+        duration = librosa.get_duration(y=y, sr=sr)
+
+        # Generate waveform data using RMS energy
+        waveform_start = time.time()
+        waveform = compute_waveform(y, resolution)
+        waveform_end = time.time()
+        logger.info(
+            f"Waveform calculation took {waveform_end - waveform_start:.2f} seconds"
+        )
+
+        # Normalize values between 0 and 1, clamped to 2 decimal points
+        waveform_data = normalize_waveform(waveform[:, RMS])
+
+        end_time = time.time()
+        logger.info(
+            f"Total waveform generation took {end_time - start_time:.2f} seconds"
+        )
+        return waveform_data, round(duration)
+    except Exception as e:
+        end_time = time.time()
+        logger.error(f"Error generating waveform: {str(e)}")
+        logger.info(
+            f"Failed waveform generation took {end_time - start_time:.2f} seconds"
+        )
+        return [], 0
+
+
+def generate_waveform_streaming(file_path, resolution=200):
+    """
+    Waveform generator that streams PCM from ffmpeg in fixed-size blocks.
+
+    Bucket boundaries come from the ffprobe duration, so peak memory is
+    constant regardless of track length. Falls back to pydub when the file
+    can't be probed or streamed.
+    """
+    start_time = time.time()
+    logger.info(f"Starting streaming waveform generation for {file_path}")
+
+    duration = probe_duration(file_path)
+    if duration is None:
+        logger.info(f"No probed duration, falling back to pydub")
+        return generate_waveform_pydub(file_path, resolution)
+
+    waveform = StreamingWaveform(
+        round(duration * PCM_SAMPLE_RATE), resolution, PCM_CHANNELS
+    )
+    try:
+        for block in stream_pcm_blocks(file_path):
+            waveform.feed(block)
+    except Exception as e:
+        logger.error(f"Error streaming waveform: {str(e)}")
+        logger.info(f"Falling back to pydub")
+        return generate_waveform_pydub(file_path, resolution)
+
+    if waveform.frames_seen == 0:
+        return [], 0
+
+    waveform_data = normalize_waveform(waveform.result()[:, RMS])
+    logger.info(
+        f"Total waveform generation took {time.time() - start_time:.2f} seconds"
+    )
+    # The decoded frame count is exact, unlike the container's estimate
+    return waveform_data, round(waveform.frames_seen / PCM_SAMPLE_RATE)
+
+
+# Stream by default so hour-long uploads don't have to fit in memory
+generate_waveform = generate_waveform_streaming
+
+
+def generate_waveform_from_pcm(pcm, resolution=200):
+    """
+    Compute waveform data and duration from a decoded PcmBuffer.
+
+    Reads straight out of the memory-mapped samples, so no extra decode is
+    needed after transcoding.
+    """
+    start_time = time.time()
+    waveform = compute_waveform(pcm.samples, resolution, pcm.channels)
+    waveform_data = normalize_waveform(waveform[:, RMS])
+    logger.info(f"Waveform calculation took {time.time() - start_time:.2f} seconds")
+    return waveform_data, round(pcm.duration)
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+
+from api.audio.probe import AudioMetadata
+from api.models import AudioContent, Track, TrackRendition
+from api.tombstones import bury
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger("track_processing")
+
+
+def hash_upload(file):
+    """
+    Return the SHA-256 hex digest of an uploaded file.
+
+    Uploads parsed by the hashing upload handlers already carry the digest,
+    computed while the request body was written to disk. Anything else is
+    hashed here, one chunk at a time.
+    """
+    digest = getattr(file, "sha256", None)
+    if digest:
+        return digest
+
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a local file"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def copy_renditions(track, content, source=None):
+    """
+    Give a track the same rendition records as the other tracks on content.
+
+    Copies from `source` when given, otherwise from any other track.
+    """
+    if source is None:
+        source = content.tracks.exclude(pk=track.pk).first()
+    track.renditions.all().delete()
+    if source is None:
+        return
+    TrackRendition.objects.bulk_create(
+        [
+            TrackRendition(
+                track=track,
+                name=rendition.name,
+                codec=rendition.codec,
+                bitrate=rendition.bitrate,
+                mime_type=rendition.mime_type,
+                path=rendition.path,
+                size=rendition.size,
+            )
+            for rendition in source.renditions.all()
+        ]
+    )
+
+
+def reuse_content(track):
+    """
+    Point a track at already-processed content with the same hash.
+
+    Copies the shared waveform, duration, metadata and renditions onto the
+    track and marks it ready. Returns True if matching content was found.
+    """
+    if not track.content_hash or track.content_id:
+        return False
+
+    with transaction.atomic():
+        content = (
+            AudioContent.objects.select_for_update()
+            .filter(sha256=track.content_hash)
+            .first()
+        )
+        if content is None:
+            return False
+
+        AudioContent.objects.filter(pk=content.pk).update(ref_count=F("ref_count") + 1)
+        track.content = content
+        track.audio_length = content.audio_length
+        track.audio_waveform_peaks = content.audio_waveform_peaks
+        track.audio_waveform_resolution = content.audio_waveform_resolution
+        for field in AudioMetadata.FIELDS:
+            setattr(track, field, getattr(content, field))
+        track.processing_state = Track.ProcessingState.READY
+        track.save(
+            update_fields=[
+                "content",
+                "audio_length",
+                "audio_waveform_peaks",
+                "audio_waveform_resolution",
+                *AudioMetadata.FIELDS,
+                "processing_state",
+                "updated_at",
+            ]
+        )
+        copy_renditions(track, content)
+
+    logger.info(f"Track {track.id} reuses processed content {content.sha256[:12]}")
+    return True
+
+
+def publish_content(track, original_path, mp3_path):
+    """
+    Add a freshly processed track to the content index.
+
+    Returns True if the track's files became the shared copy, or False if
+    identical content was indexed first by another upload, in which case
+    the track now points at that entry and its own files are redundant.
+    """
+    if track.content_id:
+        # Reprocessed in place; the track already holds its reference
+        return True
+
+    with transaction.atomic():
+        content, created = AudioContent.objects.get_or_create(
+            sha256=track.content_hash,
+            defaults={
+                "base_path": track.audio_file,
+                "original_path": original_path,
+                "mp3_path": mp3_path,
+                "audio_length": track.audio_length,
+                "audio_waveform_peaks": track.audio_waveform_peaks,
+                "audio_waveform_resolution": track.audio_waveform_resolution,
+                **{field: getattr(track, field) for field in AudioMetadata.FIELDS},
+                "ref_count": 1,
+            },
+        )
+        if not created:
+            AudioContent.objects.filter(pk=content.pk).update(
+                ref_count=F("ref_count") + 1
+            )
+        track.content = content
+        Track.objects.filter(pk=track.pk).update(content=content)
+        if not created:
+            copy_renditions(track, content)
+    return created
+
+
+def sync_content(track, mp3_path):
+    """
+    Share a reprocessed track's results with its content and sibling tracks.
+
+    The track's files were rebuilt in the content's directory, so the index
+    entry and every other track on it take over its waveform, duration and
+    renditions.
+    """
+    content = track.content
+    shared_fields = {
+        "audio_length": track.audio_length,
+        "audio_waveform_peaks": track.audio_waveform_peaks,
+        "audio_waveform_resolution": track.audio_waveform_resolution,
+        **{field: getattr(track, field) for field in AudioMetadata.FIELDS},
+    }
+    with transaction.atomic():
+        AudioContent.objects.filter(pk=content.pk).update(
+            mp3_path=mp3_path, **shared_fields
+        )
+        siblings = list(content.tracks.exclude(pk=track.pk))
+        Track.objects.filter(pk__in=[sibling.pk for sibling in siblings]).update(
+            **shared_fields
+        )
+        for sibling in siblings:
+            copy_renditions(sibling, content, source=track)
+
+
+def release_content(content_id):
+    """
+    Drop one reference to shared content, deleting it with the last one.
+    """
+    with transaction.atomic():
+        content = AudioContent.objects.select_for_update().filter(pk=content_id).first()
+        if content is None:
+            return
+        if content.ref_count > 1:
+            AudioContent.objects.filter(pk=content.pk).update(
+                ref_count=F("ref_count") - 1
+            )
+            return
+        content.delete()
+        bury([content.base_path])
+
+    logger.info(f"Released last reference to content {content.sha256[:12]}")
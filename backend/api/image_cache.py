@@ -0,0 +1,145 @@
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+
+from api.images import render_avatar
+from api.utils import download_to_local_file, local_storage_path
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# Fraction of IMAGE_CACHE_MAX_BYTES left after the cache is pruned, so a
+# full cache isn't pruned again on every miss
+PRUNE_TARGET = 0.9
+
+
+def cached_variant_path(key, width, extension):
+    """Where a resized variant of the image stored under `key` is cached"""
+    return os.path.join(settings.IMAGE_CACHE_DIR, key, f"{width}.{extension}")
+
+
+def cache_size(root):
+    """Total bytes cached, with every cached file and its mtime"""
+    entries = []
+    total = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".lock"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    return total, entries
+
+
+def prune_cache():
+    """
+    Evict least recently used variants once the cache outgrows its limit.
+
+    A variant's mtime is bumped whenever it is served, so the oldest mtimes
+    are the least recently used.
+    """
+    limit = settings.IMAGE_CACHE_MAX_BYTES
+    total, entries = cache_size(settings.IMAGE_CACHE_DIR)
+    if total <= limit:
+        return
+    for _, size, path in sorted(entries):
+        if total <= limit * PRUNE_TARGET:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+    logger.info(f"Pruned the image cache to {total} bytes")
+
+
+def purge_cached_variants(key_prefix):
+    """Drop every cached variant under a key prefix, e.g. a user's id"""
+    shutil.rmtree(
+        os.path.join(settings.IMAGE_CACHE_DIR, key_prefix), ignore_errors=True
+    )
+
+
+def resize_stored_image(storage_path, output_path, width, extension):
+    """Render a variant of a stored image, fetching it first if it's remote"""
+    if not default_storage.exists(storage_path):
+        raise FileNotFoundError(storage_path)
+    local_path = local_storage_path(storage_path)
+    if local_path is not None:
+        return render_avatar(local_path, output_path, width, extension)
+
+    with tempfile.TemporaryDirectory(dir=settings.TRACK_SCRATCH_DIR) as temp_dir:
+        source = download_to_local_file(
+            storage_path, os.path.join(temp_dir, os.path.basename(storage_path))
+        )
+        return render_avatar(source, output_path, width, extension)
+
+
+def get_variant(key, storage_path, width, extension):
+    """
+    Return the path of a cached variant, resizing the original on a miss.
+
+    Concurrent requests for the same variant, from any thread or worker
+    process on this machine, wait on one flock()ed lock file so the original
+    is resized only once; the rest find the finished file when the lock is
+    released. Variants are written to a temporary name and renamed into
+    place, so a reader never sees a partial file.
+
+    Raises:
+        FileNotFoundError: If the original isn't in storage
+        ImageProcessingError: If the original can't be read as an image
+    """
+    path = cached_variant_path(key, width, extension)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path):
+                return path
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix=f".{extension}"
+            )
+            os.close(fd)
+            try:
+                resize_stored_image(storage_path, temp_path, width, extension)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    prune_cache()
+    return path
+
+
+def open_variant(key, storage_path, width, extension):
+    """
+    Open a cached variant for reading, resizing the original on a miss.
+
+    Another request's prune can remove the variant between get_variant()
+    returning and the file being opened, so a vanished variant is rendered
+    once more. An open file stays readable even if it is pruned later.
+
+    Raises:
+        FileNotFoundError: If the original isn't in storage
+        ImageProcessingError: If the original can't be read as an image
+    """
+    path = get_variant(key, storage_path, width, extension)
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        logger.info(f"Cached variant {path} was pruned before it was read")
+    return open(get_variant(key, storage_path, width, extension), "rb")
@@ -0,0 +1,104 @@
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Square avatar edge lengths in pixels; the largest is the profile_picture
+AVATAR_SIZES = (48, 128, 600)
+
+# Pillow save options for each avatar format, keyed by file extension
+AVATAR_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 85, "method": 4},
+    "jpg": {
+        "format": "JPEG",
+        "quality": 92,
+        "optimize": True,
+        "progressive": True,
+        "subsampling": "4:2:0",
+    },
+}
+
+# Refuse decompression bombs well before they exhaust memory
+MAX_IMAGE_PIXELS = 64_000_000
+
+
+class ImageProcessingError(Exception):
+    """Raised when an uploaded image can't be read or converted"""
+
+
+def open_image(source_path, target_size):
+    """
+    Open an image for downscaling to at most target_size pixels square.
+
+    JPEGs are opened in draft mode, which makes libjpeg decode at 1/2, 1/4 or
+    1/8 scale when that's still at least target_size, so a 40-megapixel
+    phone photo never has to be decoded at full resolution.
+    """
+    try:
+        image = Image.open(source_path)
+        # Only the header has been read so far
+        width, height = image.size
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ImageProcessingError(
+                f"Image is too large ({width}x{height}); please upload a smaller one"
+            )
+        image.draft("RGB", (target_size, target_size))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageProcessingError(f"Could not read image: {e}")
+
+    # Phones store portraits sideways and rely on the EXIF orientation
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        # JPEG has no alpha, so flatten transparent avatars onto white
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def avatar_variant_name(name, size, extension):
+    """File name of one avatar variant; the largest JPEG keeps the plain name"""
+    if size == max(AVATAR_SIZES) and extension == "jpg":
+        return f"{name}.jpg"
+    return f"{name}_{size}.{extension}"
+
+
+def render_avatar_variants(source_path, output_dir, name):
+    """
+    Center-crop an image to a square and save every avatar size and format.
+
+    Each size is scaled down from the previous (larger) one, and metadata
+    isn't carried over.
+
+    Args:
+        source_path: Path of the uploaded image
+        output_dir: Directory for the variants
+        name: File name (without size or extension) shared by the variants
+
+    Returns:
+        Dict of (size, extension) to the saved file's path
+
+    Raises:
+        ImageProcessingError: If the image can't be read
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    sizes = sorted(AVATAR_SIZES, reverse=True)
+    image = open_image(source_path, sizes[0])
+
+    variants = {}
+    for size in sizes:
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for extension, options in AVATAR_FORMATS.items():
+            path = os.path.join(output_dir, avatar_variant_name(name, size, extension))
+            image.save(path, **options)
+            variants[(size, extension)] = path
+    return variants
+
+
+def render_avatar(source_path, output_path, size, extension):
+    """Center-crop and resize an image to one size x size avatar"""
+    image = open_image(source_path, size)
+    image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    image.save(output_path, **AVATAR_FORMATS[extension])
+    return output_path
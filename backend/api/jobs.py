@@ -0,0 +1,259 @@
+import logging
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from api import pool
+from api.audio.pipeline import process_track, set_processing_state
+from api.audio.slots import TranscoderBusy, transcode_slot, wait_for_free_slot
+from api.models import ProcessingJob, Track
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger("track_processing")
+
+# Seconds to wait before retrying a failed job, doubled on every attempt
+RETRY_BACKOFF = 30
+
+
+def default_worker_id():
+    """Identify a worker process in job locks, e.g. "demooo-1234:5678" """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_track_processing(track, source_path):
+    """
+    Queue a track for background processing.
+
+    When TRACK_PROCESSING_EAGER is enabled the job runs immediately, in the
+    calling process, so the track is ready by the time this returns.
+    """
+    return enqueue_tracks_processing([(track, source_path)])[0]
+
+
+def enqueue_tracks_processing(uploads):
+    """
+    Queue several (track, source_path) pairs with a single insert.
+
+    In eager mode the jobs run right away, spread over the processing pool.
+    Returns the jobs in the same order as uploads.
+    """
+    jobs = ProcessingJob.objects.bulk_create(
+        [
+            ProcessingJob(track=track, source_path=source_path)
+            for track, source_path in uploads
+        ]
+    )
+    for job in jobs:
+        logger.info(f"Queued processing job {job.id} for track {job.track_id}")
+
+    if settings.TRACK_PROCESSING_EAGER:
+        worker_id = default_worker_id()
+        for job in jobs:
+            job.status = ProcessingJob.Status.RUNNING
+            job.attempts = 1
+            job.locked_at = timezone.now()
+            job.locked_by = worker_id
+        ProcessingJob.objects.bulk_update(
+            jobs, ["status", "attempts", "locked_at", "locked_by"]
+        )
+        run_jobs(jobs)
+
+    return jobs
+
+
+def check_processing_capacity():
+    """
+    Turn new uploads away while processing is saturated.
+
+    Eager uploads transcode inside the request, so one must find a free
+    transcoding slot within TRANSCODE_SLOT_WAIT seconds. The slot isn't kept;
+    run_job waits the same time again to take one, so an upload that loses
+    it to another request meanwhile fails busy rather than blocking. Queued
+    uploads are refused once TRACK_PROCESSING_MAX_QUEUE jobs are waiting or
+    running.
+
+    Raises:
+        TranscoderBusy: With the delay clients should wait before retrying
+    """
+    if settings.TRACK_PROCESSING_EAGER:
+        wait_for_free_slot(settings.TRANSCODE_SLOT_WAIT)
+        return
+
+    limit = settings.TRACK_PROCESSING_MAX_QUEUE
+    if not limit:
+        return
+    backlog = ProcessingJob.objects.filter(
+        status__in=[ProcessingJob.Status.QUEUED, ProcessingJob.Status.RUNNING]
+    ).count()
+    if backlog >= limit:
+        logger.warning(f"Refusing upload: {backlog} processing job(s) backlogged")
+        raise TranscoderBusy()
+
+
+def requeue_stale_jobs():
+    """Release jobs held by workers that died mid-run"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TRACK_PROCESSING_STALE_AFTER)
+    count = ProcessingJob.objects.filter(
+        status=ProcessingJob.Status.RUNNING, locked_at__lt=cutoff
+    ).update(status=ProcessingJob.Status.QUEUED, locked_at=None, locked_by="")
+    if count:
+        logger.warning(f"Requeued {count} stale processing job(s)")
+    return count
+
+
+def claim_next_job(worker_id=None):
+    """
+    Atomically claim the oldest runnable job.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so several workers can poll the
+    same table without handing out a job twice.
+    """
+    with transaction.atomic():
+        job = (
+            ProcessingJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ProcessingJob.Status.QUEUED, run_after__lte=timezone.now())
+            .order_by("run_after", "created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = ProcessingJob.Status.RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.locked_by = worker_id or default_worker_id()
+        job.save()
+        return job
+
+
+def run_job(job):
+    """
+    Run a claimed job to completion, recording the outcome on the job and track.
+
+    Failures are retried with exponential backoff until
+    TRACK_PROCESSING_MAX_ATTEMPTS is reached, after which the track is marked
+    failed and its original upload is removed.
+    """
+    try:
+        track = Track.objects.get(pk=job.track_id)
+    except Track.DoesNotExist:
+        # The track was deleted while the job waited in the queue
+        logger.info(f"Track for job {job.id} no longer exists, skipping")
+        return
+
+    def report_progress(progress):
+        job.progress = progress
+        ProcessingJob.objects.filter(pk=job.pk).update(
+            progress=progress, locked_at=timezone.now()
+        )
+
+    # Eager jobs hold a request open, so they only wait as long as admission
+    wait = settings.TRANSCODE_SLOT_WAIT if settings.TRACK_PROCESSING_EAGER else None
+    try:
+        # Bounded machine-wide, so concurrent uploads can't exhaust memory
+        with transcode_slot(wait):
+            process_track(track, job.source_path, report_progress=report_progress)
+    except Exception as e:
+        record_failure(job, track, e)
+        return
+
+    job.status = ProcessingJob.Status.DONE
+    job.progress = 100
+    job.error = ""
+    job.locked_at = None
+    job.locked_by = ""
+    job.save()
+
+
+def record_failure(job, track, error):
+    """
+    Record a failed attempt, requeueing the job with backoff if it has any left.
+
+    Once the attempts run out the track is marked failed and its original
+    upload is removed.
+    """
+    logger.error(f"Processing job {job.id} failed (attempt {job.attempts}): {error}")
+    job.error = str(error)
+    job.locked_at = None
+    job.locked_by = ""
+
+    # Eager jobs run inside a request, so there is nobody to retry them
+    retryable = not settings.TRACK_PROCESSING_EAGER
+    if retryable and job.attempts < settings.TRACK_PROCESSING_MAX_ATTEMPTS:
+        job.status = ProcessingJob.Status.QUEUED
+        job.run_after = timezone.now() + timedelta(
+            seconds=RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        )
+        job.save()
+        set_processing_state(track, Track.ProcessingState.PENDING)
+        return
+
+    job.status = ProcessingJob.Status.FAILED
+    job.save()
+    set_processing_state(track, Track.ProcessingState.FAILED)
+
+    # Clean up the original file since it can't be converted
+    try:
+        if job.source_path:
+            default_storage.delete(job.source_path)
+            logger.info(f"Original file deleted: {job.source_path}")
+    except Exception as e:
+        logger.error(f"Error cleaning up original file: {str(e)}")
+
+
+def fail_job(job_id, error):
+    """
+    Record the failure of a job whose pool worker raised or died.
+
+    run_job normally records its own outcome; this covers a crashed or
+    OOM-killed worker, which leaves the job claimed but unfinished.
+    """
+    job = (
+        ProcessingJob.objects.select_related("track")
+        .filter(pk=job_id, status=ProcessingJob.Status.RUNNING)
+        .first()
+    )
+    # Gone with its track, or its outcome was recorded before the worker died
+    if job is not None:
+        record_failure(job, job.track, error)
+
+
+def processing_pool(max_workers=None):
+    """
+    Process pool for running jobs in parallel.
+
+    Workers are spawned rather than forked so they never inherit the
+    parent's open database connections.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or settings.TRACK_PROCESSING_CONCURRENCY,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=pool.init_worker,
+    )
+
+
+def run_jobs(jobs):
+    """
+    Run claimed jobs, fanning out over a process pool when allowed.
+
+    Each job records its own outcome, so one failure never affects the
+    others. Runs inline when TRACK_PROCESSING_CONCURRENCY is 1.
+    """
+    concurrency = min(settings.TRACK_PROCESSING_CONCURRENCY, len(jobs))
+    if concurrency <= 1:
+        for job in jobs:
+            run_job(job)
+        return
+
+    with processing_pool(concurrency) as executor:
+        futures = {executor.submit(pool.run_job_by_id, job.id): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                fail_job(futures[future].id, e)
@@ -0,0 +1,320 @@
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from api.audio.decode import PCM_CHANNELS, PCM_SAMPLE_RATE, decode_to_pcm
+from api.audio.peaks import WAVEFORM_RESOLUTION, pack_pyramid
+from api.audio.pipeline import rendition_specs
+from api.audio.probe import probe_audio
+from api.audio.transcode import encode_renditions_from_pcm
+from api.audio.waveform import generate_waveform_from_pcm
+from api.utils import save_local_file
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+# ffmpeg output arguments for each synthesized upload format
+FORMATS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "flac": ["-c:a", "flac"],
+    # Phones and DAWs write the index last, like the test fixture
+    "m4a": ["-c:a", "aac", "-b:a", "256k"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "320k"],
+}
+
+STAGES = ("probe", "decode", "transcode", "waveform", "save")
+
+# Differences below these are noise, however large they are relatively
+METRIC_SLACK = {"wall": 0.05, "cpu": 0.05, "peak_rss_mb": 16}
+
+
+def parse_duration(value):
+    """Seconds from a value like 90, 90s, 10m or 1.5h"""
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except (IndexError, ValueError):
+        raise CommandError(f"Invalid duration: {value}")
+
+
+def duration_label(seconds):
+    if seconds >= 60 and seconds % 60 == 0:
+        return f"{seconds / 60:g}m"
+    return f"{seconds:g}s"
+
+
+def reset_peak_rss():
+    """
+    Reset this process's RSS high-water mark, if the kernel allows it.
+
+    Returns whether it was reset; otherwise peaks are the process-wide maximum.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """RSS high-water mark of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds():
+    """User and system time of this process and its finished children"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def measure(fn):
+    """
+    Run fn and return its result with wall time, CPU time and peak RSS.
+
+    CPU time includes ffmpeg and ffprobe. Their memory is reported
+    separately: the kernel only keeps a running maximum across children, so
+    child_peak_rss_mb is the largest child so far rather than this stage's.
+    """
+    reset_peak_rss()
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    result = fn()
+    metrics = {
+        "wall": time.perf_counter() - wall_start,
+        "cpu": cpu_seconds() - cpu_start,
+        "peak_rss_mb": peak_rss_mb(),
+        "child_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        / 1024,
+    }
+    return result, metrics
+
+
+def synthesize(path, seconds, fmt):
+    """Write `seconds` of stereo test audio (a tone over pink noise) to path"""
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:sample_rate={PCM_SAMPLE_RATE}:duration={seconds}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"anoisesrc=color=pink:amplitude=0.2:sample_rate={PCM_SAMPLE_RATE}"
+        f":duration={seconds}",
+        "-filter_complex",
+        "amix=inputs=2",
+        "-ac",
+        str(PCM_CHANNELS),
+        *FORMATS[fmt],
+        path,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise CommandError(f"Could not synthesize {fmt} audio: {e.stderr}")
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare results against a baseline from an earlier run.
+
+    A metric regresses when it is more than `threshold` (a fraction) above
+    the baseline and also past METRIC_SLACK, so tiny stages don't flap.
+    Cases or stages missing from the baseline are skipped.
+
+    Returns a list of human-readable descriptions.
+    """
+    regressions = []
+    for case, stages in results.items():
+        for stage, metrics in stages.items():
+            expected = baseline.get(case, {}).get(stage)
+            if not expected:
+                continue
+            for metric, slack in METRIC_SLACK.items():
+                if metric not in expected or metric not in metrics:
+                    continue
+                limit = max(
+                    expected[metric] * (1 + threshold), expected[metric] + slack
+                )
+                if metrics[metric] > limit:
+                    regressions.append(
+                        f"{case} {stage} {metric}: {metrics[metric]:.2f} "
+                        f"(baseline {expected[metric]:.2f})"
+                    )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark each audio pipeline stage on synthesized uploads and check "
+        "for regressions against a baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--durations",
+            default="10s,10m,90m",
+            help="Comma-separated lengths of synthetic audio, e.g. 10s,10m,1.5h",
+        )
+        parser.add_argument(
+            "--formats",
+            default=",".join(FORMATS),
+            help=f"Comma-separated upload formats ({', '.join(FORMATS)})",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1,
+            help="Runs per case (the best of each metric is kept)",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument(
+            "--baseline", help="Fail if a stage regresses against this JSON file"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed fraction over the baseline (default: 0.25)",
+        )
+
+    def handle(self, *args, **options):
+        durations = [parse_duration(d) for d in options["durations"].split(",")]
+        formats = options["formats"].split(",")
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise CommandError(f"Unknown format(s): {', '.join(sorted(unknown))}")
+
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)["results"]
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        if not reset_peak_rss():
+            self.stdout.write(
+                "Can't reset the RSS high-water mark here; "
+                "peak RSS is the process-wide maximum"
+            )
+
+        results = {}
+        with tempfile.TemporaryDirectory(dir=settings.TRACK_SCRATCH_DIR) as temp_dir:
+            for seconds in durations:
+                for fmt in formats:
+                    case = f"{fmt}-{duration_label(seconds)}"
+                    source = os.path.join(temp_dir, f"source.{fmt}")
+                    synthesize(source, seconds, fmt)
+                    runs = [
+                        self.run_case(source, temp_dir, case)
+                        for _ in range(max(1, options["repeat"]))
+                    ]
+                    results[case] = {
+                        stage: {
+                            metric: min(run[stage][metric] for run in runs)
+                            for metric in runs[0][stage]
+                        }
+                        for stage in STAGES
+                    }
+                    self.report(case, results[case])
+                    os.remove(source)
+
+        output = {
+            "created_at": timezone.now().isoformat(),
+            "machine": {
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "storage": type(default_storage).__name__,
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(output, f, indent=2)
+            self.stdout.write(f"Wrote results to {options['output']}")
+
+        if baseline is not None:
+            regressions = find_regressions(results, baseline, options["threshold"])
+            if regressions:
+                raise CommandError(
+                    "Regressed against the baseline:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def run_case(self, source, temp_dir, case):
+        """Run every stage once on one synthesized upload"""
+        scratch_dir = tempfile.mkdtemp(dir=temp_dir)
+        metrics = {}
+
+        _, metrics["probe"] = measure(lambda: probe_audio(source))
+        pcm, metrics["decode"] = measure(lambda: decode_to_pcm(source, scratch_dir))
+        if pcm is None:
+            raise CommandError(f"Could not decode {case}")
+        try:
+            encoded, metrics["transcode"] = measure(
+                lambda: encode_renditions_from_pcm(
+                    pcm, scratch_dir, "bench", rendition_specs()
+                )
+            )
+            if not encoded:
+                raise CommandError(f"Could not encode {case}")
+            _, metrics["waveform"] = measure(
+                lambda: pack_pyramid(
+                    generate_waveform_from_pcm(pcm, WAVEFORM_RESOLUTION)[0]
+                )
+            )
+        finally:
+            pcm.close()
+
+        saved = []
+
+        def save():
+            for name, local_path in encoded.items():
+                saved.append(
+                    save_local_file(
+                        f"bench/{case}/{name}/{os.path.basename(local_path)}",
+                        local_path,
+                    )
+                )
+
+        try:
+            _, metrics["save"] = measure(save)
+        finally:
+            for name in saved:
+                default_storage.delete(name)
+            shutil.rmtree(scratch_dir)
+        return metrics
+
+    def report(self, case, stages):
+        self.stdout.write(case)
+        for stage in STAGES:
+            m = stages[stage]
+            self.stdout.write(
+                f"  {stage:<10} {m['wall']:8.2f}s wall {m['cpu']:8.2f}s cpu "
+                f"{m['peak_rss_mb']:8.1f} MB peak"
+            )
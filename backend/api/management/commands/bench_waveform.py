@@ -0,0 +1,64 @@
+import array
+import time
+
+import numpy as np
+from api.audio.decode import PCM_CHANNELS, PCM_SAMPLE_RATE
+from api.audio.waveform import RMS, compute_waveform, normalize_waveform
+from django.core.management.base import BaseCommand
+
+
+def legacy_waveform(samples, resolution):
+    """The per-chunk loop the waveform generators used before compute_waveform"""
+    step_size = max(1, len(samples) // resolution)
+    waveform_data = []
+    for i in range(0, len(samples), step_size):
+        if len(waveform_data) >= resolution:
+            break
+        chunk = samples[i : i + step_size]
+        if len(chunk) > 0:
+            rms = np.sqrt(np.mean(np.array(chunk).astype(np.float32) ** 2))
+            waveform_data.append(float(rms))
+    return waveform_data
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized waveform engine with the old per-chunk loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes", type=float, default=60, help="Length of synthetic audio"
+        )
+        parser.add_argument("--resolution", type=int, default=200)
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Runs per engine (best is kept)"
+        )
+
+    def handle(self, *args, **options):
+        frames = int(options["minutes"] * 60 * PCM_SAMPLE_RATE)
+        resolution = options["resolution"]
+        self.stdout.write(
+            f"Synthesizing {options['minutes']:g} minutes of stereo int16 audio..."
+        )
+        rng = np.random.default_rng(0)
+        samples = (rng.standard_normal(frames * PCM_CHANNELS) * 4000).astype(np.int16)
+        # pydub hands the old loop an array.array, so benchmark it the same way
+        legacy_samples = array.array("h", samples.tobytes())
+
+        def best_of(fn):
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        legacy = best_of(lambda: legacy_waveform(legacy_samples, resolution))
+        vectorized = best_of(
+            lambda: normalize_waveform(
+                compute_waveform(samples, resolution, PCM_CHANNELS)[:, RMS]
+            )
+        )
+
+        self.stdout.write(f"Per-chunk loop (RMS only):  {legacy * 1000:8.1f} ms")
+        self.stdout.write(f"Vectorized (RMS + peaks):   {vectorized * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {legacy / vectorized:.1f}x"))
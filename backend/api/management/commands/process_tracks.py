@@ -0,0 +1,162 @@
+import logging
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from api.jobs import (
+    claim_next_job,
+    default_worker_id,
+    fail_job,
+    processing_pool,
+    requeue_stale_jobs,
+    run_job,
+)
+from api.pool import run_job_by_id
+from api.tombstones import purge_tombstones
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+logger = logging.getLogger("track_processing")
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the background worker that transcodes and analyzes uploaded tracks "
+        "and purges the files of deleted ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling forever",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Jobs to run in parallel (defaults to TRACK_PROCESSING_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--worker-id",
+            default=None,
+            help="Name recorded on claimed jobs (defaults to host:pid)",
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = (
+            options["poll_interval"] or settings.TRACK_PROCESSING_POLL_INTERVAL
+        )
+        concurrency = options["concurrency"] or settings.TRACK_PROCESSING_CONCURRENCY
+        worker_id = options["worker_id"] or default_worker_id()
+        self.stopping = False
+
+        # Finish the current jobs on SIGTERM/SIGINT instead of dying mid-upload
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        self.stdout.write(
+            f"Track processing worker {worker_id} started "
+            f"(concurrency {concurrency})"
+        )
+        if concurrency <= 1:
+            processed = self.run_serial(worker_id, poll_interval, options["once"])
+        else:
+            processed = self.run_pooled(
+                worker_id, poll_interval, options["once"], concurrency
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Worker {worker_id} stopped after {processed} job(s)")
+        )
+
+    def run_serial(self, worker_id, poll_interval, once):
+        processed = 0
+        while not self.stopping:
+            close_old_connections()
+            requeue_stale_jobs()
+
+            job = claim_next_job(worker_id)
+            if job is None:
+                # Purge deleted files while there's nothing to transcode
+                if purge_tombstones(worker_id):
+                    continue
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f"Processing track {job.track_id} (job {job.id})")
+            run_job(job)
+            processed += 1
+        return processed
+
+    def run_pooled(self, worker_id, poll_interval, once, concurrency):
+        """
+        Keep up to `concurrency` jobs in flight on a process pool.
+
+        A job whose worker raises or dies is recorded as a failed attempt.
+        If a worker is killed (e.g. by the OOM killer) the whole pool breaks,
+        so every job still on it fails and a fresh pool takes over.
+        """
+        processed = 0
+        in_flight = {}
+        pool = processing_pool(concurrency)
+        try:
+            while in_flight or not self.stopping:
+                close_old_connections()
+                requeue_stale_jobs()
+
+                while not self.stopping and len(in_flight) < concurrency:
+                    job = claim_next_job(worker_id)
+                    if job is None:
+                        break
+                    self.stdout.write(f"Processing track {job.track_id} (job {job.id})")
+                    in_flight[pool.submit(run_job_by_id, job.id)] = job.id
+
+                if not in_flight:
+                    # Purge deleted files while there's nothing to transcode
+                    if purge_tombstones(worker_id):
+                        continue
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(
+                    in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                broken = False
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    processed += 1
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Processing worker for job {job_id} failed: {e}")
+                        fail_job(job_id, e)
+                        broken = broken or isinstance(e, BrokenProcessPool)
+
+                if broken:
+                    # The rest of the pool's futures fail with it
+                    for future, job_id in in_flight.items():
+                        processed += 1
+                        fail_job(job_id, future.exception())
+                    in_flight = {}
+                    pool.shutdown(wait=False)
+                    pool = processing_pool(concurrency)
+        finally:
+            pool.shutdown()
+        return processed
+
+    def request_stop(self, signum, frame):
+        self.stdout.write("Stopping after the current jobs...")
+        self.stopping = True
@@ -0,0 +1,269 @@
+import logging
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from api.jobs import processing_pool
+from api.models import ReprocessItem, ReprocessRun, Track
+from api.pool import reprocess_item_by_id
+from api.reprocess import fail_item, run_item, start_run
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+logger = logging.getLogger("track_processing")
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate renditions and waveforms for existing tracks from their "
+        "stored originals, resuming interrupted runs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--track", action="append", default=[], help="Only this track id"
+        )
+        parser.add_argument(
+            "--user", action="append", default=[], help="Only this artist's tracks"
+        )
+        parser.add_argument(
+            "--state",
+            default=Track.ProcessingState.READY,
+            help="Processing state to select (default: ready)",
+        )
+        parser.add_argument(
+            "--created-after", help="Only tracks created on or after YYYY-MM-DD"
+        )
+        parser.add_argument(
+            "--created-before", help="Only tracks created before YYYY-MM-DD"
+        )
+        parser.add_argument(
+            "--waveform-below",
+            type=int,
+            help="Only tracks whose finest waveform level has fewer points",
+        )
+        parser.add_argument(
+            "--missing-rendition",
+            help="Only tracks without a rendition of this name",
+        )
+        parser.add_argument(
+            "--missing-metadata",
+            action="store_true",
+            help="Only tracks whose codec and sample rate were never probed",
+        )
+        parser.add_argument("--limit", type=int, help="Select at most this many")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help=(
+                "Tracks to process in parallel "
+                "(defaults to and is capped at TRANSCODE_SLOTS)"
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            nargs="?",
+            const="latest",
+            help="Continue an earlier run (the latest unfinished one by default)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show how many tracks would be reprocessed and exit",
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=float,
+            default=30,
+            help="Seconds between throughput reports",
+        )
+
+    def handle(self, *args, **options):
+        # Each track holds a transcoding slot, so extra workers would only wait
+        slots = max(settings.TRANSCODE_SLOTS, 1)
+        workers = min(options["workers"] or slots, slots)
+        if options["workers"] and options["workers"] > slots:
+            self.stdout.write(
+                f"Capping --workers at TRANSCODE_SLOTS ({slots}); "
+                "raise TRANSCODE_SLOTS to run more in parallel"
+            )
+
+        if options["resume"]:
+            run = self.find_run(options["resume"])
+        else:
+            tracks, filters = self.select_tracks(options)
+            if options["dry_run"]:
+                self.stdout.write(f"{tracks.count()} track(s) match")
+                return
+            run = start_run(tracks, filters)
+            self.stdout.write(f"Started reprocess run {run.id}")
+
+        pending = list(
+            run.items.filter(status=ReprocessItem.Status.PENDING)
+            .order_by("track__created_at")
+            .values_list("id", flat=True)
+        )
+        total = run.items.count()
+        self.stdout.write(
+            f"{len(pending)} of {total} track(s) left to reprocess "
+            f"(workers {workers})"
+        )
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        self.start_time = time.time()
+        self.last_report = self.start_time
+        self.report_interval = options["report_interval"]
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0
+
+        if workers <= 1:
+            self.run_serial(pending)
+        else:
+            self.run_pooled(pending, workers)
+
+        self.report(final=True)
+        if not run.items.filter(status=ReprocessItem.Status.PENDING).exists():
+            run.finished_at = timezone.now()
+            run.save(update_fields=["finished_at"])
+            self.stdout.write(self.style.SUCCESS(f"Reprocess run {run.id} finished"))
+        else:
+            self.stdout.write(f"Stopped early; continue with --resume {run.id}")
+
+    def find_run(self, run_id):
+        runs = ReprocessRun.objects.all()
+        if run_id == "latest":
+            run = runs.filter(finished_at__isnull=True).first()
+            if run is None:
+                raise CommandError("No unfinished reprocess run to resume")
+            return run
+        try:
+            return runs.get(pk=run_id)
+        except (ReprocessRun.DoesNotExist, ValidationError):
+            raise CommandError(f"Reprocess run {run_id} not found")
+
+    def select_tracks(self, options):
+        """Build the track queryset and a JSON record of the filters used"""
+        tracks = Track.objects.filter(processing_state=options["state"])
+        filters = {"state": options["state"]}
+
+        if options["track"]:
+            tracks = tracks.filter(pk__in=options["track"])
+            filters["track"] = options["track"]
+        if options["user"]:
+            tracks = tracks.filter(artist__username__in=options["user"])
+            filters["user"] = options["user"]
+        for option, lookup in (
+            ("created_after", "created_at__date__gte"),
+            ("created_before", "created_at__date__lt"),
+        ):
+            if options[option]:
+                date = parse_date(options[option])
+                if date is None:
+                    raise CommandError(f"Invalid date: {options[option]}")
+                tracks = tracks.filter(**{lookup: date})
+                filters[option] = options[option]
+        if options["waveform_below"]:
+            tracks = tracks.filter(
+                audio_waveform_resolution__lt=options["waveform_below"]
+            )
+            filters["waveform_below"] = options["waveform_below"]
+        if options["missing_rendition"]:
+            tracks = tracks.exclude(renditions__name=options["missing_rendition"])
+            filters["missing_rendition"] = options["missing_rendition"]
+        if options["missing_metadata"]:
+            tracks = tracks.filter(audio_codec="")
+            filters["missing_metadata"] = True
+        if options["limit"]:
+            limited = tracks.order_by("created_at").values_list("pk", flat=True)[
+                : options["limit"]
+            ]
+            tracks = Track.objects.filter(pk__in=list(limited))
+            filters["limit"] = options["limit"]
+        return tracks, filters
+
+    def run_serial(self, pending):
+        for item_id in pending:
+            if self.stopping:
+                break
+            close_old_connections()
+            self.record(*run_item(ReprocessItem.objects.get(pk=item_id)))
+
+    def run_pooled(self, pending, workers):
+        """
+        Keep up to `workers` tracks in flight on a process pool.
+
+        A track whose worker raises or dies is recorded as failed, and a
+        broken pool (a killed worker) is replaced so the run carries on.
+        """
+        queue = iter(pending)
+        in_flight = {}
+        pool = processing_pool(workers)
+        try:
+            while True:
+                while not self.stopping and len(in_flight) < workers:
+                    item_id = next(queue, None)
+                    if item_id is None:
+                        break
+                    in_flight[pool.submit(reprocess_item_by_id, item_id)] = item_id
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(
+                    in_flight, timeout=self.report_interval, return_when=FIRST_COMPLETED
+                )
+                broken = False
+                for future in done:
+                    item_id = in_flight.pop(future)
+                    try:
+                        self.record(*future.result())
+                    except Exception as e:
+                        logger.error(f"Reprocess worker for item {item_id} failed: {e}")
+                        self.record(*fail_item(item_id, e))
+                        broken = broken or isinstance(e, BrokenProcessPool)
+
+                if broken:
+                    # The rest of the pool's futures fail with it
+                    for future, item_id in in_flight.items():
+                        self.record(*fail_item(item_id, future.exception()))
+                    in_flight = {}
+                    pool.shutdown(wait=False)
+                    pool = processing_pool(workers)
+        finally:
+            pool.shutdown()
+
+    def record(self, status, audio_seconds):
+        if status == ReprocessItem.Status.FAILED:
+            self.failed += 1
+        else:
+            self.completed += 1
+            self.audio_seconds += audio_seconds or 0
+        if time.time() - self.last_report >= self.report_interval:
+            self.report()
+
+    def report(self, final=False):
+        """Print tracks/min and audio-hours/min for this invocation"""
+        self.last_report = time.time()
+        minutes = max(self.last_report - self.start_time, 1e-6) / 60
+        tracks_per_minute = (self.completed + self.failed) / minutes
+        audio_hours_per_minute = self.audio_seconds / 3600 / minutes
+        self.stdout.write(
+            f"{'Finished' if final else 'Progress'}: {self.completed} done, "
+            f"{self.failed} failed in {minutes:.1f} min "
+            f"({tracks_per_minute:.1f} tracks/min, "
+            f"{audio_hours_per_minute:.2f} audio-hours/min)"
+        )
+
+    def request_stop(self, signum, frame):
+        self.stdout.write("Stopping after the current tracks...")
+        self.stopping = True
@@ -1,3 +1,6 @@
+from api.audio.slots import TranscoderBusy
+
+
 class GraphQLAuthenticationMiddleware:
     """
     Middleware for GraphQL authentication using Django sessions.
@@ -10,3 +13,19 @@ class GraphQLAuthenticationMiddleware:
         # Django's auth middleware already sets request.user
         # We can directly use info.context.user in resolvers
         return next(root, info, **kwargs)
+
+
+class RetryAfterMiddleware:
+    """
+    Remember how long a busy transcoder asked clients to wait.
+
+    The GraphQL response itself is still a 200 with the error in it;
+    CustomGraphQLView copies the value into a Retry-After header.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        try:
+            return next(root, info, **kwargs)
+        except TranscoderBusy as e:
+            info.context.retry_after = e.retry_after
+            raise
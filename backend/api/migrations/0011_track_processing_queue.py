@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:54
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def mark_existing_tracks_ready(apps, schema_editor):
+    # Tracks uploaded before the queue existed were processed inline
+    Track = apps.get_model("api", "Track")
+    Track.objects.exclude(audio_file="").update(processing_state="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_alter_user_username"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="track",
+            name="processing_state",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("transcoding", "Transcoding"),
+                    ("analyzing", "Analyzing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+        migrations.RunPython(mark_existing_tracks_ready, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="ProcessingJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("source_path", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("progress", models.PositiveSmallIntegerField(default=0)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("locked_by", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "track",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="processing_jobs",
+                        to="api.track",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="api_process_status_f05f2a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
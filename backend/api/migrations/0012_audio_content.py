@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:13
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_track_processing_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AudioContent",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("base_path", models.CharField(max_length=255)),
+                ("original_path", models.CharField(max_length=255)),
+                ("mp3_path", models.CharField(max_length=255)),
+                ("audio_length", models.IntegerField(default=0)),
+                ("audio_waveform_data", models.JSONField(blank=True, null=True)),
+                ("audio_waveform_resolution", models.IntegerField(default=0)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="content",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="tracks",
+                to="api.audiocontent",
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:17
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def record_existing_mp3s(apps, schema_editor):
+    # Tracks processed before renditions existed only have the 192k MP3
+    Track = apps.get_model("api", "Track")
+    TrackRendition = apps.get_model("api", "TrackRendition")
+    TrackRendition.objects.bulk_create(
+        [
+            TrackRendition(
+                track=track,
+                name="320",
+                codec="mp3",
+                bitrate=192,
+                mime_type="audio/mpeg",
+                path=f"{track.audio_file}/320/{track.id}.mp3",
+            )
+            for track in Track.objects.filter(processing_state="ready").exclude(
+                audio_file=""
+            )
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_audio_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackRendition",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=32)),
+                ("codec", models.CharField(max_length=16)),
+                (
+                    "bitrate",
+                    models.PositiveIntegerField(help_text="Target bitrate in kbps"),
+                ),
+                ("mime_type", models.CharField(max_length=64)),
+                ("path", models.CharField(max_length=255)),
+                ("size", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "track",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="api.track",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["bitrate"],
+                "unique_together": {("track", "name")},
+            },
+        ),
+        migrations.RunPython(record_existing_mp3s, migrations.RunPython.noop),
+    ]
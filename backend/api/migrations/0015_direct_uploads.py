@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:24
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_upload_session"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadsession",
+            name="storage_path",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="uploadsession",
+            name="track_id",
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+    ]
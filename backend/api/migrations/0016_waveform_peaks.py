@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:26
+
+import json
+
+import numpy as np
+from django.db import migrations, models
+
+
+# Copied from api.audio.peaks as of this migration, so later changes to the
+# app's encoding can't alter what this migration writes
+def pack_waveform(values):
+    values = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+    return np.round(values * 255).astype(np.uint8).tobytes()
+
+
+def unpack_waveform(data):
+    if not data:
+        return []
+    values = np.frombuffer(bytes(data), dtype=np.uint8) / 255
+    return np.round(values, 2).tolist()
+
+
+def pack_existing_waveforms(apps, schema_editor):
+    # Older rows hold the waveform as a JSON string inside the JSON column
+    for model_name in ("Track", "AudioContent"):
+        Model = apps.get_model("api", model_name)
+        rows = Model.objects.filter(audio_waveform_data__isnull=False)
+        for row in rows.only("pk", "audio_waveform_data").iterator():
+            values = row.audio_waveform_data
+            if isinstance(values, str):
+                values = json.loads(values)
+            if not values:
+                continue
+            row.audio_waveform_peaks = pack_waveform(values)
+            row.save(update_fields=["audio_waveform_peaks"])
+
+
+def unpack_waveforms(apps, schema_editor):
+    for model_name in ("Track", "AudioContent"):
+        Model = apps.get_model("api", model_name)
+        rows = Model.objects.filter(audio_waveform_peaks__isnull=False)
+        for row in rows.only("pk", "audio_waveform_peaks").iterator():
+            row.audio_waveform_data = unpack_waveform(row.audio_waveform_peaks)
+            row.save(update_fields=["audio_waveform_data"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_direct_uploads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="audiocontent",
+            name="audio_waveform_peaks",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="audio_waveform_peaks",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_existing_waveforms, unpack_waveforms),
+        migrations.RemoveField(
+            model_name="audiocontent",
+            name="audio_waveform_data",
+        ),
+        migrations.RemoveField(
+            model_name="track",
+            name="audio_waveform_data",
+        ),
+    ]
@@ -0,0 +1,66 @@
+import numpy as np
+from django.db import migrations
+
+# Copied from api.audio.peaks as of this migration, so later changes to the
+# app's pyramid layout can't alter what this migration writes
+WAVEFORM_MIN_RESOLUTION = 64
+
+
+def pack_waveform(values):
+    values = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+    return np.round(values * 255).astype(np.uint8).tobytes()
+
+
+def pyramid_sizes(resolution):
+    sizes = [resolution]
+    while -(-sizes[-1] // 2) >= WAVEFORM_MIN_RESOLUTION:
+        sizes.append(-(-sizes[-1] // 2))
+    return sizes
+
+
+def pack_pyramid(values):
+    level = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+    levels = [level]
+    for _ in pyramid_sizes(len(level))[1:]:
+        if len(level) % 2:
+            level = np.append(level, level[-1])
+        level = level.reshape(-1, 2).max(axis=1)
+        levels.append(level)
+    return b"".join(pack_waveform(level) for level in levels)
+
+
+def build_pyramids(apps, schema_editor):
+    # Existing rows hold a single packed level; add the coarser levels below it
+    for model_name in ("Track", "AudioContent"):
+        Model = apps.get_model("api", model_name)
+        rows = Model.objects.filter(audio_waveform_peaks__isnull=False)
+        for row in rows.only("pk", "audio_waveform_peaks").iterator():
+            level = np.frombuffer(bytes(row.audio_waveform_peaks), dtype=np.uint8)
+            row.audio_waveform_peaks = pack_pyramid(level / 255)
+            row.audio_waveform_resolution = len(level)
+            row.save(
+                update_fields=["audio_waveform_peaks", "audio_waveform_resolution"]
+            )
+
+
+def keep_finest_level(apps, schema_editor):
+    for model_name in ("Track", "AudioContent"):
+        Model = apps.get_model("api", model_name)
+        rows = Model.objects.filter(audio_waveform_peaks__isnull=False)
+        for row in rows.only(
+            "pk", "audio_waveform_peaks", "audio_waveform_resolution"
+        ).iterator():
+            peaks = bytes(row.audio_waveform_peaks)
+            row.audio_waveform_peaks = peaks[: row.audio_waveform_resolution]
+            row.save(update_fields=["audio_waveform_peaks"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_waveform_peaks"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_pyramids, keep_finest_level),
+    ]
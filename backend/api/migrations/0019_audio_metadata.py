@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_reprocess_runs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="audiocontent",
+            name="audio_bitrate",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="audiocontent",
+            name="audio_channels",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="audiocontent",
+            name="audio_codec",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="audiocontent",
+            name="audio_sample_rate",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="audio_bitrate",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="audio_channels",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="audio_codec",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="track",
+            name="audio_sample_rate",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
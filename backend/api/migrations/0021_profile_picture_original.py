@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_profile_picture_sizes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="profile_picture_original",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -1,13 +1,18 @@
 import os
 import uuid
+from urllib.parse import urlencode
 
-from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.core.files.storage import default_storage
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
 
+from api.audio.peaks import WAVEFORM_DEFAULT_RESOLUTION, pyramid_level, unpack_waveform
+from api.image_cache import purge_cached_variants
+from api.images import avatar_variant_name
+from api.utils import delete_storage_prefix, storage_url
 from api.validators import AlphanumericUsernameValidator
 
 
@@ -74,6 +79,11 @@ class Profile(models.Model):
     bio = models.TextField(max_length=500, blank=True)
     # Store the full path to the optimized profile picture
     profile_picture = models.CharField(max_length=255, blank=True, null=True)
+    # Square sizes stored next to profile_picture, as WebP and JPEG; empty for
+    # pictures from before resized variants were generated
+    profile_picture_sizes = models.JSONField(default=list, blank=True)
+    # Storage path of the uploaded picture, resized on demand by /img/
+    profile_picture_original = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -86,33 +96,48 @@ class Profile(models.Model):
         if not self.profile_picture:
             return None
 
-        # Check if we're using R2 storage
-        if settings.USE_CLOUDFLARE_R2:
-            try:
-                # Import here to avoid circular imports
-                from api.storage import CloudflareR2Storage
-
-                # Get R2 storage instance
-                r2_storage = CloudflareR2Storage()
-
-                # Generate a presigned URL that expires in 24 hours
-                return r2_storage.get_presigned_url(
-                    self.profile_picture, expiration=86400
-                )
-            except Exception as e:
-                if settings.DEBUG:
-                    print(f"Error generating presigned URL: {e}")
-                # Fall back to regular URL if presigning fails
-                return default_storage.url(self.profile_picture)
-        else:
-            # Use default_storage for local files
-            return default_storage.url(self.profile_picture)
+        # Presigned (and cached) on R2, served directly from local storage
+        return storage_url(self.profile_picture)
 
     @property
     def profile_picture_url(self):
         """Return the URL to the profile picture"""
         return self.profile_picture_optimized_url
 
+    def profile_picture_variant(self, size, extension):
+        """Storage path of one resized variant of the profile picture"""
+        directory, filename = os.path.split(self.profile_picture)
+        name, _ = os.path.splitext(filename)
+        return f"{directory}/{avatar_variant_name(name, size, extension)}"
+
+    def profile_picture_image_url(self, width, fmt="webp"):
+        """URL of the original picture resized on demand, or None without one"""
+        if not self.profile_picture_original:
+            return None
+        path = reverse(
+            "image_variant",
+            kwargs={
+                "user_id": self.user_id,
+                "name": os.path.basename(self.profile_picture_original),
+            },
+        )
+        return f"{path}?{urlencode({'w': width, 'fmt': fmt})}"
+
+    def profile_picture_srcset(self, extension="webp"):
+        """
+        A srcset of every size of the profile picture in one format.
+
+        Pictures without resized variants only list the optimized JPEG.
+        """
+        if not self.profile_picture:
+            return None
+        if not self.profile_picture_sizes:
+            return f"{self.profile_picture_optimized_url} 600w"
+        return ", ".join(
+            f"{storage_url(self.profile_picture_variant(size, extension))} {size}w"
+            for size in sorted(self.profile_picture_sizes)
+        )
+
     # Signal to create a profile when a user is created
     @receiver(post_save, sender=User)
     def create_user_profile(sender, instance, created, **kwargs):
@@ -129,33 +154,18 @@ class Profile(models.Model):
             return
 
         try:
-            # Get the base path (remove the file part)
+            # Get the base path (remove the file part), holding orig/ and new/
             base_path = os.path.dirname(os.path.dirname(self.profile_picture))
-
-            # Try to delete both subdirectories and their contents
-            for subdir in ["orig", "new"]:
-                try:
-                    dir_path = f"{base_path}/{subdir}"
-                    # Check if directory exists
-                    if default_storage.exists(dir_path):
-                        # List and delete all files in the directory
-                        try:
-                            _, files = default_storage.listdir(dir_path)
-                            for file in files:
-                                default_storage.delete(f"{dir_path}/{file}")
-                        except NotImplementedError:
-                            # Some storage backends don't support listdir
-                            print(
-                                f"Storage backend doesn't support listdir for {dir_path}"
-                            )
-                except Exception as e:
-                    print(f"Error deleting files in {subdir}: {e}")
+            delete_storage_prefix(base_path)
         except Exception as e:
             print(f"Error during profile picture deletion: {e}")
 
         # Clear the profile_picture field
         self.profile_picture = None
+        self.profile_picture_sizes = []
+        self.profile_picture_original = ""
         self.save()
+        purge_cached_variants(str(self.user_id))
 
 
 def track_upload_path(instance, filename):
@@ -166,9 +176,49 @@ def track_upload_path(instance, filename):
     return f"audio/artists/{instance.artist.id}/tracks/{instance.id}/{filename}"
 
 
+class AudioContent(models.Model):
+    """
+    Content index entry for a processed original, keyed by its SHA-256.
+
+    Tracks uploaded with identical audio share one stored original, MP3 and
+    waveform. ref_count tracks how many tracks point at the entry; the files
+    are removed once the last of them is deleted.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
+    # Track directory that holds the shared orig/ and 320/ files
+    base_path = models.CharField(max_length=255)
+    original_path = models.CharField(max_length=255)
+    mp3_path = models.CharField(max_length=255)
+    audio_length = models.IntegerField(default=0)
+    # One byte per point (see api.audio.peaks)
+    audio_waveform_peaks = models.BinaryField(blank=True, null=True)
+    audio_waveform_resolution = models.IntegerField(default=0)
+    # Header metadata of the original upload (see api.audio.probe)
+    audio_codec = models.CharField(max_length=32, blank=True)
+    audio_sample_rate = models.PositiveIntegerField(blank=True, null=True)
+    audio_channels = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Kilobits per second
+    audio_bitrate = models.PositiveIntegerField(blank=True, null=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class Track(models.Model):
     """Model for audio tracks uploaded by users"""
 
+    class ProcessingState(models.TextChoices):
+        PENDING = "pending", "Pending"
+        TRANSCODING = "transcoding", "Transcoding"
+        ANALYZING = "analyzing", "Analyzing"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     artist = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="tracks", db_column="user_id"
@@ -178,43 +228,70 @@ class Track(models.Model):
     description = models.TextField(blank=True)
     audio_file = models.CharField(max_length=255, blank=True)
     audio_length = models.IntegerField(default=0)
-    audio_waveform_data = models.JSONField(blank=True, null=True)
+    # One byte per point (see api.audio.peaks)
+    audio_waveform_peaks = models.BinaryField(blank=True, null=True)
     audio_waveform_resolution = models.IntegerField(default=0)
+    # Header metadata of the original upload (see api.audio.probe)
+    audio_codec = models.CharField(max_length=32, blank=True)
+    audio_sample_rate = models.PositiveIntegerField(blank=True, null=True)
+    audio_channels = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Kilobits per second
+    audio_bitrate = models.PositiveIntegerField(blank=True, null=True)
+    processing_state = models.CharField(
+        max_length=16,
+        choices=ProcessingState.choices,
+        default=ProcessingState.PENDING,
+    )
+    # SHA-256 of the uploaded original, used to find identical uploads
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    content = models.ForeignKey(
+        AudioContent,
+        on_delete=models.PROTECT,
+        related_name="tracks",
+        blank=True,
+        null=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} by {self.artist.username}"
 
+    def waveform_level(self, resolution=None):
+        """Packed waveform bytes for the stored level nearest `resolution`"""
+        return pyramid_level(
+            self.audio_waveform_peaks, self.audio_waveform_resolution, resolution
+        )
+
+    @property
+    def audio_waveform_data(self):
+        """Default waveform level as a list of 0-1 values"""
+        if self.audio_waveform_peaks is None:
+            return None
+        return unpack_waveform(self.waveform_level(WAVEFORM_DEFAULT_RESOLUTION))
+
+    @property
+    def is_ready(self):
+        """Whether the processing pipeline has produced a playable file"""
+        return self.processing_state == Track.ProcessingState.READY
+
     @property
     def audio_url(self):
         """Return the URL to the MP3 audio file"""
-        if not self.audio_file:
+        if not self.audio_file or not self.is_ready:
             return None
 
-        # Construct path to the actual MP3 file
-        mp3_path = f"{self.audio_file}/320/{self.id}.mp3"
+        # Construct path to the actual MP3 file, which may be shared
+        if self.content_id:
+            mp3_path = self.content.mp3_path
+        else:
+            mp3_path = f"{self.audio_file}/320/{self.id}.mp3"
 
         # Debug output to check when this method is called
         # print(f"Track.audio_url called for: {self.title}, path: {mp3_path}")
 
-        # Check if we're using R2 storage
-        if settings.USE_CLOUDFLARE_R2:
-            try:
-                from api.storage import CloudflareR2Storage
-
-                # Get R2 storage instance
-                r2_storage = CloudflareR2Storage()
-                # Generate a presigned URL that expires in 24 hours
-                return r2_storage.get_presigned_url(self.mp3_path, expiration=86400)
-            except Exception as e:
-                regular_url = default_storage.url(mp3_path)
-                return regular_url
-        else:
-            # Use default_storage for local files
-            local_url = default_storage.url(mp3_path)
-            # print(f"Using local URL: {local_url}")
-            return local_url
+        # Presigned for 24 hours on R2
+        return storage_url(mp3_path)
 
     @property
     def original_audio_url(self):
@@ -230,6 +307,196 @@ class Track(models.Model):
         ordering = ["-created_at"]
 
 
+class TrackRendition(models.Model):
+    """One encoded version of a track (codec and bitrate) stored for playback"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track = models.ForeignKey(
+        Track, on_delete=models.CASCADE, related_name="renditions"
+    )
+    # Storage subdirectory name, e.g. "320" or "opus64"
+    name = models.CharField(max_length=32)
+    codec = models.CharField(max_length=16)
+    bitrate = models.PositiveIntegerField(help_text="Target bitrate in kbps")
+    mime_type = models.CharField(max_length=64)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["bitrate"]
+        unique_together = ("track", "name")
+
+    def __str__(self):
+        return f"{self.track_id} {self.name} ({self.codec} {self.bitrate}k)"
+
+    @property
+    def url(self):
+        """Return the URL to the rendition file"""
+        return storage_url(self.path)
+
+
+@receiver(post_delete, sender=Track)
+def release_track_content(sender, instance, **kwargs):
+    """Drop a deleted track's reference to its shared content"""
+    if instance.content_id:
+        # Import here to avoid circular imports
+        from api.content import release_content
+
+        release_content(instance.content_id)
+
+
+class ProcessingJob(models.Model):
+    """
+    Database-backed queue entry for background track processing.
+
+    Upload mutations only store the original file and enqueue a job; the
+    `process_tracks` management command claims jobs and runs the pipeline.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track = models.ForeignKey(
+        Track, on_delete=models.CASCADE, related_name="processing_jobs"
+    )
+    # Storage path of the original upload the pipeline should start from
+    source_path = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"{self.track_id} ({self.status})"
+
+
+class ReprocessRun(models.Model):
+    """
+    One `reprocess_tracks` run over a filtered set of tracks.
+
+    Each selected track gets a ReprocessItem that is marked as soon as its
+    track finishes, so a run that is killed can resume with the rest.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Command-line filters that selected the tracks, for reference
+    filters = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Reprocess run {self.id}"
+
+
+class ReprocessItem(models.Model):
+    """Checkpoint for one track in a ReprocessRun"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    run = models.ForeignKey(
+        ReprocessRun, on_delete=models.CASCADE, related_name="items"
+    )
+    track = models.ForeignKey(
+        Track, on_delete=models.CASCADE, related_name="reprocess_items"
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("run", "track")
+        indexes = [models.Index(fields=["run", "status"])]
+
+    def __str__(self):
+        return f"{self.track_id} ({self.status})"
+
+
+class StorageTombstone(models.Model):
+    """
+    A storage prefix whose files outlived the rows that owned them.
+
+    Deletions record tombstones in the same transaction as the row delete
+    and return straight away; api.tombstones purges the files in the
+    background. A tombstone is only removed once its prefix is gone, so a
+    worker dying mid-purge leaves it to be retried rather than orphaning
+    files.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    prefix = models.CharField(max_length=255)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["run_after"])]
+
+    def __str__(self):
+        return self.prefix
+
+
+class UploadSession(models.Model):
+    """
+    An upload in progress.
+
+    Chunked uploads append to a part file on disk (see api.uploads) and
+    `received` records how many bytes have been committed, so clients can
+    resume from that offset after a dropped connection. Direct uploads are
+    PUT by the client straight to `storage_path`.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    title = models.CharField(max_length=125)
+    description = models.TextField(blank=True)
+    # Id of the track the upload becomes; direct uploads are stored under it
+    track_id = models.UUIDField(default=uuid.uuid4)
+    # Storage key a direct-to-storage upload is PUT to (blank for chunked)
+    storage_path = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def is_complete(self):
+        return self.received == self.size
+
+
 class FavoriteTrack(models.Model):
     """Model for user's favorite tracks"""
 
@@ -1,17 +1,20 @@
 import os
 import tempfile
-import subprocess
 import time
 import uuid
 
 import graphene
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from graphene_file_upload.scalars import Upload
 from graphql_jwt.decorators import login_required
 
+from api.image_cache import purge_cached_variants
+from api.images import AVATAR_SIZES, render_avatar_variants
 from api.types.profile import ProfileType
-from api.utils import ensure_storage_path_exists
+from api.utils import (
+    delete_storage_prefix,
+    ensure_storage_path_exists,
+    save_local_file,
+)
 
 
 def generate_short_unique_id():
@@ -23,56 +26,6 @@ def generate_short_unique_id():
     return f"{t}{r}"  # e.g. "596583af"
 
 
-def optimize_image(input_file_path, output_dir, max_size=600):
-    """
-    Optimize and resize image for profile picture, always converting to JPG.
-    """
-    try:
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Generate a unique filename with short ID
-        unique_id = generate_short_unique_id()
-        output_filename = f"profile_{unique_id}.jpg"
-        output_file_path = os.path.join(output_dir, output_filename)
-
-        # Run imagemagick to optimize the image and convert to jpg
-        command = [
-            "convert",
-            input_file_path,
-            "-resize",
-            f"{max_size}x{max_size}^",  # Resize any size image (^) to max_size
-            "-gravity",
-            "center",  # Center the crop
-            "-extent",
-            f"{max_size}x{max_size}",  # Crop to exact dimensions
-            "-strip",  # Remove metadata
-            "-quality",
-            "92%",  # Higher quality (85% → 92%)
-            "-sampling-factor",
-            "4:2:0",  # Chroma subsampling for JPG
-            "-interlace",
-            "JPEG",  # Progressive JPEG
-            "-colorspace",
-            "sRGB",  # Consistent color space
-            output_file_path,
-        ]
-
-        # Run the command
-        subprocess.run(command, check=True, capture_output=True, text=True)
-
-        # Verify the file was created and has content
-        if os.path.exists(output_file_path) and os.path.getsize(output_file_path) > 0:
-            return output_file_path, output_filename
-        else:
-            print("Image optimization completed but output file is missing or empty")
-            return None, None
-
-    except Exception as e:
-        print(f"Error optimizing image: {str(e)}")
-        return None, None
-
-
 class UpdateProfile(graphene.Mutation):
     profile = graphene.Field(ProfileType)
 
@@ -107,12 +60,10 @@ class UpdateProfile(graphene.Mutation):
                     ".png",
                     ".gif",
                     ".webp",
-                    ".svg",
                     ".bmp",
                     ".tiff",
                     ".tif",
                     ".avif",
-                    ".heic",
                     ".ico",
                 ]
 
@@ -129,66 +80,51 @@ class UpdateProfile(graphene.Mutation):
                         for chunk in profile_picture.chunks():
                             f.write(chunk)
 
+                    # Resize to every avatar size, as both WebP and JPEG, before
+                    # the current picture is cleared away
+                    optimized_name = f"profile_{generate_short_unique_id()}"
+                    variants = render_avatar_variants(
+                        temp_file_path, os.path.join(temp_dir, "new"), optimized_name
+                    )
+
                     # Define paths for storage
                     user_id = str(user.id)
                     base_path = f"{user_id}/img/profile"
 
-                    # Use the new utility function to ensure directories exist
-                    for subdir in ["orig", "new"]:
-                        path = f"{base_path}/{subdir}"
-                        ensure_storage_path_exists(path)
-
-                    # Clear existing files, handling both local and cloud storage
+                    # Clear the previous picture's files
                     try:
-                        # Try to delete files in orig directory
-                        orig_dir = f"{base_path}/orig"
-                        if default_storage.exists(orig_dir):
-                            try:
-                                _, files = default_storage.listdir(orig_dir)
-                                for file in files:
-                                    default_storage.delete(f"{orig_dir}/{file}")
-                            except (NotImplementedError, Exception) as e:
-                                print(
-                                    f"Warning: Could not list/delete files in orig directory: {e}"
-                                )
-
-                        # Try to delete files in new directory
-                        new_dir = f"{base_path}/new"
-                        if default_storage.exists(new_dir):
-                            try:
-                                _, files = default_storage.listdir(new_dir)
-                                for file in files:
-                                    default_storage.delete(f"{new_dir}/{file}")
-                            except (NotImplementedError, Exception) as e:
-                                print(
-                                    f"Warning: Could not list/delete files in new directory: {e}"
-                                )
+                        delete_storage_prefix(base_path)
                     except Exception as e:
                         print(f"Warning: Could not clear old files: {e}")
                         # Continue anyway - it's better to add new files than to fail completely
 
+                    # Use the new utility function to ensure directories exist
+                    for subdir in ["orig", "new"]:
+                        path = f"{base_path}/{subdir}"
+                        ensure_storage_path_exists(path)
+
                     # Generate unique filename for the original image
                     orig_filename = f"profile_{uuid.uuid4().hex}{original_ext}"
                     orig_path = f"{base_path}/orig/{orig_filename}"
 
                     # Save original image
-                    with open(temp_file_path, "rb") as f:
-                        default_storage.save(orig_path, ContentFile(f.read()))
-
-                    # Optimize image (convert to JPG)
-                    optimized_file_path, optimized_filename = optimize_image(
-                        temp_file_path, temp_dir
-                    )
-                    if not optimized_file_path:
-                        raise Exception("Failed to optimize image")
-
-                    # Save optimized JPG image with unique filename
-                    optimized_path = f"{base_path}/new/{optimized_filename}"
-                    with open(optimized_file_path, "rb") as f:
-                        default_storage.save(optimized_path, ContentFile(f.read()))
-
-                    # Update profile with full path to the optimized image
+                    save_local_file(orig_path, temp_file_path)
+
+                    # Save the resized variants
+                    for variant_path in variants.values():
+                        save_local_file(
+                            f"{base_path}/new/{os.path.basename(variant_path)}",
+                            variant_path,
+                        )
+
+                    # The largest JPEG is the profile picture; the rest are
+                    # found next to it by name
+                    optimized_path = f"{base_path}/new/{optimized_name}.jpg"
                     profile.profile_picture = optimized_path
+                    profile.profile_picture_sizes = list(AVATAR_SIZES)
+                    profile.profile_picture_original = orig_path
+                    # Variants of the replaced picture are never requested again
+                    purge_cached_variants(user_id)
                     print(
                         f"Profile picture updated for user {user_id} at path {optimized_path}"
                     )
@@ -0,0 +1,229 @@
+import logging
+import os
+
+import graphene
+from api.audio.validate import (
+    UploadValidationError,
+    check_upload_size,
+    validate_stored_upload,
+)
+from api.jobs import check_processing_capacity
+from api.models import UploadSession
+from api.mutations.track_mutations import (
+    create_track,
+    create_uploaded_track,
+    probed_fields,
+    queue_track,
+)
+from api.types.track import TrackType
+from api.types.upload import UploadSessionType
+from api.uploads import (
+    UploadOffsetError,
+    append_chunk,
+    begin_direct_upload,
+    begin_upload,
+    discard_upload,
+    expire_upload_sessions,
+    part_path,
+)
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
+from graphene_file_upload.scalars import Upload
+from graphql_jwt.decorators import login_required
+
+logger = logging.getLogger("track_processing")
+
+
+def check_title_available(user, title):
+    """Fail before any bytes are sent rather than when the track is created"""
+    if user.tracks.filter(title_slug=slugify(title)).exists():
+        raise Exception(
+            "You already have a track with that title. "
+            "Please choose a different one."
+        )
+
+
+def get_user_session(user, id):
+    try:
+        return UploadSession.objects.get(pk=id, user=user)
+    except UploadSession.DoesNotExist:
+        raise Exception("Upload not found")
+
+
+class BeginUpload(graphene.Mutation):
+    """Start a resumable upload; chunks are then sent with uploadChunk"""
+
+    upload = graphene.Field(UploadSessionType)
+
+    class Arguments:
+        filename = graphene.String(required=True)
+        size = graphene.BigInt(required=True)
+        title = graphene.String(required=True)
+        description = graphene.String()
+
+    @login_required
+    def mutate(self, info, filename, size, title, description=None):
+        user = info.context.user
+        check_upload_size(size)
+        check_title_available(user, title)
+        expire_upload_sessions()
+
+        session = begin_upload(user, filename, size, title, description)
+        logger.info(f"Began upload {session.id}: '{title}' ({size} bytes)")
+        return BeginUpload(upload=session)
+
+
+class UploadChunk(graphene.Mutation):
+    """Append a chunk at the given offset of a resumable upload"""
+
+    upload = graphene.Field(UploadSessionType)
+
+    class Arguments:
+        id = graphene.ID(required=True)
+        offset = graphene.BigInt(required=True)
+        chunk = Upload(required=True)
+
+    @login_required
+    def mutate(self, info, id, offset, chunk):
+        try:
+            session = append_chunk(id, info.context.user, offset, chunk)
+        except UploadSession.DoesNotExist:
+            raise Exception("Upload not found")
+        except UploadOffsetError as e:
+            raise Exception(str(e))
+        return UploadChunk(upload=session)
+
+
+class FinishUpload(graphene.Mutation):
+    """Turn a fully received upload into a track and queue it for processing"""
+
+    track = graphene.Field(TrackType)
+
+    class Arguments:
+        id = graphene.ID(required=True)
+
+    @login_required
+    def mutate(self, info, id):
+        session = get_user_session(info.context.user, id)
+        if not session.is_complete:
+            raise Exception(
+                f"Upload is incomplete: received {session.received} "
+                f"of {session.size} bytes"
+            )
+
+        with open(part_path(session), "rb") as f:
+            file = File(f, name=os.path.basename(session.filename))
+            try:
+                track = create_uploaded_track(
+                    session.user,
+                    session.title,
+                    file,
+                    session.description,
+                    path=part_path(session),
+                )
+            except UploadValidationError:
+                # Resuming can't fix a file that isn't acceptable audio
+                discard_upload(session)
+                raise
+
+        discard_upload(session)
+        return FinishUpload(track=track)
+
+
+class AbortUpload(graphene.Mutation):
+    """Discard a resumable upload and its received chunks"""
+
+    success = graphene.Boolean()
+
+    class Arguments:
+        id = graphene.ID(required=True)
+
+    @login_required
+    def mutate(self, info, id):
+        discard_upload(get_user_session(info.context.user, id))
+        return AbortUpload(success=True)
+
+
+class RequestTrackUpload(graphene.Mutation):
+    """
+    Start an upload that the client PUTs straight to storage.
+
+    Returns a presigned URL for the track's orig/ directory; once the PUT
+    succeeds the client calls finalizeTrackUpload. Only available with
+    Cloudflare R2 storage.
+    """
+
+    upload = graphene.Field(UploadSessionType)
+    upload_url = graphene.String(description="Presigned URL to PUT the file to")
+
+    class Arguments:
+        filename = graphene.String(required=True)
+        size = graphene.BigInt(required=True)
+        title = graphene.String(required=True)
+        description = graphene.String()
+        content_type = graphene.String()
+
+    @login_required
+    def mutate(self, info, filename, size, title, description=None, content_type=None):
+        user = info.context.user
+        if not hasattr(default_storage, "get_presigned_upload_url"):
+            raise Exception("Direct uploads are not available; use beginUpload")
+        check_upload_size(size)
+        check_title_available(user, title)
+        expire_upload_sessions()
+
+        session = begin_direct_upload(user, filename, size, title, description)
+        upload_url = default_storage.get_presigned_upload_url(
+            session.storage_path, size, content_type=content_type
+        )
+        logger.info(f"Presigned direct upload {session.id} to {session.storage_path}")
+        return RequestTrackUpload(upload=session, upload_url=upload_url)
+
+
+class FinalizeTrackUpload(graphene.Mutation):
+    """Verify a direct upload landed in storage and queue it for processing"""
+
+    track = graphene.Field(TrackType)
+
+    class Arguments:
+        id = graphene.ID(required=True)
+
+    @login_required
+    def mutate(self, info, id):
+        session = get_user_session(info.context.user, id)
+        if not session.storage_path:
+            raise Exception("Upload was not started with requestTrackUpload")
+
+        # exists() and size() are HEAD requests on R2
+        if not default_storage.exists(session.storage_path):
+            raise Exception("The uploaded file was not found in storage")
+        stored_size = default_storage.size(session.storage_path)
+        if stored_size != session.size:
+            discard_upload(session)
+            raise Exception(
+                f"Uploaded file is {stored_size} bytes, expected {session.size}"
+            )
+
+        # The stored file and session survive, so the client can retry
+        check_processing_capacity()
+        try:
+            metadata = validate_stored_upload(session.storage_path)
+        except UploadValidationError:
+            discard_upload(session)
+            raise
+
+        track = create_track(
+            session.user,
+            session.title,
+            session.description,
+            id=session.track_id,
+            audio_file=os.path.dirname(os.path.dirname(session.storage_path)),
+            **probed_fields(metadata),
+        )
+        # Processing hashes the original once it has fetched it
+        # The stored file now belongs to the track
+        session.delete()
+        queue_track(track, session.storage_path)
+
+        return FinalizeTrackUpload(track=track)
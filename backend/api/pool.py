@@ -0,0 +1,40 @@
+"""
+Entry points for processing pool workers.
+
+Spawned workers unpickle these functions before Django is configured, so
+this module must not import models at the top level.
+"""
+
+import django
+
+
+def init_worker():
+    """Set up Django in a freshly spawned pool worker"""
+    django.setup()
+
+
+def run_job_by_id(job_id):
+    """Load a claimed job and run it on the worker's own DB connection"""
+    from api.jobs import run_job
+    from api.models import ProcessingJob
+    from django.db import close_old_connections, connections
+
+    close_old_connections()
+    try:
+        run_job(ProcessingJob.objects.get(pk=job_id))
+    finally:
+        connections.close_all()
+    return job_id
+
+
+def reprocess_item_by_id(item_id):
+    """Reprocess one checkpointed track on the worker's own DB connection"""
+    from api.models import ReprocessItem
+    from api.reprocess import run_item
+    from django.db import close_old_connections, connections
+
+    close_old_connections()
+    try:
+        return run_item(ReprocessItem.objects.get(pk=item_id))
+    finally:
+        connections.close_all()
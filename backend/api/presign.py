@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# SigV4 refuses presigned URLs valid for longer than a week
+MAX_PRESIGN_EXPIRY = 7 * 24 * 60 * 60
+
+
+class PresignedUrlCache:
+    """Thread-safe, size-bounded LRU of presigned URLs"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self._urls.move_to_end(key)
+            return url
+
+    def set(self, key, url):
+        with self._lock:
+            self._urls[key] = url
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+
+local_cache = PresignedUrlCache(settings.PRESIGNED_URL_CACHE_SIZE)
+
+
+def time_bucket(expiration, now=None):
+    """
+    The fixed time window a URL handed out now belongs to.
+
+    Windows are PRESIGNED_URL_BUCKET seconds long (shorter if the requested
+    expiration is), aligned to the epoch so every process agrees on them.
+
+    Returns:
+        (start, end) as Unix timestamps
+    """
+    width = max(1, min(settings.PRESIGNED_URL_BUCKET, expiration))
+    now = time.time() if now is None else now
+    start = int(now // width * width)
+    return start, start + width
+
+
+def shared_cache():
+    """The cross-process cache tier, or None if it isn't configured"""
+    alias = settings.PRESIGNED_URL_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def cached_presigned_url(name, expiration, sign):
+    """
+    Return a presigned URL for `name`, reusing it for a whole time bucket.
+
+    Every request in the same bucket gets the same URL, so browsers and the
+    CDN can cache the object behind it. The URL is signed to stay valid for
+    `expiration` seconds past the end of its bucket, so it's always good for
+    at least that long after being handed out.
+
+    Lookups try this process's LRU first, then the optional shared cache
+    (PRESIGNED_URL_SHARED_CACHE), and only then call `sign`.
+
+    Args:
+        name: Storage name of the object
+        expiration: Minimum seconds the URL must stay valid for
+        sign: Called as sign(name, expires_in) to make a new URL; it may
+            return None on failure, which isn't cached
+    """
+    now = time.time()
+    start, end = time_bucket(expiration, now)
+    key = f"presigned:{expiration}:{start}:{name}"
+
+    url = local_cache.get(key)
+    if url is not None:
+        return url
+
+    shared = shared_cache()
+    if shared is not None:
+        url = shared.get(key)
+        if url is not None:
+            local_cache.set(key, url)
+            return url
+
+    expires_in = min(int(end + expiration - now), MAX_PRESIGN_EXPIRY)
+    url = sign(name, expires_in)
+    if url is None:
+        return None
+
+    if shared is not None:
+        # Keep whichever URL another process stored first, so they all agree
+        if not shared.add(key, url, timeout=int(end - now) + 1):
+            url = shared.get(key) or url
+    local_cache.set(key, url)
+    return url
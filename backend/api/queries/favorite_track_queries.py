@@ -19,7 +19,7 @@ class FavoriteTrackQueries:
             track_ids = FavoriteTrack.objects.filter(user=user).values_list(
                 "track_id", flat=True
             )
-            return Track.objects.filter(id__in=track_ids)
+            return Track.objects.filter(id__in=track_ids).select_related("content")
         except User.DoesNotExist:
             return []
 
@@ -1,6 +1,8 @@
 import graphene
-from api.models import Track, User
+from api.models import Track, UploadSession, User
+from api.types.processing import TrackProcessingStatusType
 from api.types.track import TrackType
+from api.types.upload import UploadSessionType
 from django.db.models import Prefetch
 import re
 
@@ -21,16 +23,21 @@ class TrackQueries:
     track_by_slug = graphene.Field(
         TrackType, username=graphene.String(), slug=graphene.String()
     )
+    track_processing_status = graphene.Field(
+        TrackProcessingStatusType, id=graphene.ID(required=True)
+    )
+    upload_session = graphene.Field(UploadSessionType, id=graphene.ID(required=True))
 
     def resolve_track(self, info, id):
         try:
-            return Track.objects.get(pk=id)
+            return Track.objects.select_related("content").get(pk=id)
         except Track.DoesNotExist:
             return None
 
     def resolve_tracks(self, info, limit=None, orderBy=None):
         # Start with a query that prefetches related data
-        query = Track.objects.select_related("artist").prefetch_related(
+        # audioUrl reads the shared content's path, so join it in too
+        query = Track.objects.select_related("artist", "content").prefetch_related(
             Prefetch("artist__profile")
         )
 
@@ -67,7 +74,7 @@ class TrackQueries:
     def resolve_user_tracks(self, info, username):
         try:
             user = User.objects.get(username=username)
-            return Track.objects.filter(artist=user)
+            return Track.objects.filter(artist=user).select_related("content")
         except User.DoesNotExist:
             return []
 
@@ -76,6 +83,37 @@ class TrackQueries:
             # First find the artist by username
             user = User.objects.get(username=username)
             # Then get their track with the matching slug
-            return Track.objects.get(artist=user, title_slug=slug)
+            return Track.objects.select_related("content").get(
+                artist=user, title_slug=slug
+            )
         except (User.DoesNotExist, Track.DoesNotExist):
             return None
+
+    def resolve_track_processing_status(self, info, id):
+        try:
+            track = Track.objects.get(pk=id)
+        except Track.DoesNotExist:
+            return None
+
+        job = track.processing_jobs.order_by("-created_at").first()
+        is_ready = track.processing_state == Track.ProcessingState.READY
+
+        # Only the artist gets to see why their upload failed
+        user = info.context.user
+        is_owner = user.is_authenticated and track.artist_id == user.id
+
+        return TrackProcessingStatusType(
+            track_id=track.id,
+            state=track.processing_state,
+            progress=100 if is_ready else (job.progress if job else 0),
+            attempts=job.attempts if job else 0,
+            error=job.error if job and is_owner else None,
+            updated_at=job.updated_at if job else track.updated_at,
+        )
+
+    def resolve_upload_session(self, info, id):
+        """Return a resumable upload so its client can continue from the offset"""
+        user = info.context.user
+        if not user.is_authenticated:
+            return None
+        return UploadSession.objects.filter(pk=id, user=user).first()
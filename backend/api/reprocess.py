@@ -0,0 +1,131 @@
+import logging
+import time
+
+from api.audio.pipeline import PRIMARY_RENDITION, TrackProcessingError, process_track
+from api.audio.slots import transcode_slot
+from api.content import sync_content
+from api.models import ReprocessItem, ReprocessRun, Track
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+logger = logging.getLogger("track_processing")
+
+
+def find_original(track):
+    """Storage path of the original upload a track was processed from, or None"""
+    if track.content_id:
+        return track.content.original_path or None
+
+    # Tracks processed before the content index keep it under <base>/orig/
+    orig_dir = f"{track.audio_file}/orig"
+    try:
+        _, files = default_storage.listdir(orig_dir)
+    except (FileNotFoundError, NotImplementedError):
+        return None
+    return f"{orig_dir}/{files[0]}" if files else None
+
+
+def reprocess_track(track):
+    """
+    Rebuild a ready track's renditions and waveform from its stored original.
+
+    Tracks on shared content are rebuilt in the content's directory and the
+    results are copied to every other track on it, so one track per content
+    entry is enough. The track stays playable throughout.
+
+    Raises:
+        TrackProcessingError: If the original is missing or can't be converted
+    """
+    source_path = find_original(track)
+    if source_path is None:
+        raise TrackProcessingError("No original upload to reprocess from")
+
+    content = track.content
+    if content is not None:
+        # Only held in memory; process_track never saves audio_file
+        track.audio_file = content.base_path
+
+    process_track(track, source_path, show_states=False)
+
+    if content is not None:
+        mp3_path = track.renditions.get(name=PRIMARY_RENDITION).path
+        sync_content(track, mp3_path)
+
+
+def select_tracks(tracks):
+    """
+    Reduce a track queryset to the ids worth reprocessing.
+
+    Keeps tracks without shared content, plus one track per content entry,
+    preferring the track whose directory holds the shared files.
+    """
+    track_ids = []
+    seen_content = {}
+    rows = tracks.order_by("created_at").values_list(
+        "id", "content_id", "audio_file", "content__base_path"
+    )
+    for track_id, content_id, audio_file, base_path in rows:
+        if content_id is None:
+            track_ids.append(track_id)
+        elif content_id not in seen_content:
+            seen_content[content_id] = len(track_ids)
+            track_ids.append(track_id)
+        elif audio_file == base_path:
+            track_ids[seen_content[content_id]] = track_id
+    return track_ids
+
+
+def start_run(tracks, filters=None):
+    """Create a run with a pending checkpoint for each selected track"""
+    run = ReprocessRun.objects.create(filters=filters or {})
+    ReprocessItem.objects.bulk_create(
+        [
+            ReprocessItem(run=run, track_id=track_id)
+            for track_id in select_tracks(tracks)
+        ]
+    )
+    return run
+
+
+def run_item(item):
+    """
+    Reprocess one checkpointed track and record the outcome.
+
+    Returns (status, seconds of audio processed).
+    """
+    try:
+        track = Track.objects.select_related("content").get(pk=item.track_id)
+    except Track.DoesNotExist:
+        item.status = ReprocessItem.Status.DONE
+        item.save(update_fields=["status", "updated_at"])
+        return item.status, 0
+
+    start = time.time()
+    try:
+        # Shares the machine-wide limit, so a backfill can't starve uploads
+        with transcode_slot():
+            reprocess_track(track)
+    except Exception as e:
+        logger.error(f"Reprocessing track {track.id} failed: {e}")
+        item.status = ReprocessItem.Status.FAILED
+        item.error = str(e)
+        item.save(update_fields=["status", "error", "updated_at"])
+        return item.status, 0
+
+    logger.info(f"Reprocessed track {track.id} in {time.time() - start:.2f} seconds")
+    item.status = ReprocessItem.Status.DONE
+    item.error = ""
+    item.save(update_fields=["status", "error", "updated_at"])
+    return item.status, track.audio_length
+
+
+def fail_item(item_id, error):
+    """
+    Record a checkpoint as failed when its pool worker raised or died.
+
+    Returns (status, seconds of audio processed), like run_item.
+    """
+    ReprocessItem.objects.filter(pk=item_id).update(
+        status=ReprocessItem.Status.FAILED, error=str(error), updated_at=timezone.now()
+    )
+    return ReprocessItem.Status.FAILED, 0
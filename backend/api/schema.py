@@ -11,6 +11,14 @@ from api.mutations.track_mutations import (
     UploadMultipleTracks,
     UploadTrack,
 )
+from api.mutations.upload_mutations import (
+    AbortUpload,
+    BeginUpload,
+    FinalizeTrackUpload,
+    FinishUpload,
+    RequestTrackUpload,
+    UploadChunk,
+)
 from api.mutations.user_mutations import CreateUser
 from api.mutations.auth_mutations import LoginMutation, LogoutMutation
 from api.queries.favorite_track_queries import FavoriteTrackQueries
@@ -42,6 +50,14 @@ class Mutation(graphene.ObjectType):
     update_track = UpdateTrack.Field()
     delete_track = DeleteTrack.Field()
 
+    # Resumable upload mutations
+    begin_upload = BeginUpload.Field()
+    upload_chunk = UploadChunk.Field()
+    finish_upload = FinishUpload.Field()
+    abort_upload = AbortUpload.Field()
+    request_track_upload = RequestTrackUpload.Field()
+    finalize_track_upload = FinalizeTrackUpload.Field()
+
     # Follow mutations
     follow_user = FollowUser.Field()
     unfollow_user = UnfollowUser.Field()
@@ -1,7 +1,109 @@
+import functools
+import logging
+import os
+import threading
+
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from django.conf import settings
 import boto3
 
+logger = logging.getLogger("track_processing")
+
+# (client, resource class) shared by every storage instance in this process
+_shared = None
+_shared_lock = threading.Lock()
+# Each thread's S3 resource, wrapping the shared client
+_local = threading.local()
+
+
+def _reset_pool():
+    """Forget the parent's client in a forked child; its sockets aren't ours"""
+    global _shared, _shared_lock
+    _shared = None
+    _shared_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_pool)
+
+
+def client_config():
+    """botocore config for R2: a large keep-alive connection pool and retries"""
+    return Config(
+        s3={"addressing_style": settings.AWS_S3_ADDRESSING_STYLE},
+        signature_version=settings.AWS_S3_SIGNATURE_VERSION,
+        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries={"max_attempts": settings.AWS_S3_MAX_ATTEMPTS, "mode": "standard"},
+    )
+
+
+def _get_shared():
+    global _shared
+    shared = _shared
+    if shared is None:
+        with _shared_lock:
+            if _shared is None:
+                session = boto3.session.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME,
+                )
+                resource = session.resource(
+                    "s3",
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    config=client_config(),
+                )
+                _shared = (resource.meta.client, type(resource))
+            shared = _shared
+    return shared
+
+
+def get_client():
+    """
+    The process's S3 client for R2, created on first use.
+
+    Building a session and client loads the service model and resolves
+    credentials, which takes milliseconds and megabytes, so it's done once
+    and the client (which is thread-safe) and its connection pool are
+    shared. A forked worker builds its own on first use.
+    """
+    return _get_shared()[0]
+
+
+def get_resource():
+    """
+    An S3 resource for the calling thread.
+
+    Resources aren't thread-safe, so each thread gets its own, but they're
+    only a thin layer over the shared client.
+    """
+    client, resource_class = _get_shared()
+    resource = getattr(_local, "resource", None)
+    if resource is None or resource.meta.client is not client:
+        resource = resource_class(client=client)
+        _local.resource = resource
+    return resource
+
+
+class PartialDeleteError(Exception):
+    """Raised when some objects under a prefix couldn't be deleted"""
+
+    def __init__(self, prefix, failed_keys):
+        self.prefix = prefix
+        self.failed_keys = failed_keys
+        super().__init__(
+            f"Could not delete {len(failed_keys)} object(s) under {prefix}"
+        )
+
+
+@functools.cache
+def get_storage():
+    """The process's CloudflareR2Storage; it holds no per-process state"""
+    return CloudflareR2Storage()
+
 
 class CloudflareR2Storage(S3Boto3Storage):
     """
@@ -32,40 +134,91 @@ class CloudflareR2Storage(S3Boto3Storage):
             custom_domain=None,  # Don't use custom domain
             addressing_style=settings.AWS_S3_ADDRESSING_STYLE,
             signature_version=settings.AWS_S3_SIGNATURE_VERSION,
+            client_config=client_config(),
             default_acl=settings.AWS_DEFAULT_ACL,
             querystring_auth=settings.AWS_QUERYSTRING_AUTH,
+            # Large files go up (and down) as parallel multipart transfers
+            transfer_config=TransferConfig(
+                multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+                max_concurrency=settings.AWS_S3_MAX_CONCURRENCY,
+            ),
             *args,
             **kwargs,
         )
 
-        # Test connection upon initialization in debug mode
-        if settings.DEBUG:
-            try:
-                # Check if we can list the bucket
-                self.bucket.objects.all().limit(1)
-                print(f"✅ Successfully connected to R2 bucket: {self.bucket_name}")
-            except Exception as e:
-                print(f"⚠️ R2 connection ERROR: {e}")
-
-    def _get_connection(self):
-        """Override the connection method to ensure proper R2 initialization"""
-        if self._connections.get(self.access_key) is None:
-            # Create a new connection with explicit settings
-            connection = boto3.resource(
-                "s3",
-                aws_access_key_id=self.access_key,
-                aws_secret_access_key=self.secret_key,
-                endpoint_url=self.endpoint_url,
-                region_name=settings.AWS_S3_REGION_NAME,
-                config=boto3.session.Config(
-                    s3={"addressing_style": settings.AWS_S3_ADDRESSING_STYLE},
-                    signature_version=settings.AWS_S3_SIGNATURE_VERSION,
-                ),
+    @property
+    def connection(self):
+        """This thread's resource over the process-wide client"""
+        return get_resource()
+
+    @property
+    def bucket(self):
+        return self.connection.Bucket(self.bucket_name)
+
+    def download_to_path(self, name, local_path):
+        """
+        Download an object straight to a local file.
+
+        Uses boto3's managed transfer, so large objects are fetched as
+        parallel ranged GETs without being buffered in memory.
+        """
+        self.bucket.download_file(
+            self._normalize_name(clean_name(name)),
+            local_path,
+            Config=self.transfer_config,
+        )
+
+    def iter_chunks(self, name, chunk_size=1024 * 1024):
+        """
+        Stream an object's bytes from a single GET without a local copy.
+
+        Lets processing pipe an original straight into ffmpeg.
+        """
+        body = self.bucket.Object(self._normalize_name(clean_name(name))).get()["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete_prefix(self, prefix):
+        """
+        Delete every object under a directory-like prefix.
+
+        Keys are listed a page at a time and each page (up to 1000 keys) is
+        removed with a single DeleteObjects request, instead of one request
+        per object.
+
+        Returns:
+            int: The number of objects deleted
+
+        Raises:
+            PartialDeleteError: If any object couldn't be deleted
+        """
+        key_prefix = self.name_for_path(clean_name(prefix)).rstrip("/") + "/"
+        client = self.connection.meta.client
+        paginator = client.get_paginator("list_objects_v2")
+
+        deleted = 0
+        failed_keys = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=key_prefix):
+            keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if not keys:
+                continue
+            response = client.delete_objects(
+                Bucket=self.bucket_name, Delete={"Objects": keys, "Quiet": True}
             )
-            self._connections[self.access_key] = connection
+            errors = response.get("Errors", [])
+            for error in errors:
+                logger.error(f"Could not delete {error['Key']}: {error.get('Message')}")
+                failed_keys.append(error["Key"])
+            deleted += len(keys) - len(errors)
 
-        # Return the connection
-        return self._connections[self.access_key]
+        # The rest of the prefix is gone; report the stragglers so the
+        # caller can retry instead of assuming it's empty
+        if failed_keys:
+            raise PartialDeleteError(prefix, failed_keys)
+        return deleted
 
     def get_presigned_url(self, name, expiration=3600):
         """
@@ -78,21 +231,9 @@ class CloudflareR2Storage(S3Boto3Storage):
         Returns:
             str: The presigned URL
         """
-        s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            endpoint_url=self.endpoint_url,
-            region_name=settings.AWS_S3_REGION_NAME,
-            config=boto3.session.Config(
-                s3={"addressing_style": settings.AWS_S3_ADDRESSING_STYLE},
-                signature_version=settings.AWS_S3_SIGNATURE_VERSION,
-            ),
-        )
-
         try:
             # Generate the presigned URL
-            url = s3_client.generate_presigned_url(
+            url = get_client().generate_presigned_url(
                 "get_object",
                 Params={
                     "Bucket": self.bucket_name,
@@ -106,6 +247,27 @@ class CloudflareR2Storage(S3Boto3Storage):
                 print(f"Error generating presigned URL: {e}")
             return None
 
+    def get_presigned_upload_url(
+        self, name, content_length, content_type=None, expiration=3600
+    ):
+        """
+        Generate a presigned PUT URL for uploading an object directly.
+
+        The signature covers the content length, so the upload must be
+        exactly content_length bytes (and of content_type, if given).
+        """
+        params = {
+            "Bucket": self.bucket_name,
+            "Key": self.name_for_path(name),
+            "ContentLength": content_length,
+        }
+        if content_type:
+            params["ContentType"] = content_type
+
+        return self.connection.meta.client.generate_presigned_url(
+            "put_object", Params=params, ExpiresIn=expiration
+        )
+
     def name_for_path(self, name):
         """
         Get the properly formatted name (key) for a path
@@ -15,7 +15,13 @@ from api.schema import schema
 TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+# Run the processing pipeline inline so uploads are ready when mutations return.
+# Pool workers can't see the test database, so keep processing in-process.
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    TRACK_PROCESSING_EAGER=True,
+    TRACK_PROCESSING_CONCURRENCY=1,
+)
 class BaseAudioTestCase(TestCase):
     GRAPHQL_URL = "/graphql"
 
@@ -1,6 +1,16 @@
+import base64
+import json
 import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import numpy as np
 from django.core.files.storage import default_storage
-from .base import BaseAudioTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from .base import TEMP_MEDIA_ROOT, BaseAudioTestCase
 from api.models import Track
 
 
@@ -79,6 +89,10 @@ class AudioProcessingTests(BaseAudioTestCase):
                     track {
                         id
                         audioWaveformData
+                        audioWaveformPeaks
+                        audioWaveformResolution
+                        thumbnail: audioWaveform(resolution: 64)
+                        full: audioWaveform
                         audioFile
                     }
                 }
@@ -100,6 +114,27 @@ class AudioProcessingTests(BaseAudioTestCase):
             "Waveform data not generated during track upload",
         )
 
+        # The packed peaks decode to the same values as the JSON field
+        track_data = response.data["uploadTrack"]["track"]
+        peaks = base64.b64decode(track_data["audioWaveformPeaks"])
+        self.assertEqual(
+            [round(byte / 255, 2) for byte in peaks],
+            json.loads(track_data["audioWaveformData"]),
+        )
+
+        # The legacy fields report the length of the level they serve
+        self.assertEqual(len(peaks), track_data["audioWaveformResolution"])
+        self.assertEqual(
+            len(json.loads(track_data["audioWaveformData"])),
+            track_data["audioWaveformResolution"],
+        )
+
+        # Every level comes from the one stored pyramid
+        track = Track.objects.get(id=track_id)
+        self.assertEqual(track.audio_waveform_resolution, 4096)
+        self.assertEqual(len(base64.b64decode(track_data["thumbnail"])), 64)
+        self.assertEqual(len(base64.b64decode(track_data["full"])), 4096)
+
         # Verify the MP3 path where waveform should be generated from
         user_id = str(self.user.id)
         mp3_path = f"{user_id}/audio/{track_id}/320/{track_id}.mp3"
@@ -108,3 +143,344 @@ class AudioProcessingTests(BaseAudioTestCase):
         # Clean up
         track = Track.objects.get(id=track_id)
         track.delete()
+
+    def test_upload_records_probed_metadata(self):
+        """Test that the original's header metadata is stored on the track"""
+        query = """
+            mutation($file: Upload!, $title: String!) {
+                uploadTrack(file: $file, title: $title) {
+                    track {
+                        audioLength
+                        audioCodec
+                        audioSampleRate
+                        audioChannels
+                        audioBitrate
+                    }
+                }
+            }
+        """
+        variables = {"file": self.audio_file, "title": "Probe Test"}
+        response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        track = response.data["uploadTrack"]["track"]
+        self.assertEqual(track["audioCodec"], "aac")
+        self.assertEqual(track["audioSampleRate"], 44100)
+        self.assertEqual(track["audioChannels"], 1)
+        self.assertGreater(track["audioBitrate"], 0)
+        self.assertEqual(track["audioLength"], 27)
+
+    def test_duration_is_read_without_decoding(self):
+        """Test that get_audio_duration reads the header instead of decoding"""
+        from api.audio.transcode import get_audio_duration
+
+        test_file_path = os.path.join(
+            os.path.dirname(__file__), "fixtures/test_audio.m4a"
+        )
+        with mock.patch(
+            "api.audio.transcode.AudioSegment.from_file",
+            side_effect=AssertionError("duration decoded the whole file"),
+        ):
+            self.assertEqual(get_audio_duration(test_file_path), 27)
+
+    def test_pcm_buffer_shared_by_encoder_and_waveform(self):
+        """Test that one PCM decode feeds both the MP3 encoder and the waveform"""
+        from api.audio.decode import decode_to_pcm
+        from api.audio.waveform import generate_waveform_from_pcm
+
+        test_file_path = os.path.join(
+            os.path.dirname(__file__), "fixtures/test_audio.m4a"
+        )
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            pcm = decode_to_pcm(test_file_path, scratch_dir)
+            self.assertIsNotNone(pcm)
+            self.assertTrue(pcm.duration > 0)
+
+            waveform_data, duration = generate_waveform_from_pcm(pcm)
+            pcm.close()
+        self.assertEqual(len(waveform_data), 200)
+        self.assertEqual(max(waveform_data), 1.0)
+        self.assertEqual(duration, round(pcm.duration))
+
+        # The upload pipeline should never fall back to a second full decode
+        query = """
+            mutation($file: Upload!, $title: String!) {
+                uploadTrack(file: $file, title: $title) {
+                    track {
+                        id
+                        audioLength
+                        audioWaveformResolution
+                    }
+                }
+            }
+        """
+        variables = {"file": self.audio_file, "title": "Decode Once Test"}
+        with mock.patch(
+            "api.audio.waveform.AudioSegment.from_file",
+            side_effect=AssertionError("waveform decoded the MP3 again"),
+        ), mock.patch(
+            "api.audio.transcode.AudioSegment.from_file",
+            side_effect=AssertionError("transcoder decoded the original again"),
+        ):
+            response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        track = response.data["uploadTrack"]["track"]
+        self.assertEqual(track["audioWaveformResolution"], 256)
+        self.assertEqual(track["audioLength"], duration)
+
+    @override_settings(
+        TRACK_RENDITIONS=[
+            {"name": "320", "codec": "mp3", "bitrate": "320k"},
+            {"name": "128", "codec": "mp3", "bitrate": "128k"},
+            {"name": "opus64", "codec": "opus", "bitrate": "64k"},
+        ]
+    )
+    def test_rendition_ladder(self):
+        """Test that every configured rendition is stored and listed"""
+        query = """
+            mutation($file: Upload!, $title: String!) {
+                uploadTrack(file: $file, title: $title) {
+                    track {
+                        id
+                        audioUrl
+                        audioSources {
+                            name
+                            codec
+                            bitrate
+                            mimeType
+                            size
+                            url
+                        }
+                    }
+                }
+            }
+        """
+        variables = {"file": self.audio_file, "title": "Rendition Test"}
+        response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        track = response.data["uploadTrack"]["track"]
+        sources = track["audioSources"]
+        self.assertEqual(
+            [source["name"] for source in sources], ["opus64", "128", "320"]
+        )
+        self.assertEqual([source["bitrate"] for source in sources], [64, 128, 320])
+        self.assertEqual(sources[0]["mimeType"], "audio/ogg; codecs=opus")
+        self.assertEqual(sources[-1]["url"], track["audioUrl"])
+
+        # Lower bitrates should actually cost fewer bytes
+        sizes = [source["size"] for source in sources]
+        self.assertEqual(sizes, sorted(sizes))
+        for rendition in Track.objects.get(pk=track["id"]).renditions.all():
+            self.assertTrue(default_storage.exists(rendition.path))
+            self.assertEqual(default_storage.size(rendition.path), rendition.size)
+
+    @override_settings(TRACK_HLS_ENABLED=True, TRACK_HLS_SEGMENT_SECONDS=1)
+    def test_hls_output(self):
+        """Test that HLS segments are stored and served through a signed playlist"""
+        query = """
+            mutation($file: Upload!, $title: String!) {
+                uploadTrack(file: $file, title: $title) {
+                    track {
+                        id
+                        hlsManifestUrl
+                        audioSources {
+                            name
+                        }
+                    }
+                }
+            }
+        """
+        variables = {"file": self.audio_file, "title": "HLS Test"}
+        response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        track = response.data["uploadTrack"]["track"]
+        self.assertNotIn("hls", [source["name"] for source in track["audioSources"]])
+        self.assertEqual(track["hlsManifestUrl"], f"/api/tracks/{track['id']}/hls.m3u8")
+
+        response = self.django_client.get(track["hlsManifestUrl"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.apple.mpegurl")
+        playlist = response.content.decode()
+        self.assertTrue(playlist.startswith("#EXTM3U"))
+
+        # Every segment (and the fMP4 init section) points at a stored file
+        hls_dir = f"{self.user.id}/audio/{track['id']}/hls"
+        uris = [line for line in playlist.splitlines() if not line.startswith("#")]
+        uris.append(playlist.split('URI="', 1)[1].split('"', 1)[0])
+        self.assertGreater(len(uris), 2)
+        for uri in filter(None, uris):
+            name = uri.rsplit("/", 1)[1]
+            self.assertEqual(uri, default_storage.url(f"{hls_dir}/{name}"))
+            self.assertTrue(default_storage.exists(f"{hls_dir}/{name}"))
+
+    def test_hls_disabled_by_default(self):
+        """Test that no playlist is produced unless HLS is enabled"""
+        query = """
+            mutation($file: Upload!, $title: String!) {
+                uploadTrack(file: $file, title: $title) {
+                    track {
+                        hlsManifestUrl
+                    }
+                }
+            }
+        """
+        variables = {"file": self.audio_file, "title": "No HLS Test"}
+        response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        self.assertIsNone(response.data["uploadTrack"]["track"]["hlsManifestUrl"])
+
+
+class WaveformEngineTests(SimpleTestCase):
+    def test_stereo_buckets_keep_frames_together(self):
+        """Test RMS and peaks over interleaved stereo samples"""
+        from api.audio.waveform import MAX, MIN, RMS, compute_waveform
+
+        # Left channel is a constant 1000, right channel alternates +/-2000
+        frames = 400
+        left = np.full(frames, 1000, dtype=np.int16)
+        right = np.tile(np.array([2000, -2000], dtype=np.int16), frames // 2)
+        samples = np.column_stack([left, right]).ravel()
+
+        waveform = compute_waveform(samples, resolution=4, channels=2)
+        self.assertIsInstance(waveform, np.ndarray)
+        self.assertEqual(waveform.shape, (4, 3))
+        expected_rms = np.sqrt((1000**2 + 2000**2) / 2)
+        np.testing.assert_allclose(waveform[:, RMS], expected_rms, rtol=1e-5)
+        np.testing.assert_array_equal(waveform[:, MIN], -2000)
+        np.testing.assert_array_equal(waveform[:, MAX], 2000)
+
+    def test_matches_per_chunk_rms(self):
+        """Test that the vectorized RMS matches a straightforward chunked RMS"""
+        from api.audio.waveform import RMS, compute_waveform, normalize_waveform
+
+        rng = np.random.default_rng(1)
+        samples = (rng.standard_normal(10_000) * 3000).astype(np.int16)
+        expected = [
+            np.sqrt(np.mean(chunk.astype(np.float64) ** 2))
+            for chunk in samples.reshape(100, 100)
+        ]
+
+        waveform = compute_waveform(samples, resolution=100)
+        np.testing.assert_allclose(waveform[:, RMS], expected, rtol=1e-4)
+        self.assertEqual(
+            normalize_waveform(waveform[:, RMS]), normalize_waveform(expected)
+        )
+
+    def test_short_and_empty_input(self):
+        """Test buffers with fewer frames than the requested resolution"""
+        from api.audio.waveform import compute_waveform, normalize_waveform
+
+        self.assertEqual(
+            compute_waveform(np.ones(6, dtype=np.int16), 200, 2).shape, (3, 3)
+        )
+        empty = compute_waveform(np.zeros(0, dtype=np.int16), 200)
+        self.assertEqual(empty.shape, (0, 3))
+        self.assertEqual(normalize_waveform(empty[:, 0]), [])
+
+    def test_streaming_matches_whole_buffer(self):
+        """Test that block-by-block accumulation matches the whole-buffer engine"""
+        from api.audio.waveform import StreamingWaveform, compute_waveform
+
+        rng = np.random.default_rng(2)
+        frames = 48_000
+        samples = (rng.standard_normal(frames * 2) * 5000).astype(np.int16)
+
+        streaming = StreamingWaveform(frames, resolution=120, channels=2)
+        # Blocks that don't line up with bucket boundaries
+        for start in range(0, frames, 7_001):
+            streaming.feed(samples[start * 2 : (start + 7_001) * 2])
+
+        self.assertEqual(streaming.frames_seen, frames)
+        np.testing.assert_allclose(
+            streaming.result(), compute_waveform(samples, 120, 2), rtol=1e-4
+        )
+
+    def test_streaming_overrun_lands_in_last_bucket(self):
+        """Test that frames past the probed duration don't grow the output"""
+        from api.audio.waveform import MAX, StreamingWaveform
+
+        streaming = StreamingWaveform(100, resolution=10)
+        streaming.feed(np.ones(100, dtype=np.int16))
+        streaming.feed(np.full(50, 9, dtype=np.int16))
+
+        result = streaming.result()
+        self.assertEqual(result.shape, (10, 3))
+        self.assertEqual(result[-1, MAX], 9)
+        self.assertEqual(result[0, MAX], 1)
+
+    def test_packed_peaks_round_trip(self):
+        """Test that packed waveforms take one byte per bucket and survive unpacking"""
+        from api.audio.peaks import pack_waveform, unpack_waveform
+
+        values = [0.0, 0.25, 0.5, 1.0, 1.4, -0.1]
+        packed = pack_waveform(values)
+
+        self.assertEqual(len(packed), len(values))
+        self.assertEqual(unpack_waveform(packed), [0.0, 0.25, 0.5, 1.0, 1.0, 0.0])
+        self.assertEqual(unpack_waveform(b""), [])
+
+    def test_pyramid_levels(self):
+        """Test that each pyramid level halves the one above and keeps its peaks"""
+        from api.audio.peaks import pack_pyramid, pyramid_level, pyramid_sizes
+
+        self.assertEqual(pyramid_sizes(4096), [4096, 2048, 1024, 512, 256, 128, 64])
+        self.assertEqual(pyramid_sizes(200), [200, 100])
+        self.assertEqual(pyramid_sizes(40), [40])
+
+        values = np.zeros(4096)
+        values[1000] = 1.0
+        packed = pack_pyramid(values)
+        self.assertEqual(len(packed), sum(pyramid_sizes(4096)))
+
+        thumbnail = pyramid_level(packed, 4096, 64)
+        self.assertEqual(len(thumbnail), 64)
+        self.assertEqual(thumbnail[1000 // 64], 255)
+        self.assertEqual(sum(thumbnail), 255)
+
+        # Requests get the nearest stored level, capped at the finest
+        self.assertEqual(len(pyramid_level(packed, 4096, 200)), 256)
+        self.assertEqual(len(pyramid_level(packed, 4096, 600)), 512)
+        self.assertEqual(len(pyramid_level(packed, 4096, 10)), 64)
+        self.assertEqual(len(pyramid_level(packed, 4096, 10_000)), 4096)
+        self.assertEqual(len(pyramid_level(packed, 4096)), 4096)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchAudioTests(SimpleTestCase):
+    def test_results_and_baseline_check(self):
+        """Test that every stage is measured and regressions fail the run"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = os.path.join(temp_dir, "bench.json")
+            call_command(
+                "bench_audio",
+                "--durations=2s",
+                "--formats=wav",
+                f"--output={output}",
+                stdout=StringIO(),
+            )
+            with open(output) as f:
+                results = json.load(f)["results"]
+            self.assertEqual(
+                set(results["wav-2s"]),
+                {"probe", "decode", "transcode", "waveform", "save"},
+            )
+            for metrics in results["wav-2s"].values():
+                self.assertGreater(metrics["peak_rss_mb"], 0)
+            self.assertGreater(results["wav-2s"]["transcode"]["cpu"], 0)
+
+            # A baseline far faster than anything achievable
+            baseline = os.path.join(temp_dir, "baseline.json")
+            results["wav-2s"]["transcode"]["wall"] = 0.0
+            with open(baseline, "w") as f:
+                json.dump({"results": results}, f)
+            with self.assertRaisesMessage(CommandError, "wav-2s transcode wall"):
+                call_command(
+                    "bench_audio",
+                    "--durations=2s",
+                    "--formats=wav",
+                    f"--baseline={baseline}",
+                    stdout=StringIO(),
+                )
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from api import presign
+from api.presign import PresignedUrlCache, cached_presigned_url, time_bucket
+from api.utils import storage_url
+
+HOUR = 60 * 60
+
+
+class FakeSigner:
+    """Signs URLs that record when and for how long they were signed"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, name, expires_in):
+        self.calls.append((name, expires_in))
+        return f"https://r2.example/{name}?n={len(self.calls)}&expires={expires_in}"
+
+
+@override_settings(PRESIGNED_URL_BUCKET=6 * HOUR, PRESIGNED_URL_SHARED_CACHE=None)
+class PresignedUrlCacheTests(SimpleTestCase):
+    def setUp(self):
+        presign.local_cache.clear()
+        self.sign = FakeSigner()
+
+    def at(self, timestamp):
+        return mock.patch("api.presign.time.time", return_value=timestamp)
+
+    def test_buckets_are_aligned_and_capped_by_expiration(self):
+        self.assertEqual(time_bucket(24 * HOUR, now=7 * HOUR), (6 * HOUR, 12 * HOUR))
+        self.assertEqual(
+            time_bucket(600, now=7 * HOUR + 30), (7 * HOUR, 7 * HOUR + 600)
+        )
+
+    def test_same_url_for_a_whole_bucket(self):
+        """Test that a URL is reused until its bucket ends"""
+        with self.at(6 * HOUR + 10):
+            first = cached_presigned_url("a/320/a.mp3", 24 * HOUR, self.sign)
+        with self.at(12 * HOUR - 1):
+            self.assertEqual(
+                cached_presigned_url("a/320/a.mp3", 24 * HOUR, self.sign), first
+            )
+        # Valid for the full expiration past the end of the bucket
+        self.assertEqual(self.sign.calls, [("a/320/a.mp3", 30 * HOUR - 10)])
+
+        with self.at(12 * HOUR):
+            second = cached_presigned_url("a/320/a.mp3", 24 * HOUR, self.sign)
+        self.assertNotEqual(second, first)
+        self.assertEqual(len(self.sign.calls), 2)
+
+    def test_failed_signatures_are_not_cached(self):
+        with self.at(HOUR):
+            self.assertIsNone(cached_presigned_url("x", 600, lambda *args: None))
+            self.assertIsNotNone(cached_presigned_url("x", 600, self.sign))
+
+    def test_least_recently_used_urls_are_evicted(self):
+        cache = PresignedUrlCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+
+    @override_settings(
+        PRESIGNED_URL_SHARED_CACHE="presigned",
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "presigned": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "presigned-url-tests",
+            },
+        },
+    )
+    def test_shared_cache_gives_every_process_the_same_url(self):
+        """Test that a URL signed by one process is reused by another"""
+        with self.at(HOUR):
+            first = cached_presigned_url("p.jpg", 24 * HOUR, self.sign)
+            # Another process starts with an empty LRU
+            presign.local_cache.clear()
+            self.assertEqual(cached_presigned_url("p.jpg", 24 * HOUR, self.sign), first)
+        self.assertEqual(len(self.sign.calls), 1)
+        caches["presigned"].clear()
+
+    @override_settings(USE_CLOUDFLARE_R2=True)
+    def test_storage_url_only_signs_once(self):
+        with mock.patch("api.utils.sign_r2_url", side_effect=self.sign):
+            urls = {storage_url("u/audio/t/320/t.mp3") for _ in range(50)}
+        self.assertEqual(len(urls), 1)
+        self.assertEqual(len(self.sign.calls), 1)
@@ -1,7 +1,19 @@
 import os
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import boto3
+from botocore.stub import Stubber
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from .base import BaseAudioTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from .base import TEMP_MEDIA_ROOT, BaseAudioTestCase
 from api.models import Track
+from api import storage as r2
+from api.storage import CloudflareR2Storage, PartialDeleteError
+from api.utils import delete_storage_prefix
 
 
 class TrackMutationTests(BaseAudioTestCase):
@@ -81,7 +93,9 @@ class TrackMutationTests(BaseAudioTestCase):
                 }}
             }}
         """
-        response = self.execute(delete_query)
+        # Eager mode purges the tombstoned files once the delete commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.execute(delete_query)
         # Check for errors in the response
         self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
         # Check that deleteTrack field exists and has success property
@@ -142,3 +156,244 @@ class TrackMutationTests(BaseAudioTestCase):
         self.assertIsNotNone(response.errors, "Expected errors in response")
         error_message = str(response.errors[0])
         self.assertIn("You already have a track with that title", error_message)
+
+    def test_upload_multiple_tracks_keeps_input_order(self):
+        """Test batch uploads isolate failures and return tracks in input order"""
+        query = """
+            mutation($files: [Upload]!, $titles: [String]!) {
+                uploadMultipleTracks(files: $files, titles: $titles) {
+                    tracks {
+                        id
+                        title
+                        processingState
+                    }
+                    failedUploads
+                }
+            }
+        """
+
+        with open(
+            os.path.join(os.path.dirname(__file__), "fixtures/test_audio.m4a"), "rb"
+        ) as f:
+            audio_bytes = f.read()
+        files = [
+            SimpleUploadedFile("first.m4a", audio_bytes, content_type="audio/mp4"),
+            SimpleUploadedFile("broken.m4a", b"not audio", content_type="audio/mp4"),
+            SimpleUploadedFile("third.m4a", audio_bytes, content_type="audio/mp4"),
+        ]
+        variables = {"files": files, "titles": ["First", "Broken", "Third"]}
+
+        response = self.execute(query, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        result = response.data["uploadMultipleTracks"]
+        self.assertEqual([t["title"] for t in result["tracks"]], ["First", "Third"])
+        self.assertTrue(all(t["processingState"] == "READY" for t in result["tracks"]))
+        self.assertEqual(len(result["failedUploads"]), 1)
+        self.assertIn("Broken", result["failedUploads"][0])
+
+        # The failed track is removed, the others remain
+        self.assertEqual(
+            list(
+                Track.objects.filter(artist=self.user)
+                .values_list("title", flat=True)
+                .order_by("title")
+            ),
+            ["First", "Third"],
+        )
+
+
+UPLOAD_MUTATION = """
+    mutation($file: Upload!, $title: String!) {
+        uploadTrack(file: $file, title: $title) {
+            track {
+                id
+                audioLength
+                audioCodec
+            }
+        }
+    }
+"""
+
+
+class UploadValidationTests(BaseAudioTestCase):
+    def assertRejected(self, file, message):
+        response = self.execute(
+            UPLOAD_MUTATION, variables={"file": file, "title": "Rejected"}
+        )
+        self.assertIsNotNone(response.errors)
+        self.assertIn(message, response.errors[0]["message"])
+        # Nothing was written to the database or storage
+        self.assertFalse(Track.objects.exists())
+        self.assertFalse(default_storage.exists(str(self.user.id)))
+
+    def test_unrecognized_file_is_rejected_without_probing(self):
+        """Test that garbage is refused from its first bytes alone"""
+        garbage = SimpleUploadedFile("song.mp3", b"<html>not audio</html>" * 50)
+        with mock.patch(
+            "api.audio.validate.probe_audio",
+            side_effect=AssertionError("garbage upload was probed"),
+        ):
+            self.assertRejected(garbage, "isn't a recognized audio format")
+
+    def test_file_without_audio_is_rejected(self):
+        """Test that a valid container header alone isn't enough"""
+        fake = SimpleUploadedFile("song.wav", b"RIFF\x00\x00\x00\x00WAVEjunk" * 10)
+        self.assertRejected(fake, "doesn't contain playable audio")
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_oversized_file_is_rejected(self):
+        """Test that UPLOAD_MAX_SIZE is enforced"""
+        self.assertRejected(self.audio_file, "File is too large")
+
+    @override_settings(UPLOAD_MAX_DURATION=10)
+    def test_overlong_audio_is_rejected(self):
+        """Test that UPLOAD_MAX_DURATION is enforced from the probed header"""
+        self.assertRejected(self.audio_file, "Audio is too long")
+
+    @override_settings(UPLOAD_ALLOWED_CODECS=["mp3", "flac"])
+    def test_disallowed_codec_is_rejected(self):
+        """Test that UPLOAD_ALLOWED_CODECS is enforced"""
+        self.assertRejected(self.audio_file, "Unsupported audio codec 'aac'")
+
+    def test_valid_upload_records_probed_fields_immediately(self):
+        """Test that validation's probe fills in the track before processing"""
+        with self.settings(TRACK_PROCESSING_EAGER=False):
+            response = self.execute(
+                UPLOAD_MUTATION,
+                variables={"file": self.audio_file, "title": "Accepted"},
+            )
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        track = response.data["uploadTrack"]["track"]
+        self.assertEqual(track["audioCodec"], "aac")
+        self.assertEqual(track["audioLength"], 27)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class StoragePrefixDeletionTests(SimpleTestCase):
+    def test_local_prefix_is_removed_as_a_tree(self):
+        """Test that only files under the prefix directory are deleted"""
+        for name in ("a/audio/1/orig/x.m4a", "a/audio/1/320/x.mp3", "a/audio/10/y"):
+            default_storage.save(name, ContentFile(b"data"))
+
+        self.assertEqual(delete_storage_prefix("a/audio/1"), 2)
+        self.assertFalse(default_storage.exists("a/audio/1"))
+        self.assertTrue(default_storage.exists("a/audio/10/y"))
+        self.assertEqual(delete_storage_prefix("a/audio/1"), 0)
+        with self.assertRaises(ValueError):
+            delete_storage_prefix("/")
+
+    def test_r2_prefix_is_deleted_in_batches(self):
+        """Test that each listed page of keys is removed with one request"""
+        client = boto3.client(
+            "s3",
+            region_name="auto",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+        )
+        storage = CloudflareR2Storage.__new__(CloudflareR2Storage)
+        storage.bucket_name = "bucket"
+
+        pages = [[f"u/audio/1/hls/{i}.m4s" for i in range(1000)], ["u/audio/1/x"]]
+        with Stubber(client) as stubber, mock.patch.object(
+            CloudflareR2Storage,
+            "connection",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(meta=SimpleNamespace(client=client)),
+        ):
+            for page, keys in enumerate(pages):
+                listing = {"Contents": [{"Key": key} for key in keys]}
+                listing["IsTruncated"] = page == 0
+                if page == 0:
+                    listing["NextContinuationToken"] = "next"
+                request = {"Bucket": "bucket", "Prefix": "u/audio/1/"}
+                if page == 1:
+                    request["ContinuationToken"] = "next"
+                stubber.add_response("list_objects_v2", listing, request)
+                stubber.add_response(
+                    "delete_objects",
+                    {},
+                    {
+                        "Bucket": "bucket",
+                        "Delete": {
+                            "Objects": [{"Key": key} for key in keys],
+                            "Quiet": True,
+                        },
+                    },
+                )
+            self.assertEqual(storage.delete_prefix("u/audio/1"), 1001)
+            stubber.assert_no_pending_responses()
+
+    def test_r2_partial_delete_raises(self):
+        """Test that keys R2 refused to delete are reported, not swallowed"""
+        client = boto3.client(
+            "s3",
+            region_name="auto",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+        )
+        storage = CloudflareR2Storage.__new__(CloudflareR2Storage)
+        storage.bucket_name = "bucket"
+
+        keys = ["u/audio/1/a.mp3", "u/audio/1/b.mp3"]
+        with Stubber(client) as stubber, mock.patch.object(
+            CloudflareR2Storage,
+            "connection",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(meta=SimpleNamespace(client=client)),
+        ):
+            stubber.add_response(
+                "list_objects_v2",
+                {"Contents": [{"Key": key} for key in keys], "IsTruncated": False},
+            )
+            stubber.add_response(
+                "delete_objects",
+                {
+                    "Errors": [
+                        {"Key": keys[1], "Code": "InternalError", "Message": "retry"}
+                    ]
+                },
+            )
+            with self.assertRaises(PartialDeleteError) as raised:
+                storage.delete_prefix("u/audio/1")
+        self.assertEqual(raised.exception.failed_keys, [keys[1]])
+
+
+@override_settings(
+    AWS_ACCESS_KEY_ID="test",
+    AWS_SECRET_ACCESS_KEY="test",
+    AWS_S3_ENDPOINT_URL="https://r2.example",
+    AWS_S3_REGION_NAME="auto",
+    AWS_S3_ADDRESSING_STYLE="path",
+    AWS_S3_SIGNATURE_VERSION="s3v4",
+    AWS_S3_MAX_POOL_CONNECTIONS=32,
+    AWS_S3_MAX_ATTEMPTS=5,
+)
+class R2ClientPoolTests(SimpleTestCase):
+    def setUp(self):
+        r2._reset_pool()
+        self.addCleanup(r2._reset_pool)
+
+    def test_client_is_shared_across_threads(self):
+        """Test that every thread gets its own resource over one client"""
+        client = r2.get_client()
+        self.assertIs(r2.get_client(), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 32)
+        self.assertTrue(client.meta.config.tcp_keepalive)
+
+        resources = []
+        thread = threading.Thread(target=lambda: resources.append(r2.get_resource()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(resources[0], r2.get_resource())
+        self.assertIs(resources[0].meta.client, client)
+        self.assertIs(r2.get_resource(), r2.get_resource())
+
+    def test_forked_process_builds_its_own_client(self):
+        client = r2.get_client()
+        resource = r2.get_resource()
+        # What os.register_at_fork runs in the child
+        r2._reset_pool()
+        self.assertIsNot(r2.get_client(), client)
+        self.assertIsNot(r2.get_resource(), resource)
+        self.assertIs(r2.get_resource().meta.client, r2.get_client())
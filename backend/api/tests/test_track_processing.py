@@ -0,0 +1,669 @@
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .base import BaseAudioTestCase
+from api.jobs import claim_next_job, run_job
+from api.audio.peaks import pack_pyramid
+from api.audio.pipeline import fetch_original
+from api.audio.probe import AudioMetadata
+from api.audio.slots import TranscoderBusy, transcode_slot
+from api.models import (
+    AudioContent,
+    ProcessingJob,
+    ReprocessItem,
+    ReprocessRun,
+    StorageTombstone,
+    Track,
+)
+from api.reprocess import start_run
+from api.tombstones import (
+    claim_tombstones,
+    delete_tracks,
+    delete_users,
+    purge_tombstones,
+)
+
+UPLOAD_MUTATION = """
+    mutation($file: Upload!, $title: String!) {
+        uploadTrack(file: $file, title: $title) {
+            track {
+                id
+                audioFile
+                audioUrl
+                processingState
+            }
+        }
+    }
+"""
+
+STATUS_QUERY = """
+    query($id: ID!) {
+        trackProcessingStatus(id: $id) {
+            trackId
+            state
+            progress
+            attempts
+            error
+        }
+    }
+"""
+
+
+@override_settings(TRACK_PROCESSING_EAGER=False)
+class TrackProcessingQueueTests(BaseAudioTestCase):
+    def test_upload_returns_before_processing(self):
+        """Test that uploads only store the original and enqueue a job"""
+        variables = {"file": self.audio_file, "title": "Queued Track"}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        data = response.data["uploadTrack"]["track"]
+        self.assertEqual(data["processingState"], "PENDING")
+        self.assertIsNone(data["audioUrl"])
+
+        track_id = data["id"]
+        orig_path = f"{data['audioFile']}/orig/{track_id}.m4a"
+        mp3_path = f"{data['audioFile']}/320/{track_id}.mp3"
+        self.assertTrue(default_storage.exists(orig_path))
+        self.assertFalse(default_storage.exists(mp3_path))
+
+        job = ProcessingJob.objects.get(track_id=track_id)
+        self.assertEqual(job.status, ProcessingJob.Status.QUEUED)
+        self.assertEqual(job.source_path, orig_path)
+
+        response = self.execute(STATUS_QUERY, variables={"id": track_id})
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        status = response.data["trackProcessingStatus"]
+        self.assertEqual(status["state"], "pending")
+        self.assertEqual(status["progress"], 0)
+
+    def test_original_upload_is_streamed_to_storage(self):
+        """Test that the original is handed to storage without buffering it"""
+        self.audio_file.seek(0)
+        expected = self.audio_file.read()
+        self.audio_file.seek(0)
+
+        variables = {"file": self.audio_file, "title": "Streamed Track"}
+        with mock.patch.object(
+            default_storage, "save", wraps=default_storage.save
+        ) as save:
+            response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        stored_name, content = save.call_args.args
+        self.assertNotIsInstance(content, ContentFile)
+        with default_storage.open(stored_name, "rb") as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_worker_processes_queued_job(self):
+        """Test that a claimed job produces the MP3 and marks the track ready"""
+        variables = {"file": self.audio_file, "title": "Worker Track"}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        track_id = response.data["uploadTrack"]["track"]["id"]
+
+        job = claim_next_job("test-worker")
+        self.assertEqual(job.track_id, Track.objects.get(pk=track_id).id)
+        self.assertEqual(job.status, ProcessingJob.Status.RUNNING)
+        self.assertIsNone(claim_next_job("test-worker"))
+
+        run_job(job)
+
+        track = Track.objects.get(pk=track_id)
+        self.assertEqual(track.processing_state, Track.ProcessingState.READY)
+        self.assertTrue(
+            default_storage.exists(f"{track.audio_file}/320/{track_id}.mp3")
+        )
+        self.assertIsNotNone(track.audio_url)
+
+        response = self.execute(STATUS_QUERY, variables={"id": track_id})
+        self.assertEqual(response.data["trackProcessingStatus"]["progress"], 100)
+
+    @override_settings(TRACK_PROCESSING_MAX_ATTEMPTS=2)
+    def test_undecodable_upload_fails_after_retries(self):
+        """Test that a broken upload is retried and then marked failed"""
+        broken_file = SimpleUploadedFile(
+            "broken.m4a", b"not really audio", content_type="audio/mpeg"
+        )
+        variables = {"file": broken_file, "title": "Broken Track"}
+        # Stand in for a file whose headers probe fine but won't transcode
+        with mock.patch(
+            "api.mutations.track_mutations.validate_upload",
+            return_value=AudioMetadata(duration=1, codec="aac"),
+        ):
+            response = self.execute(UPLOAD_MUTATION, variables=variables)
+        track_id = response.data["uploadTrack"]["track"]["id"]
+
+        job = claim_next_job("test-worker")
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.Status.QUEUED)
+        self.assertEqual(
+            Track.objects.get(pk=track_id).processing_state,
+            Track.ProcessingState.PENDING,
+        )
+
+        # Skip the retry backoff
+        ProcessingJob.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        job = claim_next_job("test-worker")
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(default_storage.exists(job.source_path))
+
+        response = self.execute(STATUS_QUERY, variables={"id": track_id})
+        status = response.data["trackProcessingStatus"]
+        self.assertEqual(status["state"], "failed")
+        self.assertIn("Failed to convert", status["error"])
+
+
+@override_settings(TRACK_PROCESSING_EAGER=False)
+class RemoteOriginalTests(BaseAudioTestCase):
+    """Originals that aren't on the local filesystem, as on R2"""
+
+    def process(self, upload):
+        variables = {"file": upload, "title": "Remote Track"}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        track_id = response.data["uploadTrack"]["track"]["id"]
+
+        job = claim_next_job("test-worker")
+        with mock.patch(
+            "api.audio.pipeline.local_storage_path", return_value=None
+        ), mock.patch(
+            "api.audio.pipeline.storage_url",
+            side_effect=lambda name, **kwargs: default_storage.path(name),
+        ), mock.patch(
+            "api.audio.pipeline.fetch_original", wraps=fetch_original
+        ) as fetch:
+            run_job(job)
+        return Track.objects.get(pk=track_id), fetch
+
+    def test_streamable_original_is_never_copied(self):
+        """Test that a remote MP3 is piped into ffmpeg and hashed on the way"""
+        self.audio_file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".m4a") as source:
+            source.write(self.audio_file.read())
+            source.flush()
+            mp3 = subprocess.run(
+                ["ffmpeg", "-v", "error", "-i", source.name, "-f", "mp3", "-"],
+                check=True,
+                capture_output=True,
+            ).stdout
+        upload = SimpleUploadedFile("remote.mp3", mp3, content_type="audio/mpeg")
+
+        track, fetch = self.process(upload)
+        self.assertEqual(track.processing_state, Track.ProcessingState.READY)
+        fetch.assert_not_called()
+        self.assertEqual(track.content_hash, hashlib.sha256(mp3).hexdigest())
+        self.assertEqual(track.audio_codec, "mp3")
+        self.assertGreater(track.audio_waveform_resolution, 0)
+
+    def test_unstreamable_original_is_fetched(self):
+        """Test that an MP4 indexed at the end falls back to a local copy"""
+        track, fetch = self.process(self.audio_file)
+        self.assertEqual(track.processing_state, Track.ProcessingState.READY)
+        fetch.assert_called_once()
+        self.assertEqual(track.audio_length, 27)
+
+
+DELETE_MUTATION = """
+    mutation($id: ID!) {
+        deleteTrack(id: $id) {
+            success
+        }
+    }
+"""
+
+
+class ContentDeduplicationTests(BaseAudioTestCase):
+    def upload(self, title):
+        self.audio_file.seek(0)
+        variables = {"file": self.audio_file, "title": title}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        return Track.objects.get(pk=response.data["uploadTrack"]["track"]["id"])
+
+    def test_duplicate_upload_reuses_processed_content(self):
+        """Test that identical audio is neither stored nor transcoded twice"""
+        first = self.upload("First Bounce")
+        self.assertIsNotNone(first.content)
+        self.assertEqual(first.content.ref_count, 1)
+
+        with mock.patch(
+            "api.audio.pipeline.decode_to_pcm",
+            side_effect=AssertionError("duplicate upload was transcoded"),
+        ):
+            second = self.upload("Second Bounce")
+
+        self.assertEqual(second.processing_state, Track.ProcessingState.READY)
+        self.assertEqual(second.content_id, first.content_id)
+        self.assertEqual(second.audio_waveform_data, first.audio_waveform_data)
+        self.assertEqual(second.audio_length, first.audio_length)
+        self.assertEqual(second.audio_url, first.audio_url)
+        self.assertEqual(
+            [(r.name, r.path) for r in second.renditions.all()],
+            [(r.name, r.path) for r in first.renditions.all()],
+        )
+        self.assertFalse(
+            default_storage.exists(f"{second.audio_file}/orig/{second.id}.m4a")
+        )
+        first.content.refresh_from_db()
+        self.assertEqual(first.content.ref_count, 2)
+
+    def test_duplicate_upload_holds_content_before_processing(self):
+        """Test that a queued duplicate keeps shared content alive"""
+        first = self.upload("First Bounce")
+        content = first.content
+
+        with mock.patch("api.mutations.track_mutations.enqueue_track_processing"):
+            second = self.upload("Second Bounce")
+        self.assertEqual(second.content_id, content.id)
+        content.refresh_from_db()
+        self.assertEqual(content.ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.execute(DELETE_MUTATION, variables={"id": str(first.id)})
+        content.refresh_from_db()
+        self.assertEqual(content.ref_count, 1)
+        self.assertTrue(default_storage.exists(content.mp3_path))
+
+    def test_track_lists_join_shared_content(self):
+        """Test that audioUrl doesn't load each track's content separately"""
+        for title in ("First Bounce", "Second Bounce", "Third Bounce"):
+            self.upload(title)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.execute("query { tracks { audioUrl } }")
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        self.assertTrue(all(t["audioUrl"] for t in response.data["tracks"]))
+        content_queries = [
+            q["sql"] for q in queries if 'FROM "api_audiocontent"' in q["sql"]
+        ]
+        self.assertEqual(content_queries, [])
+
+    def test_shared_files_outlive_all_but_last_track(self):
+        """Test that shared files are only deleted with their last track"""
+        first = self.upload("First Bounce")
+        second = self.upload("Second Bounce")
+        content = first.content
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.execute(DELETE_MUTATION, variables={"id": str(first.id)})
+        content.refresh_from_db()
+        self.assertEqual(content.ref_count, 1)
+        self.assertTrue(default_storage.exists(content.mp3_path))
+        self.assertTrue(default_storage.exists(content.original_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.execute(DELETE_MUTATION, variables={"id": str(second.id)})
+        self.assertFalse(AudioContent.objects.filter(pk=content.pk).exists())
+        self.assertFalse(default_storage.exists(content.mp3_path))
+        self.assertFalse(default_storage.exists(content.original_path))
+
+
+class ReprocessTracksTests(BaseAudioTestCase):
+    def upload(self, title):
+        self.audio_file.seek(0)
+        variables = {"file": self.audio_file, "title": title}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        return Track.objects.get(pk=response.data["uploadTrack"]["track"]["id"])
+
+    def test_reprocess_rebuilds_shared_content_once(self):
+        """Test that tracks sharing content are rebuilt once and all updated"""
+        first = self.upload("First Bounce")
+        second = self.upload("Second Bounce")
+
+        # Pretend both were analyzed at the old fixed 200 points
+        old_waveform = {
+            "audio_waveform_peaks": pack_pyramid([0.5] * 200),
+            "audio_waveform_resolution": 200,
+        }
+        Track.objects.update(**old_waveform)
+        AudioContent.objects.update(**old_waveform)
+
+        out = StringIO()
+        call_command(
+            "reprocess_tracks", "--waveform-below", "4096", "--workers", "1", stdout=out
+        )
+
+        item = ReprocessItem.objects.get()
+        self.assertEqual(item.status, ReprocessItem.Status.DONE)
+        self.assertIsNotNone(item.run.finished_at)
+        self.assertIn("tracks/min", out.getvalue())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.audio_waveform_resolution, 4096)
+        self.assertEqual(second.audio_waveform_resolution, 4096)
+        self.assertEqual(first.content.audio_waveform_resolution, 4096)
+        self.assertEqual(second.audio_waveform_data, first.audio_waveform_data)
+        self.assertEqual(
+            [(r.name, r.path) for r in second.renditions.all()],
+            [(r.name, r.path) for r in first.renditions.all()],
+        )
+        self.assertTrue(default_storage.exists(first.content.mp3_path))
+
+    def test_interrupted_run_resumes(self):
+        """Test that --resume picks up the pending tracks of an unfinished run"""
+        track = self.upload("Legacy Bounce")
+        # A track processed before the content index existed
+        Track.objects.update(content=None, content_hash="")
+        AudioContent.objects.all().delete()
+
+        run = start_run(Track.objects.all())
+        call_command(
+            "reprocess_tracks", "--resume", "--workers", "1", stdout=StringIO()
+        )
+
+        run.refresh_from_db()
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.items.get().status, ReprocessItem.Status.DONE)
+
+        # Reprocessing found the original under orig/ and indexed it
+        track.refresh_from_db()
+        self.assertIsNotNone(track.content)
+        self.assertEqual(track.processing_state, Track.ProcessingState.READY)
+        self.assertTrue(default_storage.exists(track.content.mp3_path))
+
+    @override_settings(TRANSCODE_SLOTS=1, TRANSCODE_LOCK_DIR=tempfile.mkdtemp())
+    def test_reprocessing_holds_a_transcode_slot(self):
+        """Test that a backfill counts against the machine-wide transcode limit"""
+        track = self.upload("Slot Bounce")
+        run = start_run(Track.objects.filter(pk=track.pk))
+        busy = []
+
+        def check_slot(*args, **kwargs):
+            try:
+                with transcode_slot(wait=0):
+                    busy.append(False)
+            except TranscoderBusy:
+                busy.append(True)
+
+        with mock.patch("api.reprocess.process_track", side_effect=check_slot):
+            call_command(
+                "reprocess_tracks",
+                "--resume",
+                str(run.id),
+                "--workers",
+                "1",
+                stdout=StringIO(),
+            )
+        self.assertEqual(busy, [True])
+
+    @override_settings(TRANSCODE_SLOTS=1)
+    def test_workers_are_capped_at_transcode_slots(self):
+        """Test that --workers never exceeds the transcoding slots"""
+        self.upload("First Bounce")
+
+        out = StringIO()
+        call_command("reprocess_tracks", "--workers", "8", stdout=out)
+        self.assertIn("Capping --workers at TRANSCODE_SLOTS (1)", out.getvalue())
+        self.assertIn("(workers 1)", out.getvalue())
+        self.assertIn("1 done, 0 failed", out.getvalue())
+
+
+# Pool workers unpickle these by name, so they live at module level
+def crash_worker(job_id):
+    """Stands in for a pool worker taken down by the OOM killer"""
+    os._exit(1)
+
+
+def failing_worker(item_id):
+    raise RuntimeError("worker blew up")
+
+
+@override_settings(TRACK_PROCESSING_EAGER=False, TRACK_PROCESSING_MAX_ATTEMPTS=3)
+class ProcessingPoolTests(BaseAudioTestCase):
+    def upload(self, title):
+        self.audio_file.seek(0)
+        variables = {"file": self.audio_file, "title": title}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        return Track.objects.get(pk=response.data["uploadTrack"]["track"]["id"])
+
+    def test_dead_pool_worker_fails_its_jobs_not_the_daemon(self):
+        """Test that a broken pool requeues its jobs and the worker carries on"""
+        tracks = [self.upload("First Crash"), self.upload("Second Crash")]
+
+        out = StringIO()
+        with mock.patch(
+            "api.management.commands.process_tracks.run_job_by_id", crash_worker
+        ):
+            call_command("process_tracks", "--once", "--concurrency", "2", stdout=out)
+        self.assertIn("after 2 job(s)", out.getvalue())
+
+        for job in ProcessingJob.objects.filter(track__in=tracks):
+            self.assertEqual(job.status, ProcessingJob.Status.QUEUED)
+            self.assertEqual(job.attempts, 1)
+            self.assertEqual(job.locked_by, "")
+            self.assertNotEqual(job.error, "")
+            self.assertGreater(job.run_after, timezone.now())
+        for track in tracks:
+            track.refresh_from_db()
+            self.assertEqual(track.processing_state, Track.ProcessingState.PENDING)
+
+    def test_failing_reprocess_worker_is_recorded(self):
+        """Test that a worker exception marks its item failed and the run goes on"""
+        run = ReprocessRun.objects.create()
+        for title in ("First Redo", "Second Redo"):
+            ReprocessItem.objects.create(run=run, track=self.upload(title))
+
+        out = StringIO()
+        with mock.patch(
+            "api.management.commands.reprocess_tracks.reprocess_item_by_id",
+            failing_worker,
+        ):
+            call_command(
+                "reprocess_tracks",
+                "--resume",
+                str(run.id),
+                "--workers",
+                "2",
+                stdout=out,
+            )
+        self.assertIn("0 done, 2 failed", out.getvalue())
+        for item in run.items.all():
+            self.assertEqual(item.status, ReprocessItem.Status.FAILED)
+            self.assertEqual(item.error, "worker blew up")
+
+
+@override_settings(
+    TRANSCODE_SLOTS=1,
+    TRANSCODE_SLOT_WAIT=0,
+    TRANSCODE_LOCK_DIR=tempfile.mkdtemp(),
+    TRANSCODE_RETRY_AFTER=45,
+)
+class TranscodeCapacityTests(BaseAudioTestCase):
+    def assertBusy(self, response):
+        self.assertIsNotNone(response.errors)
+        error = response.errors[0]
+        self.assertIn("retry after 45 seconds", error["message"])
+        self.assertEqual(
+            error["extensions"], {"code": "TRANSCODER_BUSY", "retryAfter": 45}
+        )
+
+    def test_slots_are_shared_and_released(self):
+        """Test that slots are exclusive until their holder lets go"""
+        with self.settings(TRANSCODE_SLOTS=2):
+            with transcode_slot(wait=0) as first, transcode_slot(wait=0) as second:
+                self.assertNotEqual(first, second)
+                with self.assertRaises(TranscoderBusy):
+                    with transcode_slot(wait=0):
+                        pass
+            with transcode_slot(wait=0):
+                pass
+
+    def test_eager_upload_is_refused_while_slots_are_taken(self):
+        """Test that uploads report busy instead of queueing behind a transcode"""
+        variables = {"file": self.audio_file, "title": "Busy Track"}
+        with transcode_slot():
+            response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertBusy(response)
+        self.assertFalse(Track.objects.exists())
+
+        # Once the slot is free the same upload goes through
+        self.audio_file.seek(0)
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+    def test_eager_job_does_not_wait_for_a_slot_taken_after_admission(self):
+        """Test that losing the slot after the capacity check fails busy"""
+        variables = {"file": self.audio_file, "title": "Raced Track"}
+        with mock.patch("api.mutations.track_mutations.check_processing_capacity"):
+            with transcode_slot():
+                response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNotNone(response.errors)
+        self.assertIn("retry after 45 seconds", response.errors[0]["message"])
+        self.assertFalse(Track.objects.exists())
+
+    @override_settings(TRACK_PROCESSING_EAGER=False, TRACK_PROCESSING_MAX_QUEUE=1)
+    def test_upload_is_refused_when_queue_is_full(self):
+        """Test that queued uploads are capped by TRACK_PROCESSING_MAX_QUEUE"""
+        response = self.execute(
+            UPLOAD_MUTATION, variables={"file": self.audio_file, "title": "First"}
+        )
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        self.audio_file.seek(0)
+        response = self.execute(
+            UPLOAD_MUTATION, variables={"file": self.audio_file, "title": "Second"}
+        )
+        self.assertBusy(response)
+        self.assertEqual(Track.objects.count(), 1)
+
+    def test_busy_response_sets_retry_after_header(self):
+        """Test that the GraphQL endpoint turns a busy error into Retry-After"""
+        self.audio_file.seek(0)
+        operations = {
+            "query": UPLOAD_MUTATION,
+            "variables": {"file": None, "title": "Header Track"},
+        }
+        with transcode_slot():
+            response = self.django_client.post(
+                "/graphql/",
+                {
+                    "operations": json.dumps(operations),
+                    "map": json.dumps({"0": ["variables.file"]}),
+                    "0": self.audio_file,
+                },
+            )
+        self.assertEqual(response["Retry-After"], "45")
+        errors = response.json()["errors"]
+        self.assertEqual(errors[0]["extensions"]["code"], "TRANSCODER_BUSY")
+
+
+@override_settings(TRACK_PROCESSING_EAGER=False)
+class StorageTombstoneTests(BaseAudioTestCase):
+    def upload(self):
+        self.audio_file.seek(0)
+        variables = {"file": self.audio_file, "title": "Doomed Track"}
+        response = self.execute(UPLOAD_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        return Track.objects.get(pk=response.data["uploadTrack"]["track"]["id"])
+
+    def test_delete_returns_before_files_are_purged(self):
+        """Test that deletion only records a tombstone for the worker to purge"""
+        track = self.upload()
+        response = self.execute(DELETE_MUTATION, variables={"id": str(track.id)})
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        self.assertFalse(Track.objects.filter(pk=track.pk).exists())
+        self.assertTrue(default_storage.exists(track.audio_file))
+        tombstone = StorageTombstone.objects.get()
+        self.assertEqual(tombstone.prefix, track.audio_file)
+
+        call_command("process_tracks", "--once", stdout=StringIO())
+        self.assertFalse(default_storage.exists(track.audio_file))
+        self.assertFalse(StorageTombstone.objects.exists())
+
+    @override_settings(TRACK_PROCESSING_EAGER=True)
+    def test_failed_eager_upload_is_tombstoned(self):
+        """Test that renditions written before processing failed are purged"""
+        written = []
+
+        def fail_midway(track, source_path, **kwargs):
+            written.append(
+                default_storage.save(
+                    f"{track.audio_file}/320/{track.id}.mp3", ContentFile(b"mp3")
+                )
+            )
+            raise RuntimeError("encoder crashed")
+
+        self.audio_file.seek(0)
+        variables = {"file": self.audio_file, "title": "Half Done"}
+        with mock.patch(
+            "api.jobs.process_track", side_effect=fail_midway
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.execute(UPLOAD_MUTATION, variables=variables)
+
+        self.assertIn("encoder crashed", response.errors[0]["message"])
+        self.assertFalse(Track.objects.exists())
+        self.assertFalse(default_storage.exists(written[0]))
+        self.assertFalse(StorageTombstone.objects.exists())
+
+    def test_failed_and_abandoned_purges_are_retried(self):
+        """Test that a tombstone survives failures and dead workers"""
+        track = self.upload()
+        delete_tracks(Track.objects.filter(pk=track.pk))
+
+        with mock.patch(
+            "api.tombstones.delete_storage_prefix", side_effect=OSError("R2 is down")
+        ):
+            self.assertEqual(purge_tombstones("worker-1"), 0)
+        tombstone = StorageTombstone.objects.get()
+        self.assertEqual(tombstone.attempts, 1)
+        self.assertEqual(tombstone.error, "R2 is down")
+        self.assertIsNone(tombstone.locked_at)
+        self.assertGreater(tombstone.run_after, timezone.now())
+
+        # Due again, but claimed by a worker that then died
+        StorageTombstone.objects.update(run_after=timezone.now())
+        self.assertEqual(len(claim_tombstones("worker-2")), 1)
+        self.assertEqual(purge_tombstones("worker-3"), 0)
+        StorageTombstone.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(purge_tombstones("worker-3"), 1)
+        self.assertFalse(default_storage.exists(track.audio_file))
+
+    def test_user_deletion_keeps_content_shared_with_others(self):
+        """Test that a deleted artist's files go, except ones still shared"""
+        track = self.upload()
+        call_command("process_tracks", "--once", stdout=StringIO())
+        track.refresh_from_db()
+        content = track.content
+        self.assertIsNotNone(content)
+        picture = f"{self.user.id}/img/profile/new/profile_1.jpg"
+        default_storage.save(picture, ContentFile(b"jpeg"))
+
+        # Another artist uploaded the same audio
+        other = self.User.objects.create_user(username="other", password="pass")
+        Track.objects.create(
+            artist=other,
+            title="Same Audio",
+            audio_file=content.base_path,
+            content=content,
+        )
+        AudioContent.objects.filter(pk=content.pk).update(ref_count=2)
+
+        delete_users(self.User.objects.filter(pk=self.user.pk))
+        while purge_tombstones():
+            pass
+        self.assertFalse(default_storage.exists(picture))
+        self.assertTrue(default_storage.exists(content.mp3_path))
+        self.assertEqual(AudioContent.objects.get(pk=content.pk).ref_count, 1)
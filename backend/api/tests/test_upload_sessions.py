@@ -0,0 +1,221 @@
+import os
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from .base import BaseAudioTestCase, TEMP_MEDIA_ROOT
+from api.models import Track, UploadSession
+from api.uploads import part_path
+
+BEGIN_MUTATION = """
+    mutation($filename: String!, $size: BigInt!, $title: String!) {
+        beginUpload(filename: $filename, size: $size, title: $title) {
+            upload {
+                id
+                offset
+                chunkSize
+            }
+        }
+    }
+"""
+
+CHUNK_MUTATION = """
+    mutation($id: ID!, $offset: BigInt!, $chunk: Upload!) {
+        uploadChunk(id: $id, offset: $offset, chunk: $chunk) {
+            upload {
+                offset
+            }
+        }
+    }
+"""
+
+FINISH_MUTATION = """
+    mutation($id: ID!) {
+        finishUpload(id: $id) {
+            track {
+                id
+                title
+                audioUrl
+                processingState
+            }
+        }
+    }
+"""
+
+REQUEST_MUTATION = """
+    mutation($filename: String!, $size: BigInt!, $title: String!) {
+        requestTrackUpload(filename: $filename, size: $size, title: $title) {
+            uploadUrl
+            upload {
+                id
+            }
+        }
+    }
+"""
+
+FINALIZE_MUTATION = """
+    mutation($id: ID!) {
+        finalizeTrackUpload(id: $id) {
+            track {
+                id
+                audioFile
+                processingState
+            }
+        }
+    }
+"""
+
+SESSION_QUERY = """
+    query($id: ID!) {
+        uploadSession(id: $id) {
+            offset
+            size
+        }
+    }
+"""
+
+
+@override_settings(UPLOAD_SESSION_DIR=os.path.join(TEMP_MEDIA_ROOT, "uploads"))
+class ResumableUploadTests(BaseAudioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = self.audio_file.read()
+
+    def begin(self, title="Chunked Track"):
+        variables = {
+            "filename": "test_audio.m4a",
+            "size": len(self.data),
+            "title": title,
+        }
+        response = self.execute(BEGIN_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        return response.data["beginUpload"]["upload"]["id"]
+
+    def send(self, upload_id, start, end):
+        chunk = SimpleUploadedFile("blob", self.data[start:end])
+        variables = {"id": upload_id, "offset": start, "chunk": chunk}
+        return self.execute(CHUNK_MUTATION, variables=variables)
+
+    def test_chunked_upload_resumes_and_creates_track(self):
+        """Test that chunks resume from the queried offset and finish as a track"""
+        upload_id = self.begin()
+        middle = len(self.data) // 2
+
+        response = self.send(upload_id, 0, middle)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        self.assertEqual(response.data["uploadChunk"]["upload"]["offset"], middle)
+
+        # After a reconnect the client asks where to continue from
+        response = self.execute(SESSION_QUERY, variables={"id": upload_id})
+        self.assertEqual(response.data["uploadSession"]["offset"], middle)
+
+        # Finishing early is refused
+        response = self.execute(FINISH_MUTATION, variables={"id": upload_id})
+        self.assertIn("incomplete", response.errors[0]["message"])
+
+        response = self.send(upload_id, middle, len(self.data))
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        response = self.execute(FINISH_MUTATION, variables={"id": upload_id})
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        track = response.data["finishUpload"]["track"]
+        self.assertEqual(track["title"], "Chunked Track")
+        self.assertEqual(track["processingState"], "READY")
+        self.assertIsNotNone(track["audioUrl"])
+
+        session = UploadSession(id=upload_id)
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+        self.assertFalse(os.path.exists(part_path(session)))
+
+    def test_chunk_at_wrong_offset_is_rejected(self):
+        """Test that a chunk must start where the received bytes end"""
+        upload_id = self.begin()
+        self.send(upload_id, 0, 1000)
+
+        response = self.send(upload_id, 500, 1500)
+        self.assertIn("does not match", response.errors[0]["message"])
+
+        response = self.send(upload_id, 1000, len(self.data))
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.received, len(self.data))
+        self.assertEqual(os.path.getsize(part_path(session)), len(self.data))
+
+    def test_other_users_cannot_see_upload(self):
+        """Test that an upload session is private to its owner"""
+        upload_id = self.begin()
+        response = self.execute(
+            SESSION_QUERY, variables={"id": upload_id}, authenticate=False
+        )
+        self.assertIsNone(response.data["uploadSession"])
+        self.assertFalse(Track.objects.exists())
+
+
+class DirectUploadTests(BaseAudioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = self.audio_file.read()
+        # Stand in for CloudflareR2Storage's presigner on local storage
+        patcher = mock.patch.object(
+            default_storage,
+            "get_presigned_upload_url",
+            create=True,
+            return_value="https://r2.example.com/presigned-put",
+        )
+        self.presign = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request_upload(self, size):
+        variables = {"filename": "test_audio.m4a", "size": size, "title": "Direct"}
+        response = self.execute(REQUEST_MUTATION, variables=variables)
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        data = response.data["requestTrackUpload"]
+        self.assertEqual(data["uploadUrl"], "https://r2.example.com/presigned-put")
+        return UploadSession.objects.get(pk=data["upload"]["id"])
+
+    def test_direct_upload_is_processed_from_storage(self):
+        """Test that a file PUT straight to storage becomes a processed track"""
+        session = self.request_upload(len(self.data))
+        key = session.storage_path
+        self.assertEqual(
+            key,
+            f"{self.user.id}/audio/{session.track_id}/orig/{session.track_id}.m4a",
+        )
+        self.presign.assert_called_once_with(key, len(self.data), content_type=None)
+
+        # The client PUTs the bytes; Django never sees them
+        default_storage.save(key, ContentFile(self.data))
+
+        response = self.execute(FINALIZE_MUTATION, variables={"id": str(session.id)})
+        self.assertIsNone(response.errors, f"Unexpected errors: {response.errors}")
+        track = response.data["finalizeTrackUpload"]["track"]
+        self.assertEqual(track["id"], str(session.track_id))
+        self.assertEqual(track["audioFile"], f"{self.user.id}/audio/{session.track_id}")
+        self.assertEqual(track["processingState"], "READY")
+
+        # The original was hashed during processing so duplicates can reuse it
+        stored = Track.objects.get(pk=track["id"])
+        self.assertEqual(len(stored.content_hash), 64)
+        self.assertIsNotNone(stored.content)
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+
+    def test_size_mismatch_is_rejected(self):
+        """Test that finalizing fails when the stored object has the wrong size"""
+        session = self.request_upload(len(self.data) + 10)
+        default_storage.save(session.storage_path, ContentFile(self.data))
+
+        response = self.execute(FINALIZE_MUTATION, variables={"id": str(session.id)})
+        self.assertIn("expected", response.errors[0]["message"])
+        self.assertFalse(default_storage.exists(session.storage_path))
+        self.assertFalse(Track.objects.exists())
+
+    def test_finalize_before_put_fails(self):
+        """Test that finalizing an upload that never reached storage fails"""
+        session = self.request_upload(len(self.data))
+        response = self.execute(FINALIZE_MUTATION, variables={"id": str(session.id)})
+        self.assertIn("not found in storage", response.errors[0]["message"])
+        self.assertTrue(UploadSession.objects.filter(pk=session.pk).exists())
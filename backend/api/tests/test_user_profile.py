@@ -2,12 +2,26 @@ import os
 import shutil
 import tempfile
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import override_settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
 from .base import BaseAPITestCase
+from api.image_cache import get_variant, prune_cache
+from api.images import (
+    AVATAR_SIZES,
+    ImageProcessingError,
+    render_avatar,
+    render_avatar_variants,
+)
 from api.models import Profile
 
 
@@ -262,6 +276,31 @@ class UserProfileTests(BaseAPITestCase):
             "Optimized URL does not have the expected unique ID filename pattern",
         )
 
+        # Every size exists next to the profile picture, in both formats
+        profile = Profile.objects.get(user=user)
+        for size in (48, 128, 600):
+            for extension in ("webp", "jpg"):
+                path = profile.profile_picture_variant(size, extension)
+                self.assertTrue(default_storage.exists(path), path)
+                with Image.open(default_storage.path(path)) as image:
+                    self.assertEqual(image.size, (size, size))
+
+        srcset_query = """
+        query {
+            me {
+                profile {
+                    webp: profilePictureSrcset
+                    jpeg: profilePictureSrcset(format: "jpeg")
+                }
+            }
+        }
+        """
+        srcset_response = self.execute(srcset_query, authenticate=True, user=user)
+        self.assertIsNone(srcset_response.errors)
+        srcsets = srcset_response.data["me"]["profile"]
+        self.assertRegex(srcsets["webp"], r"_48\.webp 48w, .+_128\.webp 128w, ")
+        self.assertTrue(srcsets["jpeg"].endswith(".jpg 600w"))
+
         # Query profile to verify picture data is accessible
         query = """
         query {
@@ -305,3 +344,140 @@ class UserProfileTests(BaseAPITestCase):
             second_profile_path,
             "Profile picture path did not change after update (timestamps should differ)",
         )
+
+
+class AvatarVariantTests(SimpleTestCase):
+    def test_large_photo_is_cropped_to_every_size(self):
+        """Test that big and transparent images yield square variants"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            photo_path = os.path.join(temp_dir, "photo.jpg")
+            Image.new("RGB", (4000, 3000), "red").save(photo_path)
+            png_path = os.path.join(temp_dir, "logo.png")
+            Image.new("RGBA", (300, 500), (0, 0, 0, 0)).save(png_path)
+
+            for source in (photo_path, png_path):
+                variants = render_avatar_variants(source, temp_dir, "avatar")
+                self.assertEqual(len(variants), len(AVATAR_SIZES) * 2)
+                for (size, _), path in variants.items():
+                    with Image.open(path) as image:
+                        self.assertEqual(image.size, (size, size))
+                        self.assertEqual(image.mode, "RGB")
+
+            with Image.open(variants[(48, "jpg")]) as image:
+                # Transparent areas are flattened onto white
+                self.assertEqual(image.getpixel((24, 24)), (255, 255, 255))
+
+    def test_unreadable_image_is_rejected(self):
+        with tempfile.NamedTemporaryFile(suffix=".png") as f:
+            f.write(b"not an image")
+            f.flush()
+            with self.assertRaises(ImageProcessingError):
+                render_avatar_variants(f.name, tempfile.gettempdir(), "avatar")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_CACHE_DIR=tempfile.mkdtemp())
+class ImageVariantTests(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.User.objects.create_user(
+            username="imageuser", email="image@example.com", password="testpass123"
+        )
+        self.orig_path = f"{self.user.id}/img/profile/orig/profile_abc123.png"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, "source.png")
+            Image.new("RGB", (800, 400), "blue").save(source)
+            with open(source, "rb") as f:
+                default_storage.save(self.orig_path, f)
+        self.profile = self.user.profile
+        self.profile.profile_picture_original = self.orig_path
+        self.profile.save()
+
+    def tearDown(self):
+        default_storage.delete(self.orig_path)
+        shutil.rmtree(settings.IMAGE_CACHE_DIR, ignore_errors=True)
+        super().tearDown()
+
+    def test_variant_is_resized_and_cached(self):
+        """Test that a variant is rendered once and served as immutable"""
+        url = self.profile.profile_picture_image_url(96)
+        with mock.patch("api.image_cache.render_avatar", wraps=render_avatar) as render:
+            response = self.django_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "image/webp")
+            self.assertIn("immutable", response["Cache-Control"])
+            with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+                self.assertEqual(image.size, (96, 96))
+
+            response = self.django_client.get(url)
+            b"".join(response.streaming_content)
+            self.assertEqual(render.call_count, 1)
+
+    def test_concurrent_requests_resize_once(self):
+        """Test that simultaneous misses for one variant share a single resize"""
+
+        def slow_render(*args):
+            time.sleep(0.2)
+            return render_avatar(*args)
+
+        key = f"{self.user.id}/profile_abc123.png"
+        with mock.patch(
+            "api.image_cache.render_avatar", side_effect=slow_render
+        ) as render:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                paths = list(
+                    pool.map(
+                        lambda _: get_variant(key, self.orig_path, 128, "jpg"),
+                        range(4),
+                    )
+                )
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(set(paths)), 1)
+
+    def test_variant_pruned_before_it_is_read_is_rendered_again(self):
+        """Test that a variant evicted after lookup is regenerated, not a 404"""
+        lookups = []
+
+        def prune_after_first_lookup(*args):
+            path = get_variant(*args)
+            if not lookups:
+                os.remove(path)
+            lookups.append(path)
+            return path
+
+        url = self.profile.profile_picture_image_url(96)
+        with mock.patch(
+            "api.image_cache.get_variant", side_effect=prune_after_first_lookup
+        ):
+            response = self.django_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (96, 96))
+        self.assertEqual(len(lookups), 2)
+
+    def test_invalid_requests(self):
+        url = reverse(
+            "image_variant",
+            kwargs={"user_id": self.user.id, "name": "profile_abc123.png"},
+        )
+        self.assertEqual(self.django_client.get(f"{url}?w=97").status_code, 400)
+        self.assertEqual(self.django_client.get(f"{url}?w=96&fmt=gif").status_code, 400)
+        missing = reverse(
+            "image_variant",
+            kwargs={"user_id": self.user.id, "name": "profile_missing.png"},
+        )
+        self.assertEqual(self.django_client.get(f"{missing}?w=96").status_code, 404)
+
+    @override_settings(IMAGE_CACHE_MAX_BYTES=1000)
+    def test_least_recently_used_variants_are_evicted(self):
+        cache_dir = os.path.join(settings.IMAGE_CACHE_DIR, "someone")
+        os.makedirs(cache_dir)
+        for age, name in enumerate(["new.webp", "old.webp", "oldest.webp"]):
+            path = os.path.join(cache_dir, name)
+            with open(path, "wb") as f:
+                f.write(b"x" * 400)
+            stamp = time.time() - age * 60
+            os.utime(path, (stamp, stamp))
+
+        # Over the limit; evict down to 90% of it, oldest first
+        prune_cache()
+        self.assertEqual(sorted(os.listdir(cache_dir)), ["new.webp", "old.webp"])
@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+
+from api.models import StorageTombstone, Track
+from api.utils import delete_storage_prefix
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger("track_processing")
+
+# Tombstones purged per claim
+PURGE_BATCH_SIZE = 50
+# Seconds before a failed purge is retried, doubled on every attempt
+PURGE_RETRY_BACKOFF = 60
+PURGE_MAX_BACKOFF = 6 * 60 * 60
+
+
+def bury(prefixes):
+    """
+    Record storage prefixes to purge once the current transaction commits.
+
+    Call this inside the transaction that deletes the owning rows, so the
+    tombstones exist exactly when the rows are gone. In eager mode nobody
+    runs a purger, so the prefixes are purged right after the commit.
+    """
+    prefixes = [prefix for prefix in dict.fromkeys(prefixes) if prefix]
+    if not prefixes:
+        return []
+    tombstones = StorageTombstone.objects.bulk_create(
+        [StorageTombstone(prefix=prefix) for prefix in prefixes]
+    )
+    if settings.TRACK_PROCESSING_EAGER:
+        transaction.on_commit(purge_tombstones)
+    return tombstones
+
+
+def track_prefixes(tracks):
+    """Storage prefixes holding the files of tracks that don't share content"""
+    return list(
+        tracks.filter(content__isnull=True)
+        .exclude(audio_file="")
+        .values_list("audio_file", flat=True)
+    )
+
+
+def delete_tracks(tracks):
+    """
+    Delete a queryset of tracks and tombstone their files.
+
+    Shared content is released by the post_delete signal, which tombstones
+    the content's files in this same transaction when the last reference
+    goes.
+    """
+    with transaction.atomic():
+        bury(track_prefixes(tracks))
+        tracks.delete()
+
+
+def delete_users(users):
+    """
+    Delete a queryset of users and tombstone their profile pictures and tracks.
+
+    Only the users' own track directories are buried: a directory that
+    still backs content shared with another artist's track stays until
+    that content is released.
+    """
+    with transaction.atomic():
+        user_ids = list(users.values_list("pk", flat=True))
+        bury(
+            [f"{user_id}/img" for user_id in user_ids]
+            + track_prefixes(Track.objects.filter(artist_id__in=user_ids))
+        )
+        users.delete()
+
+
+def claim_tombstones(worker_id, limit=PURGE_BATCH_SIZE):
+    """
+    Lock a batch of due tombstones for this worker.
+
+    Tombstones locked by a worker that stopped responding are claimed again
+    after TRACK_PROCESSING_STALE_AFTER seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TRACK_PROCESSING_STALE_AFTER)
+    with transaction.atomic():
+        tombstones = list(
+            StorageTombstone.objects.select_for_update(skip_locked=True)
+            .filter(run_after__lte=now)
+            .filter(Q(locked_at__isnull=True) | Q(locked_at__lt=stale))
+            .order_by("run_after", "created_at")[:limit]
+        )
+        StorageTombstone.objects.filter(pk__in=[t.pk for t in tombstones]).update(
+            locked_at=now, locked_by=worker_id
+        )
+    return tombstones
+
+
+def purge_tombstones(worker_id="", limit=PURGE_BATCH_SIZE):
+    """
+    Purge one batch of tombstoned prefixes.
+
+    Deleting a prefix is idempotent, so a tombstone that was half purged by
+    a dead worker is simply purged again. Failures are retried with
+    exponential backoff, and never given up on.
+
+    Returns:
+        The number of tombstones purged
+    """
+    purged = 0
+    for tombstone in claim_tombstones(worker_id, limit):
+        try:
+            deleted = delete_storage_prefix(tombstone.prefix)
+        except Exception as e:
+            attempts = tombstone.attempts + 1
+            delay = min(PURGE_RETRY_BACKOFF * 2 ** (attempts - 1), PURGE_MAX_BACKOFF)
+            logger.error(f"Purging {tombstone.prefix} failed (attempt {attempts}): {e}")
+            StorageTombstone.objects.filter(pk=tombstone.pk).update(
+                attempts=attempts,
+                error=str(e),
+                run_after=timezone.now() + timedelta(seconds=delay),
+                locked_at=None,
+                locked_by="",
+            )
+            continue
+
+        tombstone.delete()
+        purged += 1
+        logger.info(f"Purged {deleted} file(s) under {tombstone.prefix}")
+    return purged
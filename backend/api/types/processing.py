@@ -0,0 +1,14 @@
+import graphene
+
+
+class TrackProcessingStatusType(graphene.ObjectType):
+    """Progress of the background pipeline for a single track"""
+
+    track_id = graphene.ID()
+    state = graphene.String(
+        description="pending, transcoding, analyzing, ready or failed"
+    )
+    progress = graphene.Int(description="Completion percentage of the current job")
+    attempts = graphene.Int()
+    error = graphene.String()
+    updated_at = graphene.DateTime()
@@ -1,4 +1,5 @@
 import graphene
+from django.conf import settings
 from graphene_django import DjangoObjectType
 
 from api.models import Profile
@@ -21,6 +22,20 @@ class ProfileType(DjangoObjectType):
     profile_picture_optimized_url = graphene.String(
         description="URL to the optimized profile picture"
     )
+    profile_picture_srcset = graphene.String(
+        format=graphene.String(
+            default_value="webp", description="Image format: webp or jpeg"
+        ),
+        description="srcset listing every size of the profile picture",
+    )
+
+    profile_picture_image_url = graphene.String(
+        width=graphene.Int(required=True),
+        format=graphene.String(
+            default_value="webp", description="Image format: webp or jpeg"
+        ),
+        description="URL of the profile picture resized to width pixels square",
+    )
 
     def resolve_profile_picture_url(self, info):
         """Resolve the full URL to the profile picture"""
@@ -29,3 +44,19 @@ class ProfileType(DjangoObjectType):
     def resolve_profile_picture_optimized_url(self, info):
         """Resolve the URL to the optimized profile picture"""
         return self.profile_picture_optimized_url
+
+    def resolve_profile_picture_srcset(self, info, format="webp"):
+        """Resolve a srcset of the resized profile pictures in one format"""
+        extensions = {"webp": "webp", "jpeg": "jpg"}
+        if format not in extensions:
+            raise Exception("Format must be webp or jpeg")
+        return self.profile_picture_srcset(extensions[format])
+
+    def resolve_profile_picture_image_url(self, info, width, format="webp"):
+        """Resolve the on-demand resizing URL for one size of the picture"""
+        if width not in settings.IMAGE_RESIZE_WIDTHS:
+            widths = ", ".join(str(w) for w in settings.IMAGE_RESIZE_WIDTHS)
+            raise Exception(f"Width must be one of {widths}")
+        if format not in ("webp", "jpeg"):
+            raise Exception("Format must be webp or jpeg")
+        return self.profile_picture_image_url(width, format)
@@ -0,0 +1,16 @@
+import graphene
+from api.models import TrackRendition
+from graphene_django import DjangoObjectType
+
+
+class TrackRenditionType(DjangoObjectType):
+    """An encoded version of a track that a player can pick by bandwidth"""
+
+    class Meta:
+        model = TrackRendition
+        fields = ("name", "codec", "bitrate", "mime_type", "size")
+
+    url = graphene.String(description="URL to the rendition file")
+
+    def resolve_url(self, info):
+        return self.url
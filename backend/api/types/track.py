@@ -1,5 +1,10 @@
+import base64
+
 import graphene
+from api.audio.peaks import WAVEFORM_DEFAULT_RESOLUTION
 from api.models import FavoriteTrack, Track
+from api.types.rendition import TrackRenditionType
+from django.urls import reverse
 from graphene_django import DjangoObjectType
 
 
@@ -14,14 +19,39 @@ class TrackType(DjangoObjectType):
             "description",
             "audio_file",
             "audio_length",
-            "audio_waveform_data",
-            "audio_waveform_resolution",
+            "audio_codec",
+            "audio_sample_rate",
+            "audio_channels",
+            "audio_bitrate",
+            "processing_state",
             "created_at",
             "updated_at",
         )
 
     # Define audio_url as a String field - this will be sent to the client
     audio_url = graphene.String(description="URL to the MP3 audio file")
+    audio_waveform_resolution = graphene.Int(
+        description="Points in audioWaveformData and audioWaveformPeaks"
+    )
+    audio_waveform_data = graphene.JSONString(
+        description="Waveform as a JSON list of 0-1 values (prefer audioWaveformPeaks)"
+    )
+    audio_waveform_peaks = graphene.String(
+        description="Base64 waveform, one byte (0-255) per point (prefer audioWaveform)"
+    )
+    audio_waveform = graphene.String(
+        resolution=graphene.Int(
+            description="Points to draw; the nearest precomputed level is returned"
+        ),
+        description="Base64 waveform level, one byte (0-255) per point",
+    )
+    audio_sources = graphene.List(
+        graphene.NonNull(TrackRenditionType),
+        description="Playable renditions, lowest bitrate first",
+    )
+    hls_manifest_url = graphene.String(
+        description="URL to the HLS playlist, if one was generated"
+    )
     favorites_count = graphene.Int()
     is_favorited = graphene.Boolean()
 
@@ -29,6 +59,39 @@ class TrackType(DjangoObjectType):
         """Return the presigned URL to the MP3 audio file"""
         return self.audio_url
 
+    def resolve_audio_waveform_resolution(self, info):
+        """Return the length of the level the legacy waveform fields serve"""
+        level = self.waveform_level(WAVEFORM_DEFAULT_RESOLUTION)
+        return len(level) if level is not None else 0
+
+    def resolve_audio_waveform_data(self, info):
+        return self.audio_waveform_data
+
+    def resolve_audio_waveform_peaks(self, info):
+        level = self.waveform_level(WAVEFORM_DEFAULT_RESOLUTION)
+        if level is None:
+            return None
+        return base64.b64encode(level).decode()
+
+    def resolve_audio_waveform(self, info, resolution=None):
+        """Return a stored pyramid level, without resampling"""
+        level = self.waveform_level(resolution)
+        if level is None:
+            return None
+        return base64.b64encode(level).decode()
+
+    def resolve_audio_sources(self, info):
+        """Return the track's renditions once processing has finished"""
+        if not self.is_ready:
+            return []
+        return self.renditions.exclude(name="hls")
+
+    def resolve_hls_manifest_url(self, info):
+        """Return the URL of the playlist view, which signs segment URLs"""
+        if not self.is_ready or not self.renditions.filter(name="hls").exists():
+            return None
+        return reverse("hls_manifest", args=[self.id])
+
     def resolve_favorites_count(self, info):
         return self.favorited_by.count()
 
@@ -0,0 +1,23 @@
+import graphene
+from api.models import UploadSession
+from django.conf import settings
+from graphene_django import DjangoObjectType
+
+
+class UploadSessionType(DjangoObjectType):
+    """State of a resumable upload"""
+
+    class Meta:
+        model = UploadSession
+        fields = ("id", "filename", "size", "title", "created_at", "updated_at")
+
+    offset = graphene.BigInt(
+        description="Bytes received so far; send the next chunk from here"
+    )
+    chunk_size = graphene.Int(description="Suggested size of each chunk in bytes")
+
+    def resolve_offset(self, info):
+        return self.received
+
+    def resolve_chunk_size(self, info):
+        return settings.UPLOAD_CHUNK_SIZE
@@ -20,6 +20,10 @@ class UserType(DjangoObjectType):
     following_count = graphene.Int()
     is_following = graphene.Boolean()
 
+    def resolve_tracks(self, info):
+        # audioUrl reads the shared content's path, so join it in
+        return self.tracks.select_related("content")
+
     def resolve_followers_count(self, info):
         return self.followers.count()
 
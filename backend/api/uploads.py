@@ -0,0 +1,109 @@
+import logging
+import os
+from datetime import timedelta
+
+from api.models import UploadSession
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger("track_processing")
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk doesn't start where the received bytes end"""
+
+
+def part_path(session):
+    """Local path of the file an upload session's chunks are appended to"""
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.id}.part")
+
+
+def begin_upload(user, filename, size, title, description=None):
+    """Create an upload session with an empty part file"""
+    session = UploadSession.objects.create(
+        user=user,
+        filename=filename,
+        size=size,
+        title=title,
+        description=description or "",
+    )
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    open(part_path(session), "wb").close()
+    return session
+
+
+def begin_direct_upload(user, filename, size, title, description=None):
+    """Create an upload session for a file the client PUTs straight to storage"""
+    session = UploadSession(
+        user=user,
+        filename=filename,
+        size=size,
+        title=title,
+        description=description or "",
+    )
+    _, ext = os.path.splitext(filename)
+    track_id = str(session.track_id)
+    session.storage_path = f"{user.id}/audio/{track_id}/orig/{track_id}{ext}"
+    session.save()
+    return session
+
+
+def append_chunk(session_id, user, offset, chunk):
+    """
+    Append an uploaded chunk to a session's part file.
+
+    The session row is locked while writing, so concurrent retries of the
+    same chunk can't interleave. Returns the updated session.
+
+    Raises:
+        UploadSession.DoesNotExist: If the session isn't the user's
+        UploadOffsetError: If offset isn't the number of bytes received so far
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(
+            pk=session_id, user=user
+        )
+        if offset != session.received:
+            raise UploadOffsetError(
+                f"Chunk offset {offset} does not match the "
+                f"{session.received} bytes received so far"
+            )
+        if session.received + chunk.size > session.size:
+            raise UploadOffsetError(
+                f"Chunk would exceed the declared size of {session.size} bytes"
+            )
+
+        with open(part_path(session), "r+b") as f:
+            # Drop bytes from any write that died before it was committed
+            f.truncate(session.received)
+            f.seek(session.received)
+            for data in chunk.chunks():
+                f.write(data)
+
+        session.received += chunk.size
+        session.save(update_fields=["received", "updated_at"])
+    return session
+
+
+def discard_upload(session):
+    """Delete an upload session along with any bytes it has received"""
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    if session.storage_path:
+        default_storage.delete(session.storage_path)
+    session.delete()
+
+
+def expire_upload_sessions():
+    """Discard unfinished uploads that haven't received a chunk in a while"""
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_EXPIRY)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in stale:
+        discard_upload(session)
+    if stale:
+        logger.info(f"Discarded {len(stale)} expired upload session(s)")
+    return len(stale)
@@ -1,5 +1,9 @@
 import os
+import shutil
+
+from api.presign import cached_presigned_url
 from django.conf import settings
+from django.core.files import File
 from django.core.files.storage import default_storage
 
 
@@ -22,6 +26,114 @@ def ensure_storage_path_exists(path):
     # For cloud storage, directories don't need to be created
 
 
+def storage_url(path, expiration=86400):
+    """
+    Return a URL for a stored file.
+
+    On R2 this is a presigned URL, valid for at least `expiration` seconds
+    (24 hours by default) and reused for a whole time bucket; see
+    api.presign. Local storage serves files directly.
+    """
+    if settings.USE_CLOUDFLARE_R2:
+        try:
+            url = cached_presigned_url(path, expiration, sign_r2_url)
+            if url:
+                return url
+        except Exception as e:
+            if settings.DEBUG:
+                print(f"Error generating presigned URL: {e}")
+        # Fall back to regular URL if presigning fails
+        return default_storage.url(path)
+    return default_storage.url(path)
+
+
+def sign_r2_url(path, expires_in):
+    """Presign a GET for a file on R2"""
+    return get_r2_storage().get_presigned_url(path, expiration=expires_in)
+
+
+def save_local_file(storage_path, local_path):
+    """
+    Stream a local file into storage and return the saved name.
+
+    The file is handed over as a file object, so storage backends read it in
+    chunks (multipart on R2) instead of the whole file being loaded first.
+    """
+    with open(local_path, "rb") as f:
+        return default_storage.save(storage_path, File(f))
+
+
+def download_to_local_file(storage_path, local_path):
+    """
+    Stream a stored file to local disk.
+
+    R2 downloads use parallel ranged GETs straight to disk; other backends
+    are copied through a file handle in chunks.
+    """
+    if hasattr(default_storage, "download_to_path"):
+        default_storage.download_to_path(storage_path, local_path)
+        return local_path
+
+    with default_storage.open(storage_path, "rb") as src:
+        with open(local_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    return local_path
+
+
+def local_storage_path(storage_path):
+    """Path of a stored file on this machine's disk, or None for remote storage"""
+    try:
+        return default_storage.path(storage_path)
+    except NotImplementedError:
+        return None
+
+
+def read_storage_chunks(storage_path, chunk_size=1024 * 1024):
+    """
+    Yield a stored file's bytes in chunks, without writing it to local disk.
+    """
+    if hasattr(default_storage, "iter_chunks"):
+        yield from default_storage.iter_chunks(storage_path, chunk_size)
+        return
+
+    with default_storage.open(storage_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def delete_storage_prefix(prefix):
+    """
+    Delete every stored file under a directory-like prefix.
+
+    R2 removes keys in batched requests and local storage removes the
+    directory tree in one go. Other backends fall back to walking listdir().
+
+    Returns:
+        The number of files deleted
+    """
+    if not prefix.strip("/"):
+        raise ValueError("Refusing to delete the whole storage")
+
+    if hasattr(default_storage, "delete_prefix"):
+        return default_storage.delete_prefix(prefix)
+
+    local_path = local_storage_path(prefix)
+    if local_path is not None:
+        if not os.path.isdir(local_path):
+            return 0
+        deleted = sum(len(files) for _, _, files in os.walk(local_path))
+        shutil.rmtree(local_path, ignore_errors=True)
+        return deleted
+
+    def delete_tree(path):
+        dirs, files = default_storage.listdir(path)
+        for name in files:
+            default_storage.delete(f"{path}/{name}")
+        return len(files) + sum(delete_tree(f"{path}/{name}") for name in dirs)
+
+    return delete_tree(prefix.rstrip("/"))
+
+
 def delete_track_files(track_or_path):
     """
     Delete all files associated with a track or path
@@ -34,16 +146,16 @@ def delete_track_files(track_or_path):
     if hasattr(track_or_path, "audio_file"):  # Track object
         if not track_or_path.audio_file:
             return
+        if getattr(track_or_path, "content_id", None):
+            # Shared content is removed when its last track releases it
+            return
         base_path = track_or_path.audio_file
-        track_id = track_or_path.id
     elif isinstance(track_or_path, dict) and "audio_file" in track_or_path:  # Dict
         if not track_or_path["audio_file"]:
             return
         base_path = track_or_path["audio_file"]
-        track_id = track_or_path.get("id", None)
     elif isinstance(track_or_path, str):  # Direct path string
         base_path = track_or_path
-        track_id = None  # We don't know the ID in this case
     else:
         print(
             f"Warning: Unsupported type for delete_track_files: {type(track_or_path)}"
@@ -51,58 +163,22 @@ def delete_track_files(track_or_path):
         return
 
     try:
-        # Try to delete subdirectories and their contents
-        for subdir in ["orig", "320"]:
-            try:
-                dir_path = f"{base_path}/{subdir}"
-                # Check if directory exists
-                if default_storage.exists(dir_path):
-                    # List and delete all files in the directory
-                    try:
-                        _, files = default_storage.listdir(dir_path)
-                        for file in files:
-                            default_storage.delete(f"{dir_path}/{file}")
-                    except NotImplementedError:
-                        # Some storage backends don't support listdir
-                        # Try direct deletion of known files
-                        if subdir == "orig":
-                            # Try to delete by pattern matching
-                            pass  # Implement if needed
-                        elif subdir == "320" and track_id:
-                            # Try to delete MP3 file directly if we have the ID
-                            mp3_path = f"{dir_path}/{track_id}.mp3"
-                            if default_storage.exists(mp3_path):
-                                default_storage.delete(mp3_path)
-
-                    # Attempt to delete the empty subdirectory itself
-                    try:
-                        default_storage.delete(dir_path)
-                    except Exception as e:
-                        print(f"Could not delete subdirectory {dir_path}: {e}")
-            except Exception as e:
-                print(f"Error deleting files in {subdir}: {e}")
-
-        # Finally, try to delete the base directory
-        try:
-            if default_storage.exists(base_path):
-                default_storage.delete(base_path)
-        except Exception as e:
-            print(f"Could not delete base directory {base_path}: {e}")
+        delete_storage_prefix(base_path)
     except Exception as e:
         print(f"Error during track file deletion: {e}")
 
 
 def get_r2_storage():
     """
-    Get a direct R2 storage instance, bypassing Django's default_storage.
+    Get the process's R2 storage instance, bypassing Django's default_storage.
 
     This ensures we're using the R2 storage directly when needed.
     """
     if settings.USE_CLOUDFLARE_R2:
         # Import here to avoid circular imports
-        from api.storage import CloudflareR2Storage
+        from api.storage import get_storage
 
-        return CloudflareR2Storage()
+        return get_storage()
     else:
         # Fall back to default storage if R2 is not enabled
         return default_storage
@@ -1,4 +1,21 @@
-from django.http import JsonResponse
+import posixpath
+import re
+
+from api.image_cache import open_variant
+from api.images import ImageProcessingError
+from api.models import Track
+from api.utils import storage_url
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
@@ -68,4 +85,94 @@ class CustomGraphQLView(FileUploadGraphQLView):
         get_token(request)  # Force token generation
 
         # For other methods (POST), use normal CSRF protection
-        return super().dispatch(request, *args, **kwargs)
+        response = super().dispatch(request, *args, **kwargs)
+
+        # Set by RetryAfterMiddleware when an upload was turned away
+        retry_after = getattr(request, "retry_after", None)
+        if retry_after:
+            response["Retry-After"] = str(retry_after)
+        return response
+
+
+def sign_hls_uri(uri, base_dir):
+    """Resolve a playlist-relative URI to a URL for the stored file"""
+    return storage_url(posixpath.join(base_dir, uri), expiration=7200)
+
+
+@require_GET
+@cache_control(private=True, max_age=3600)
+def hls_manifest(request, track_id):
+    """
+    Serve a track's HLS playlist with segment URIs pointing at storage.
+
+    Segments on R2 need their own presigned URLs, which can't be resolved
+    relative to the playlist URL, so every URI is rewritten here. The
+    signatures outlive the response's cache lifetime.
+    """
+    track = Track.objects.filter(pk=track_id).first()
+    if track is None or not track.is_ready:
+        raise Http404("Track not found")
+    rendition = track.renditions.filter(name="hls").first()
+    if rendition is None:
+        raise Http404("Track has no HLS playlist")
+
+    base_dir = posixpath.dirname(rendition.path)
+    with default_storage.open(rendition.path, "r") as f:
+        playlist = f.read()
+    if isinstance(playlist, bytes):
+        playlist = playlist.decode()
+
+    lines = []
+    for line in playlist.splitlines():
+        if line.startswith("#EXT-X-MAP:"):
+            uri = line.split('URI="', 1)[1].split('"', 1)[0]
+            line = line.replace(f'URI="{uri}"', f'URI="{sign_hls_uri(uri, base_dir)}"')
+        elif line and not line.startswith("#"):
+            line = sign_hls_uri(line, base_dir)
+        lines.append(line)
+
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="application/vnd.apple.mpegurl"
+    )
+
+
+# Content types for the fmt parameter of image_variant, keyed by extension
+IMAGE_VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@require_GET
+def image_variant(request, user_id, name):
+    """
+    Serve a profile picture resized to ?w= pixels square, as ?fmt=webp or jpeg.
+
+    Variants are rendered from the stored original on first request and
+    cached on disk. Every new picture gets a new original name, so a URL
+    always means the same image and responses are cached as immutable.
+    """
+    if not re.fullmatch(r"[\w-]+\.\w+", name):
+        raise Http404("Image not found")
+    try:
+        width = int(request.GET.get("w", ""))
+    except ValueError:
+        return HttpResponseBadRequest("w must be a number of pixels")
+    if width not in settings.IMAGE_RESIZE_WIDTHS:
+        widths = ", ".join(str(w) for w in settings.IMAGE_RESIZE_WIDTHS)
+        return HttpResponseBadRequest(f"w must be one of {widths}")
+    fmt = request.GET.get("fmt", "webp")
+    if fmt not in IMAGE_VARIANT_FORMATS:
+        return HttpResponseBadRequest("fmt must be webp or jpeg")
+
+    extension = "jpg" if fmt == "jpeg" else fmt
+    try:
+        variant = open_variant(
+            f"{user_id}/{name}",
+            f"{user_id}/img/profile/orig/{name}",
+            width,
+            extension,
+        )
+    except (FileNotFoundError, ImageProcessingError):
+        raise Http404("Image not found")
+
+    response = FileResponse(variant, content_type=IMAGE_VARIANT_FORMATS[fmt])
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -61,6 +62,22 @@ if USE_CLOUDFLARE_R2:
     AWS_S3_SIGNATURE_VERSION = "s3v4"
     AWS_QUERYSTRING_AUTH = True  # Enable query string auth for URLs
 
+    # Uploads stream from file handles; anything over the threshold is sent
+    # as a multipart upload of fixed-size parts, several parts at a time
+    AWS_S3_MULTIPART_THRESHOLD = int(
+        os.environ.get("R2_MULTIPART_THRESHOLD", 8 * 1024 * 1024)
+    )
+    AWS_S3_MULTIPART_CHUNKSIZE = int(
+        os.environ.get("R2_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)
+    )
+    AWS_S3_MAX_CONCURRENCY = int(os.environ.get("R2_MAX_CONCURRENCY", 4))
+    # Each process shares one client; its pool has to cover every thread's
+    # requests plus the parallel parts of each transfer
+    AWS_S3_MAX_POOL_CONNECTIONS = int(os.environ.get("R2_MAX_POOL_CONNECTIONS", 32))
+    AWS_S3_MAX_ATTEMPTS = int(os.environ.get("R2_MAX_ATTEMPTS", 5))
+    # Spool opened files to disk past this size instead of keeping them in RAM
+    AWS_S3_MAX_MEMORY_SIZE = 8 * 1024 * 1024
+
     MEDIA_URL = f"{AWS_S3_ENDPOINT_URL}/{AWS_STORAGE_BUCKET_NAME}/"
 
 else:
@@ -137,6 +154,7 @@ GRAPHENE = {
     "SCHEMA": "api.schema.schema",
     "MIDDLEWARE": [
         "api.middleware.GraphQLAuthenticationMiddleware",
+        "api.middleware.RetryAfterMiddleware",
     ],
 }
 
@@ -214,6 +232,105 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Hash uploads while they are written so duplicates can reuse stored content
+FILE_UPLOAD_HANDLERS = [
+    "api.upload_handlers.HashingMemoryFileUploadHandler",
+    "api.upload_handlers.HashingTemporaryFileUploadHandler",
+]
+
+# Track processing queue
+# Uploads are transcoded by the `process_tracks` worker; eager mode runs the
+# pipeline inline in the request instead (used by tests and local debugging).
+TRACK_PROCESSING_EAGER = (
+    os.environ.get("TRACK_PROCESSING_EAGER", "false").lower() == "true"
+)
+TRACK_PROCESSING_MAX_ATTEMPTS = int(
+    os.environ.get("TRACK_PROCESSING_MAX_ATTEMPTS", "3")
+)
+# Jobs processed in parallel by a worker (and by eager batch uploads)
+TRACK_PROCESSING_CONCURRENCY = int(
+    os.environ.get("TRACK_PROCESSING_CONCURRENCY", "2")
+)
+TRACK_PROCESSING_POLL_INTERVAL = float(
+    os.environ.get("TRACK_PROCESSING_POLL_INTERVAL", "2")
+)
+# Running jobs whose worker has been silent this long are handed out again
+TRACK_PROCESSING_STALE_AFTER = int(
+    os.environ.get("TRACK_PROCESSING_STALE_AFTER", "1800")
+)
+# Scratch space for decoded PCM and encoded renditions. The decoded PCM is
+# memory-mapped from here (about 10 MB per stereo minute), so keep it on disk:
+# on a tmpfs such as /dev/shm a 90-minute upload would sit in RAM instead.
+TRACK_SCRATCH_DIR = os.environ.get("TRACK_SCRATCH_DIR") or None
+# Machine-wide cap on concurrent transcodes, shared through lock files. The
+# cap only spans processes that see the same TRANSCODE_LOCK_DIR, so containers
+# must mount it from a shared volume (as docker-compose.yml does).
+TRANSCODE_SLOTS = int(os.environ.get("TRANSCODE_SLOTS", "2"))
+TRANSCODE_LOCK_DIR = os.environ.get(
+    "TRANSCODE_LOCK_DIR", os.path.join(tempfile.gettempdir(), "demooo-transcode")
+)
+# Seconds an upload request waits for a free slot before reporting busy
+TRANSCODE_SLOT_WAIT = float(os.environ.get("TRANSCODE_SLOT_WAIT", "5"))
+# Queued uploads allowed before new ones are turned away (0 for no limit)
+TRACK_PROCESSING_MAX_QUEUE = int(os.environ.get("TRACK_PROCESSING_MAX_QUEUE", "50"))
+# Seconds clients are told to wait when the transcoder is busy
+TRANSCODE_RETRY_AFTER = int(os.environ.get("TRANSCODE_RETRY_AFTER", "30"))
+# Resumable uploads: part files live here until the upload is finished
+UPLOAD_SESSION_DIR = os.environ.get(
+    "UPLOAD_SESSION_DIR", os.path.join(tempfile.gettempdir(), "demooo-uploads")
+)
+# Suggested chunk size returned to clients
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+# Unfinished uploads untouched for this many seconds are discarded
+UPLOAD_SESSION_EXPIRY = int(os.environ.get("UPLOAD_SESSION_EXPIRY", "86400"))
+
+# Uploads are rejected before anything is stored if they break these limits
+UPLOAD_MAX_SIZE = int(os.environ.get("UPLOAD_MAX_SIZE", 500 * 1024 * 1024))
+UPLOAD_MAX_DURATION = int(os.environ.get("UPLOAD_MAX_DURATION", 3 * 60 * 60))
+# ffprobe codec names; "pcm" allows every pcm_* variant
+UPLOAD_ALLOWED_CODECS = os.environ.get(
+    "UPLOAD_ALLOWED_CODECS", "mp3,aac,alac,flac,vorbis,opus,pcm"
+).split(",")
+
+# Presigned R2 URLs are reused for fixed windows of this many seconds, so a
+# file keeps the same URL (and stays in browser caches) for hours
+PRESIGNED_URL_BUCKET = int(os.environ.get("PRESIGNED_URL_BUCKET", 6 * 60 * 60))
+# Presigned URLs kept in each process
+PRESIGNED_URL_CACHE_SIZE = int(os.environ.get("PRESIGNED_URL_CACHE_SIZE", "10000"))
+# Optional CACHES alias shared by every process (e.g. Redis), so they all hand
+# out the same URL
+PRESIGNED_URL_SHARED_CACHE = os.environ.get("PRESIGNED_URL_SHARED_CACHE") or None
+
+# Avatars resized on demand by /img/ are cached here, least recently used
+# first out once the cache outgrows IMAGE_CACHE_MAX_BYTES
+IMAGE_CACHE_DIR = os.environ.get(
+    "IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "demooo-images")
+)
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Widths /img/ will resize to; anything else is refused so the cache can't be
+# filled with arbitrary sizes
+IMAGE_RESIZE_WIDTHS = [
+    int(width)
+    for width in os.environ.get(
+        "IMAGE_RESIZE_WIDTHS", "32,48,64,96,128,192,256,384,600"
+    ).split(",")
+]
+
+# Optional HLS output (AAC segments plus an index.m3u8) stored under <base>/hls
+TRACK_HLS_ENABLED = os.environ.get("TRACK_HLS_ENABLED", "false").lower() == "true"
+TRACK_HLS_SEGMENT_SECONDS = int(os.environ.get("TRACK_HLS_SEGMENT_SECONDS", "6"))
+TRACK_HLS_BITRATE = os.environ.get("TRACK_HLS_BITRATE", "128k")
+# "fmp4" or "mpegts"
+TRACK_HLS_SEGMENT_TYPE = os.environ.get("TRACK_HLS_SEGMENT_TYPE", "fmp4")
+# Renditions encoded for every track, as comma-separated name:codec:bitrate.
+# The "320" MP3 is the primary file behind audio_url and is always produced.
+TRACK_RENDITIONS = [
+    dict(zip(("name", "codec", "bitrate"), spec.strip().split(":")))
+    for spec in os.environ.get(
+        "TRACK_RENDITIONS", "320:mp3:320k,128:mp3:128k,opus64:opus:64k"
+    ).split(",")
+]
+
 CORS_ALLOWED_ORIGINS = os.environ.get(
     "CORS_ALLOWED_ORIGINS",
     "http://localhost:3000,http://localhost:4000,http://localhost:4173,http://localhost:5173,https://demooo.fly.dev",
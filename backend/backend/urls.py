@@ -7,6 +7,8 @@ from django.views.static import serve
 from api.views import (
     session_debug,
     get_csrf_token,
+    hls_manifest,
+    image_variant,
     CustomGraphQLView,
 )
 from django.views.decorators.cache import cache_control
@@ -30,6 +32,12 @@ urlpatterns = [
     # Debug and CSRF endpoints
     path("api/debug/session/", session_debug, name="session_debug"),
     path("api/csrf/", get_csrf_token, name="csrf"),
+    # HLS playlists with signed segment URLs
+    path(
+        "api/tracks/<uuid:track_id>/hls.m3u8", hls_manifest, name="hls_manifest"
+    ),
+    # Profile pictures resized on demand
+    path("img/<uuid:user_id>/<str:name>", image_variant, name="image_variant"),
     # Serve robots.txt
     path(
         "robots.txt",
@@ -17,8 +17,8 @@ export const mockData = {
       audioLength: 120,
       createdAt: "2025-04-04",
       recordedAt: "2025-04-04",
-      audioWaveformData:
-        "[0.32, 0.45, 1.0, 0.54, 0.42, 0.47, 0.43, 0.26, 0.35, 0.54, 0.26, 0.37, 0.3, 0.98, 0.64, 0.43, 0.45, 0.48, 0.26, 0.26, 0.47, 0.44, 0.37, 0.27, 0.88, 0.76, 0.43, 0.42, 0.44, 0.39, 0.24, 0.45, 0.45, 0.36, 0.26, 0.5, 0.99, 0.53, 0.41, 0.45, 0.42, 0.26, 0.39, 0.51, 0.26, 0.37, 0.36, 0.96, 0.63, 0.44, 0.46, 0.46, 0.25, 0.31, 0.55, 0.27, 0.28, 0.14, 0.23, 0.12, 0.09, 0.07, 0.07, 0.05, 0.04, 0.04, 0.04, 0.05, 0.04, 0.07, 0.08, 0.07, 0.07, 0.07, 0.06, 0.05, 0.07, 0.07, 0.05, 0.03]",
+      audioWaveform:
+        "UnP/imt4bkJZikJeTPqjbnN6QkJ4cF5F4MJua3BjPXNzXEKA/Idpc2tCY4JCXlz1oXB1dUBPjEVHJDsfFxISDQoKCg0KEhQSEhIPDRISDQg=",
       audioWaveformResolution: 80,
     },
   ],
@@ -8,7 +8,7 @@ export const UPLOAD_TRACK = gql`
         title
         audioFile
         audioUrl
-        audioWaveformData
+        audioWaveform(resolution: 64)
         audioLength
       }
     }
@@ -23,7 +23,7 @@ export const UPLOAD_MULTIPLE_TRACKS = gql`
         title
         audioFile
         audioUrl
-        audioWaveformData
+        audioWaveform(resolution: 64)
         audioLength
       }
       failedUploads
@@ -10,7 +10,7 @@ export const GET_TRACK = gql`
       audioFile
       audioUrl
       audioLength
-      audioWaveformData
+      audioWaveform(resolution: 2048)
       audioWaveformResolution
       createdAt
       updatedAt
@@ -31,7 +31,7 @@ export const GET_ALL_TRACKS = gql`
       titleSlug
       audioUrl
       audioLength
-      audioWaveformData
+      audioWaveform(resolution: 64)
       createdAt
       favoritesCount
       artist {
@@ -41,6 +41,7 @@ export const GET_ALL_TRACKS = gql`
           id
           name
           profilePictureOptimizedUrl
+          profilePictureSrcset
         }
       }
     }
@@ -55,7 +56,7 @@ export const GET_RECENT_TRACKS = gql`
       titleSlug
       audioUrl
       audioLength
-      audioWaveformData
+      audioWaveform(resolution: 64)
       createdAt
       favoritesCount
       artist {
@@ -65,6 +66,7 @@ export const GET_RECENT_TRACKS = gql`
           id
           name
           profilePictureOptimizedUrl
+          profilePictureSrcset
         }
       }
     }
@@ -85,7 +87,7 @@ export const GET_USER_TRACKS = gql`
       audioFile
       audioUrl
       audioLength
-      audioWaveformData
+      audioWaveform(resolution: 64)
       audioWaveformResolution
       createdAt
       updatedAt
@@ -113,7 +115,7 @@ export const GET_TRACK_BY_SLUG = gql`
       audioFile
       audioUrl
       audioLength
-      audioWaveformData
+      audioWaveform(resolution: 2048)
       createdAt
       updatedAt
       favoritesCount
@@ -13,6 +13,7 @@ export const GET_ME = gql`
         location
         profilePicture
         profilePictureOptimizedUrl
+        profilePictureSrcset
       }
     }
   }
@@ -39,6 +40,7 @@ export const GET_ARTIST = gql`
         location
         profilePicture
         profilePictureOptimizedUrl
+        profilePictureSrcset
       }
       tracks {
         id
@@ -49,7 +51,7 @@ export const GET_ARTIST = gql`
         description
         audioUrl
         audioLength
-        audioWaveformData
+        audioWaveform(resolution: 64)
         artist {
           id
           username
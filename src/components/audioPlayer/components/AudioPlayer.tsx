@@ -420,7 +420,7 @@ const AudioPlayer = memo(function AudioPlayer({
             aria-label="Audio timeline"
           >
             <Waveform
-              data={track.audioWaveformData}
+              data={track.audioWaveform}
               progress={normalizedProgress}
               isInteractive={false}
               aria-hidden="true"
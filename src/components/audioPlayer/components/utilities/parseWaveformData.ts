@@ -1,12 +1,16 @@
-// Saved to database jsonb, but we pull it in as a string due to type issues.
-// This restores it to an object we can map on.
+// Waveforms arrive as base64-encoded bytes, one 0-255 peak per bucket.
+// This restores them to 0-1 values we can map on.
 
 export const parseWaveformData = (
-  waveformString: string | null | undefined,
+  waveformPeaks: string | null | undefined,
 ): number[] => {
-  if (!waveformString) {
+  if (!waveformPeaks) {
+    return [];
+  }
+  try {
+    const bytes = atob(waveformPeaks);
+    return Array.from(bytes, (byte) => byte.charCodeAt(0) / 255);
+  } catch {
     return [];
   }
-  const numbers = waveformString.match(/\d+(?:\.\d+)?/g);
-  return numbers ? numbers.map((n) => Number.parseFloat(n)) : [];
 };
@@ -1,6 +1,9 @@
 import { tokens } from "@/styles/tokens";
 import type { Profile } from "@/types/user";
-import { getProfilePhotoUrl } from "@/utils/getProfilePhotoUrl";
+import {
+  getProfilePhotoSrcset,
+  getProfilePhotoUrl,
+} from "@/utils/getProfilePhotoUrl";
 import { assignInlineVars } from "@vanilla-extract/dynamic";
 import { useMemo } from "react";
 import * as style from "./ProfilePhoto.css";
@@ -39,6 +42,10 @@ const ProfilePhoto = ({
   }
 
   const profilePhotoUrl = useMemo(() => getProfilePhotoUrl(profile), [profile]);
+  const profilePhotoSrcset = useMemo(
+    () => getProfilePhotoSrcset(profile),
+    [profile],
+  );
 
   const cssVars = assignInlineVars({
     [style.widthVar]: toCssValue(width),
@@ -58,6 +65,8 @@ const ProfilePhoto = ({
       className={style.profilePhotoImage}
       style={cssVars}
       src={profilePhotoUrl}
+      srcSet={profilePhotoSrcset}
+      sizes={toCssValue(width)}
       alt="profile photo"
       aria-hidden={ariaHidden}
     />
@@ -73,7 +73,7 @@ const TrackChip = memo(function TrackChip({ track }: { track: Track }) {
         />
         <div className={style.waveformElement({ isPlaying: isPlaying })}>
           <Waveform
-            data={track.audioWaveformData}
+            data={track.audioWaveform}
             width={91}
             height={29}
             barWidth={1}
@@ -6,7 +6,7 @@ export interface Track {
   title: string;
   titleSlug: string;
   description: string;
-  audioWaveformData: string;
+  audioWaveform: string;
   audioWaveformResolution: number;
   artist: User;
   audioLength: number;
@@ -16,4 +16,5 @@ export interface Profile {
   location?: string;
   bio?: string;
   profilePictureOptimizedUrl?: string;
+  profilePictureSrcset?: string;
 }
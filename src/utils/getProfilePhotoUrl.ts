@@ -1,11 +1,28 @@
 import type { Profile } from "@/types/user";
 
+function absoluteUrl(url: string): string {
+  if (url.startsWith("http")) {
+    return url;
+  }
+  return `${import.meta.env.VITE_API_BASE_URL}${url}`;
+}
+
 export function getProfilePhotoUrl(profile: Profile): string | undefined {
   if (profile?.profilePictureOptimizedUrl) {
-    if (profile?.profilePictureOptimizedUrl?.startsWith("http")) {
-      return profile.profilePictureOptimizedUrl;
-    }
-    return `${import.meta.env.VITE_API_BASE_URL}${profile.profilePictureOptimizedUrl}`;
+    return absoluteUrl(profile.profilePictureOptimizedUrl);
   }
   return undefined;
 }
+
+export function getProfilePhotoSrcset(profile: Profile): string | undefined {
+  if (!profile?.profilePictureSrcset) {
+    return undefined;
+  }
+  return profile.profilePictureSrcset
+    .split(", ")
+    .map((candidate) => {
+      const [url, descriptor] = candidate.split(" ");
+      return `${absoluteUrl(url)} ${descriptor}`;
+    })
+    .join(", ");
+}